@@ -0,0 +1,120 @@
+"""PatternMatcherのマイクロベンチマーク
+
+完全一致・接頭辞・接尾辞のパターンは、数を増やしても1エントリあたりの分類コストが
+ほぼ一定であることを、パターンごとに照合する従来方式と比較して確認する。
+それ以外のグロブ（"~$*.tmp" など）は1つの正規表現で照合するため、
+グロブの数に比例してコストが増えることも合わせて計測する。
+
+    python benchmarks/bench_matcher.py
+"""
+
+import os
+import random
+import sys
+import time
+import fnmatch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable-next=wrong-import-position
+from clean_sweep_engine import (  # noqa: E402
+    BUILTIN_PATTERNS,
+    GLOB_CHARS,
+    PatternMatcher,
+)
+
+ENTRY_COUNT = 200_000
+PATTERN_COUNTS = [16, 64, 256, 1024]
+
+
+def make_patterns(count, rng):
+    """組み込みパターンに完全一致・接頭辞・接尾辞のダミーパターンを追加する"""
+    patterns = list(BUILTIN_PATTERNS)
+    i = 0
+    while len(patterns) < count:
+        kind = i % 3
+        token = f"junk{i}_{rng.randrange(1 << 30):x}"
+        if kind == 0:
+            patterns.append(token + ".tmp")
+        elif kind == 1:
+            patterns.append(token + "*")
+        else:
+            patterns.append("*." + token)
+        i += 1
+    return patterns
+
+
+def make_glob_patterns(count, rng):
+    """組み込みパターンに、接頭辞・接尾辞に分解できないグロブを追加する"""
+    patterns = list(BUILTIN_PATTERNS)
+    i = 0
+    while len(patterns) < count:
+        token = f"junk{i}_{rng.randrange(1 << 30):x}"
+        if i % 2:
+            patterns.append(f"~${token}*.tmp")
+        else:
+            patterns.append(f"{token}?.[bt]ak")
+        i += 1
+    return patterns
+
+
+def make_names(count, rng):
+    names = []
+    for i in range(count):
+        r = rng.random()
+        if r < 0.02:
+            names.append(".DS_Store")
+        elif r < 0.05:
+            names.append(f"._photo{i}.jpg")
+        else:
+            names.append(f"file{i}_{rng.randrange(1 << 20)}.dat")
+    return names
+
+
+def naive_match(name, patterns):
+    """パターンごとに順番に照合する従来方式"""
+    for pattern in patterns:
+        if pattern.endswith("/"):
+            continue
+        if GLOB_CHARS.intersection(pattern):
+            if fnmatch.fnmatchcase(name, pattern):
+                return pattern
+        elif name == pattern:
+            return pattern
+    return None
+
+
+def time_per_entry(func, names):
+    start = time.perf_counter()
+    for name in names:
+        func(name)
+    return (time.perf_counter() - start) / len(names) * 1e9
+
+
+def run(title, make, names, rng):
+    print(title)
+    print(f"{'patterns':>9} {'matcher ns/entry':>17} {'naive ns/entry':>15}")
+    for count in PATTERN_COUNTS:
+        patterns = make(count, rng)
+        start = time.perf_counter()
+        matcher = PatternMatcher(patterns)
+        compile_ms = (time.perf_counter() - start) * 1e3
+        compiled = time_per_entry(matcher.match_file, names)
+        naive_names = names[: ENTRY_COUNT // 10]
+        naive = time_per_entry(lambda n: naive_match(n, patterns), naive_names)
+        print(
+            f"{count:>9} {compiled:>17.1f} {naive:>15.1f}"
+            f"   (compile {compile_ms:.2f} ms)"
+        )
+
+
+def main():
+    rng = random.Random(0)
+    names = make_names(ENTRY_COUNT, rng)
+    run("完全一致・接頭辞・接尾辞（パターン数に依存しない）", make_patterns, names, rng)
+    print()
+    run("一般のグロブ（グロブの数に比例する）", make_glob_patterns, names, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""合成ツリーを使ったベンチマークスイート
+
+synthetic_tree.pyで生成した同じツリーに対して、次の処理を計測してJSONで書き出す。
+書き出した結果を --compare で指定すると、前回の結果との比を表示する。
+
+- scan: ScanEngineによる走査（逐次・並列）のディレクトリ/秒・エントリ/秒
+- matching: PatternMatcherの1エントリあたりの分類コスト
+- ui: ResultsModelへの結果の追加と削除（offscreenのQtで計測、PyQt5がなければ省略）
+- delete: iter_deleteによるゴミ箱への移動・直接削除の件数/秒
+  （Linuxでは一時ディレクトリ内のゴミ箱を使用）
+
+    python benchmarks/bench_suite.py -o results.json
+    python benchmarks/bench_suite.py --depth 5 --compare results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from clean_sweep_engine import (  # noqa: E402
+    BUILTIN_PATTERNS,
+    PatternMatcher,
+    ScanEngine,
+    iter_delete,
+)
+from synthetic_tree import TreeSpec, build_tree  # noqa: E402
+
+# pylint: enable=wrong-import-position
+
+BENCHMARKS = ("scan", "matching", "ui", "delete")
+PATTERNS = list(BUILTIN_PATTERNS)
+PROBE_ZONE_STREAMS = sys.platform == "win32"  # NTFSでは代替データストリームになる
+
+
+def best_of(repeat, func):
+    """funcをrepeat回実行し、(最短の秒数, 中央値の秒数, 最後の戻り値) を返す"""
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), statistics.median(times), result
+
+
+def bench_scan(base, stats, repeat):
+    results = {}
+    for workers in (1, 4):
+
+        def scan(workers=workers):
+            engine = ScanEngine(
+                PATTERNS, [base], workers=workers, probe_zone_streams=PROBE_ZONE_STREAMS
+            )
+            found = set(engine.iter_matches())
+            return engine, found
+
+        best, median, (engine, found) = best_of(repeat, scan)
+        metrics = engine.metrics
+        results[f"workers_{workers}"] = {
+            "seconds": best,
+            "median_seconds": median,
+            "dirs_per_second": engine.dirs_scanned / best,
+            "entries_per_second": engine.files_scanned / best,
+            "listing_seconds": metrics.listing_seconds,
+            "matching_seconds": metrics.matching_seconds,
+            "correct": found == stats.expected,
+        }
+    return results
+
+
+def bench_matching(base, repeat):
+    names = []
+    for _, dirnames, filenames in os.walk(base):
+        names.extend(dirnames)
+        names.extend(filenames)
+    matcher = PatternMatcher(PATTERNS)
+
+    def classify():
+        match_file = matcher.match_file
+        for name in names:
+            match_file(name)
+
+    best, median, _ = best_of(repeat, classify)
+    return {
+        "entries": len(names),
+        "ns_per_entry": best / len(names) * 1e9,
+        "median_ns_per_entry": median / len(names) * 1e9,
+    }
+
+
+def bench_ui(stats, repeat):
+    """検索スレッドと同じ件数ずつ結果を追加し、表示を更新させる"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        # pylint: disable=import-outside-toplevel
+        from PyQt5.QtWidgets import QApplication, QTreeView
+        from clean_sweep_gui import ResultsModel, SearchThread
+    except ImportError as e:
+        return {"skipped": str(e)}
+
+    app = QApplication.instance() or QApplication([])
+    paths = sorted(stats.expected)
+    batch_size = SearchThread.FLUSH_SIZE
+    model = ResultsModel()
+    view = QTreeView()
+    view.setUniformRowHeights(True)
+    view.setModel(model)
+    view.resize(800, 600)
+    view.show()
+
+    def ingest():
+        model.clear()
+        app.processEvents()
+        for start in range(0, len(paths), batch_size):
+            model.add_paths(paths[start : start + batch_size])
+            app.processEvents()
+
+    def remove():
+        model.remove_paths({os.path.normpath(path) for path in paths[::2]})
+        app.processEvents()
+
+    add_best, add_median, _ = best_of(repeat, ingest)
+    correct = model.item_count() == len(paths)
+    remove_times = []
+    for _ in range(repeat):
+        ingest()
+        start = time.perf_counter()
+        remove()
+        remove_times.append(time.perf_counter() - start)
+    correct = correct and model.item_count() == len(paths) - len(paths[::2])
+    view.close()
+    model.size_calculator.shutdown()
+    return {
+        "paths": len(paths),
+        "batch_size": batch_size,
+        "add_paths_per_second": len(paths) / add_best,
+        "add_median_seconds": add_median,
+        "remove_paths_per_second": len(paths[::2]) / min(remove_times),
+        "remove_median_seconds": statistics.median(remove_times),
+        "correct": correct,
+    }
+
+
+def bench_delete(spec, workdir, allow_trash):
+    if sys.platform.startswith("linux"):
+        # ゴミ箱を一時ディレクトリ内に作る（send2trashは読み込み時に参照する）
+        os.environ["XDG_DATA_HOME"] = os.path.join(workdir, "data")
+        os.makedirs(os.environ["XDG_DATA_HOME"], exist_ok=True)
+    elif not allow_trash:
+        return {"skipped": "ゴミ箱を使うため --allow-trash の指定が必要です"}
+
+    results = {}
+    for mode, permanent in (("trash", False), ("permanent", True)):
+        base = os.path.join(workdir, f"delete_{mode}")
+        os.mkdir(base)
+        stats = build_tree(base, spec)
+        targets = sorted(stats.expected)
+        start = time.perf_counter()
+        failed = 0
+        for batch in iter_delete(targets, permanent=permanent):
+            failed += sum(error is not None for _, error in batch)
+        elapsed = time.perf_counter() - start
+        remaining = sum(os.path.lexists(path) for path in targets)
+        results[mode] = {
+            "paths": len(targets),
+            "seconds": elapsed,
+            "paths_per_second": len(targets) / elapsed if elapsed else 0.0,
+            "failed": failed,
+            "correct": failed == 0 and remaining == 0,
+        }
+    return results
+
+
+def git_revision():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        return subprocess.run(
+            ["git", "-C", root, "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results, prefix=""):
+    """入れ子の結果を {"scan.workers_1.seconds": 値} の形式に展開する"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def print_results(results, baseline=None):
+    current = flatten(results["benchmarks"])
+    previous = flatten(baseline["benchmarks"]) if baseline else {}
+    for name, value in current.items():
+        line = f"{name:<45} {value:>16,.3f}"
+        if previous.get(name):
+            line += f"   x{value / previous[name]:.2f}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="合成ツリーでベンチマークを実行します。"
+    )
+    for field, default in TreeSpec._field_defaults.items():
+        parser.add_argument(
+            f"--{field.replace('_', '-')}", type=type(default), default=default
+        )
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="繰り返し回数")
+    parser.add_argument(
+        "--only", action="append", choices=BENCHMARKS, help="実行するベンチマーク"
+    )
+    parser.add_argument("-o", "--output", help="結果を書き出すJSONファイル")
+    parser.add_argument("--compare", metavar="JSON", help="比較する前回の結果")
+    parser.add_argument(
+        "--allow-trash",
+        action="store_true",
+        help="Linux以外でもシステムのゴミ箱を使って削除を計測する",
+    )
+    args = parser.parse_args()
+    spec = TreeSpec(**{field: getattr(args, field) for field in TreeSpec._fields})
+    selected = args.only or BENCHMARKS
+
+    results = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "spec": spec._asdict(),
+        "benchmarks": {},
+    }
+    workdir = tempfile.mkdtemp(prefix="cleansweep-bench-")
+    try:
+        base = os.path.join(workdir, "tree")
+        os.mkdir(base)
+        start = time.perf_counter()
+        stats = build_tree(base, spec)
+        results["tree"] = {
+            "directories": stats.directories,
+            "files": stats.files,
+            "matches": len(stats.expected),
+            "decoy_matches": stats.decoy_matches,
+            "build_seconds": time.perf_counter() - start,
+        }
+        benchmarks = results["benchmarks"]
+        if "scan" in selected:
+            benchmarks["scan"] = bench_scan(base, stats, args.repeat)
+        if "matching" in selected:
+            benchmarks["matching"] = bench_matching(base, args.repeat)
+        if "ui" in selected:
+            benchmarks["ui"] = bench_ui(stats, args.repeat)
+        if "delete" in selected:
+            benchmarks["delete"] = bench_delete(spec, workdir, args.allow_trash)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    tree = results["tree"]
+    print(
+        f"tree: {tree['directories']:,} dirs / {tree['files']:,} files / "
+        f"{tree['matches']:,} matches (revision {results['revision']})"
+    )
+    print_results(results, baseline)
+    for name, result in results["benchmarks"].items():
+        if "skipped" in result:
+            print(f"{name}: skipped - {result['skipped']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
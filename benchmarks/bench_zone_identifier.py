@@ -0,0 +1,96 @@
+"""Zone.Identifier検出方式のベンチマーク
+
+合成したディレクトリツリーに対して、ディレクトリ一覧からの検出（既定）と
+ファイルごとにストリームを開いて確認する方式のシステムコール数・所要時間を比較する。
+
+    python benchmarks/bench_zone_identifier.py
+"""
+
+import builtins
+import functools
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable-next=wrong-import-position
+import clean_sweep_engine  # noqa: E402
+
+DIR_COUNT = 200
+FILES_PER_DIR = 100
+ZONE_EVERY = 10  # 何ファイルごとにZone.Identifierを付けるか
+
+
+def build_tree(base):
+    for d in range(DIR_COUNT):
+        directory = os.path.join(base, f"dir{d:04d}")
+        os.mkdir(directory)
+        for f in range(FILES_PER_DIR):
+            name = f"file{f:04d}.bin"
+            open(os.path.join(directory, name), "wb").close()
+            if f % ZONE_EVERY == 0:
+                open(os.path.join(directory, name + ":Zone.Identifier"), "wb").close()
+
+
+class SyscallCounter:
+    """os.scandirと組み込みopenの呼び出し回数を数える"""
+
+    def __init__(self):
+        self.scandir = 0
+        self.open = 0
+        self._orig_scandir = os.scandir
+        self._orig_open = builtins.open
+
+    def __enter__(self):
+        def scandir(*args, **kwargs):
+            self.scandir += 1
+            return self._orig_scandir(*args, **kwargs)
+
+        def counting_open(*args, **kwargs):
+            self.open += 1
+            return self._orig_open(*args, **kwargs)
+
+        clean_sweep_engine.os.scandir = scandir
+        clean_sweep_engine.open = counting_open
+        return self
+
+    def __exit__(self, *exc):
+        clean_sweep_engine.os.scandir = self._orig_scandir
+        del clean_sweep_engine.open
+
+
+def run(base, probe):
+    matcher = clean_sweep_engine.PatternMatcher(["Zone.Identifier"], probe)
+    found = set()
+    with SyscallCounter() as counter:
+        start = time.perf_counter()
+        scan = functools.partial(
+            clean_sweep_engine.list_directory,
+            matcher=matcher,
+            is_excluded_name=lambda name: False,
+        )
+        for _, _, matches in clean_sweep_engine.walk_matches(base, scan, lambda: True):
+            found.update(matches)
+        elapsed = time.perf_counter() - start
+    return found, counter, elapsed
+
+
+def main():
+    with tempfile.TemporaryDirectory() as base:
+        build_tree(base)
+        print(f"{'mode':>8} {'matches':>8} {'scandir':>8} {'open':>8} {'time ms':>9}")
+        results = {}
+        for label, probe in (("listing", False), ("probe", True)):
+            found, counter, elapsed = run(base, probe)
+            results[label] = found
+            print(
+                f"{label:>8} {len(found):>8} {counter.scandir:>8} "
+                f"{counter.open:>8} {elapsed * 1e3:>9.1f}"
+            )
+        print("same results:", results["listing"] == results["probe"])
+
+
+if __name__ == "__main__":
+    main()
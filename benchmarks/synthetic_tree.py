@@ -0,0 +1,145 @@
+"""ベンチマーク用の合成ディレクトリツリーの生成
+
+同じ設定とシードからは常に同じツリー（名前・構成・一致するファイル）を生成する。
+一致するファイルの密度と、走査から除外されるシステムディレクトリ（おとり）の有無を
+指定できる。おとりの中にも一致するファイルを置き、除外が効いているかを確認できる。
+
+    python benchmarks/synthetic_tree.py /tmp/tree --depth 3 --fanout 8
+"""
+
+import argparse
+import os
+import random
+import sys
+from collections import namedtuple
+
+# おとりとして作るシステムディレクトリ（SYSTEM_DIR_NAMESに含まれる名前）
+DECOY_DIR_NAMES = ("Windows", "AppData", "Program Files")
+# 丸ごと削除対象になるディレクトリと、その中に作るサブディレクトリ数・ファイル数
+JUNK_DIR_NAMES = (".Spotlight-V100", ".fseventsd", ".AppleDouble")
+JUNK_DIR_FANOUT = 4
+JUNK_DIR_FILES = 50
+
+
+class TreeSpec(
+    namedtuple(
+        "TreeSpec",
+        [
+            "depth",  # ルートからの階層の深さ
+            "fanout",  # 1つのディレクトリに作るサブディレクトリ数
+            "files_per_dir",  # 1つのディレクトリに作る通常のファイル数
+            "apple_double",  # 通常のファイルに対応する ._* を作る割合
+            "ds_store",  # .DS_Store を置くディレクトリの割合
+            "thumbs_db",  # Thumbs.db を置くディレクトリの割合
+            "zone_identifier",  # 通常のファイルに :Zone.Identifier を作る割合
+            "decoys",  # 1つの階層におとりのシステムディレクトリを置く割合
+            "seed",
+            "junk_dirs",  # .Spotlight-V100 等のディレクトリを置くディレクトリの割合
+        ],
+        defaults=[4, 6, 50, 0.05, 0.3, 0.1, 0.02, 0.1, 0, 0.0],
+    )
+):
+    """合成ツリーの設定（既定では約1,600ディレクトリ・約8万ファイル）"""
+
+    __slots__ = ()
+
+
+class TreeStats(
+    namedtuple("TreeStats", ["directories", "files", "expected", "decoy_matches"])
+):
+    """生成したツリーの集計（expectedは走査で見つかるべきパスの集合）"""
+
+    __slots__ = ()
+
+
+def _touch(path):
+    with open(path, "wb"):
+        pass
+
+
+def _fill(directory, spec, rng, expected):
+    """1つのディレクトリにファイルを作り、作ったファイル数を返す"""
+    count = 0
+    for i in range(spec.files_per_dir):
+        name = f"file{i:04d}.dat"
+        _touch(os.path.join(directory, name))
+        count += 1
+        if rng.random() < spec.apple_double:
+            path = os.path.join(directory, "._" + name)
+            _touch(path)
+            expected.add(path)
+            count += 1
+        if rng.random() < spec.zone_identifier:
+            path = os.path.join(directory, name + ":Zone.Identifier")
+            _touch(path)
+            expected.add(path)
+            count += sys.platform != "win32"  # NTFSでは代替データストリームになる
+    for name, ratio in ((".DS_Store", spec.ds_store), ("Thumbs.db", spec.thumbs_db)):
+        if rng.random() < ratio:
+            path = os.path.join(directory, name)
+            _touch(path)
+            expected.add(path)
+            count += 1
+    if spec.junk_dirs and rng.random() < spec.junk_dirs:
+        # 中身は走査されないが、削除では中のファイルも全て消す必要がある
+        junk = os.path.join(directory, rng.choice(JUNK_DIR_NAMES))
+        os.mkdir(junk)
+        expected.add(junk)
+        for i in range(JUNK_DIR_FANOUT):
+            sub = os.path.join(junk, f"store{i}")
+            os.mkdir(sub)
+            for j in range(JUNK_DIR_FILES):
+                _touch(os.path.join(sub, f"{j:04d}.db"))
+        count += JUNK_DIR_FANOUT * JUNK_DIR_FILES
+    return count
+
+
+def build_tree(base, spec=TreeSpec()):
+    """baseの下に合成ツリーを作り、TreeStatsを返す（baseは空のディレクトリ）"""
+    rng = random.Random(spec.seed)
+    expected = set()
+    directories = 0
+    files = 0
+    decoy_matches = 0
+    level = [base]
+    for depth in range(spec.depth + 1):
+        next_level = []
+        for directory in level:
+            directories += 1
+            files += _fill(directory, spec, rng, expected)
+            if rng.random() < spec.decoys:
+                # おとりの中身は除外されるため、一致するファイルも見つからないはず
+                decoy = os.path.join(directory, rng.choice(DECOY_DIR_NAMES))
+                os.mkdir(decoy)
+                for name in (".DS_Store", "Thumbs.db", "._decoy.dat"):
+                    _touch(os.path.join(decoy, name))
+                decoy_matches += 3
+            if depth == spec.depth:
+                continue
+            for i in range(spec.fanout):
+                child = os.path.join(directory, f"dir{i:02d}")
+                os.mkdir(child)
+                next_level.append(child)
+        level = next_level
+    return TreeStats(directories, files, expected, decoy_matches)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合成ディレクトリツリーを生成します。")
+    parser.add_argument("base", help="作成先（空のディレクトリまたは存在しないパス）")
+    for field, default in TreeSpec._field_defaults.items():
+        parser.add_argument(
+            f"--{field.replace('_', '-')}", type=type(default), default=default
+        )
+    args = parser.parse_args()
+    os.makedirs(args.base, exist_ok=True)
+    spec = TreeSpec(**{field: getattr(args, field) for field in TreeSpec._fields})
+    stats = build_tree(args.base, spec)
+    print(
+        f"{stats.directories:,} ディレクトリ / {stats.files:,} ファイル / "
+        f"一致 {len(stats.expected):,} 件 / おとり {stats.decoy_matches:,} 件"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,486 @@
+"""CleanSweepのコマンドラインインターフェース（PyQt5を読み込まない）
+
+python clean_sweep.py scan ~/share -p .DS_Store -p "._*"
+python clean_sweep.py delete /srv/share --all --dry-run --json
+python clean_sweep.py delete /srv/share -p Thumbs.db --yes
+python clean_sweep.py delete /srv/share -p .Spotlight-V100/ --permanent --yes
+python clean_sweep.py scan /srv/share --all -o results.jsonl
+python clean_sweep.py delete --all --from results.jsonl --yes
+python clean_sweep.py watch /srv/share -p .DS_Store -p "._*" --delete
+python clean_sweep.py scan /srv/share --all --low-priority --max-dirs-per-second 200
+python clean_sweep.py scan / /mnt/backup --all --per-device
+python clean_sweep.py scan /srv/share --all -j 4 --save-profile nightly
+python clean_sweep.py delete --profile nightly --yes
+python clean_sweep.py profiles
+python clean_sweep.py patterns
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from clean_sweep_engine import (
+    BUILTIN_PATTERNS,
+    DEFAULT_INDEX_PATH,
+    DeleteMetrics,
+    IGNORE_FILE_NAME,
+    PROFILES_PATH,
+    ResultWriter,
+    ScanProfile,
+    delete_profile,
+    iter_results,
+    load_plan,
+    load_profiles,
+    read_ignore_file,
+    iter_delete,
+    save_metrics,
+    save_profile,
+)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="clean_sweep",
+        description="不要なファイル・ディレクトリを検索して削除します。",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("roots", nargs="*", metavar="DIR", help="検索対象ディレクトリ")
+    common.add_argument(
+        "-p",
+        "--pattern",
+        action="append",
+        dest="patterns",
+        default=[],
+        metavar="PATTERN",
+        help=(
+            "クリーンアップ対象のパターン（複数指定可、ディレクトリは末尾に /）。"
+            "scanでは省略時に組み込みのパターンを全て対象にし、"
+            "削除では -p か --all が必要"
+        ),
+    )
+    common.add_argument(
+        "-a", "--all", action="store_true", help="組み込みのパターンを全て対象にする"
+    )
+    common.add_argument(
+        "-j", "--workers", type=int, default=1, help="並列スキャン数（既定: 1）"
+    )
+    common.add_argument(
+        "--probe-zone-streams",
+        action="store_true",
+        help="Zone.Identifierをファイルごとに直接確認する（NTFS向け、低速）",
+    )
+    common.add_argument(
+        "--index",
+        nargs="?",
+        const=DEFAULT_INDEX_PATH,
+        default=None,
+        metavar="PATH",
+        help=f"スキャンインデックスで差分検索する（既定: {DEFAULT_INDEX_PATH}）",
+    )
+    common.add_argument(
+        "-e",
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="RULE",
+        help="走査しないディレクトリ（名前・グロブ・相対パス・絶対パス、複数指定可）",
+    )
+    common.add_argument(
+        "--exclude-from",
+        action="append",
+        default=[],
+        metavar="FILE",
+        help="除外規則を1行に1つずつ記述したファイル",
+    )
+    common.add_argument(
+        "--no-ignore-file",
+        action="store_true",
+        help=f"検索対象の {IGNORE_FILE_NAME} を読み込まない",
+    )
+    common.add_argument(
+        "-x",
+        "--one-file-system",
+        action="store_true",
+        help="検索対象と異なるファイルシステムは走査しない",
+    )
+    common.add_argument(
+        "--per-device",
+        action="store_true",
+        help="検索対象を物理ディスクごとに分け、ディスクごとに別プロセスで走査する",
+    )
+    common.add_argument(
+        "--max-dirs-per-second",
+        type=float,
+        metavar="N",
+        help="1秒あたりに走査するディレクトリ数の上限",
+    )
+    common.add_argument(
+        "--max-entries-per-second",
+        type=float,
+        metavar="N",
+        help="1秒あたりに走査するエントリ数の上限",
+    )
+    common.add_argument(
+        "--low-priority",
+        action="store_true",
+        help="CPU・I/Oの優先度を下げ、ディスクが混雑している間は走査を控える",
+    )
+    common.add_argument(
+        "--profile",
+        metavar="NAME",
+        help="保存したプロファイルの検索条件で検索する（パターン・検索対象・除外規則・"
+        "並列数・速度制限はプロファイルのものを使用）",
+    )
+    common.add_argument(
+        "--save-profile",
+        metavar="NAME",
+        help=f"指定した検索条件をプロファイルとして保存する（保存先: {PROFILES_PATH}）",
+    )
+    common.add_argument(
+        "-o",
+        "--output",
+        metavar="FILE",
+        help="見つかった結果を順次ファイルに書き出す（.csvはCSV、それ以外はJSON Lines）",
+    )
+    common.add_argument(
+        "--metrics",
+        metavar="FILE",
+        help="検索・削除の計測結果（時間の内訳、エラー、遅いディレクトリ）をJSONで保存する",
+    )
+    common.add_argument(
+        "--json", action="store_true", help="結果をJSON Lines形式で出力する"
+    )
+    common.add_argument(
+        "-q", "--quiet", action="store_true", help="状態メッセージを表示しない"
+    )
+
+    subparsers.add_parser("scan", parents=[common], help="対象を検索して一覧表示")
+
+    delete_parser = subparsers.add_parser(
+        "delete", parents=[common], help="対象を検索して削除"
+    )
+    delete_parser.add_argument(
+        "-n", "--dry-run", action="store_true", help="削除せずに対象を表示する"
+    )
+    delete_parser.add_argument(
+        "-y", "--yes", action="store_true", help="確認せずに削除する"
+    )
+    delete_parser.add_argument(
+        "--permanent",
+        action="store_true",
+        help="ゴミ箱に移動せずに直接削除する（ディレクトリはツリーごと並列に削除）",
+    )
+    delete_parser.add_argument(
+        "--from",
+        dest="from_file",
+        metavar="FILE",
+        help="検索せずに保存済みの結果（-o の出力）から削除する",
+    )
+
+    watch_parser = subparsers.add_parser(
+        "watch", parents=[common], help="対象を検索した後、新しく作られたものを監視"
+    )
+    watch_parser.add_argument(
+        "--delete",
+        action="store_true",
+        help="監視中に見つかったものを確認せずに削除する（最初の検索結果は表示のみ）",
+    )
+    watch_parser.add_argument(
+        "--permanent",
+        action="store_true",
+        help="--delete でゴミ箱に移動せずに直接削除する",
+    )
+
+    profiles_parser = subparsers.add_parser(
+        "profiles", help="保存したプロファイルを一覧表示"
+    )
+    profiles_parser.add_argument(
+        "--delete", metavar="NAME", help="プロファイルを削除する"
+    )
+
+    subparsers.add_parser("patterns", help="組み込みのパターンを一覧表示")
+    return parser
+
+
+class Output:
+    """検索・削除結果の出力（テキストまたはJSON Lines）"""
+
+    def __init__(self, as_json, quiet):
+        self.as_json = as_json
+        self.quiet = quiet
+        # UTF-8として不正なファイル名もそのまま出力できるようにする
+        for stream in (sys.stdout, sys.stderr):
+            if hasattr(stream, "reconfigure"):
+                stream.reconfigure(errors="surrogateescape")
+
+    def message(self, message):
+        if not self.quiet:
+            print(message, file=sys.stderr, flush=True)
+
+    def match(self, path):
+        if self.as_json:
+            print(json.dumps({"path": path}))
+        else:
+            print(path)
+
+    def deleted(self, path, error):
+        if self.as_json:
+            print(json.dumps({"path": path, "error": error}))
+        elif error is None:
+            print(path)
+        else:
+            print(f"{path}\n→ {error}", file=sys.stderr)
+
+    def summary(self, **counts):
+        if self.as_json:
+            print(json.dumps({"summary": counts}))
+        else:
+            self.message(", ".join(f"{key}: {value}" for key, value in counts.items()))
+
+
+def confirm(count):
+    if not sys.stdin.isatty():
+        return False
+    answer = input(f"{count}個のファイルを削除しますか？ [y/N]: ")
+    return answer.strip().lower() in ("y", "yes")
+
+
+def build_profile(args, output):
+    """コマンドラインの検索条件をプロファイルにまとめる"""
+    # パターンの指定がない場合（検索・監視のみ）は組み込みのパターンを全て対象にする
+    patterns = list(args.patterns)
+    if args.all or not patterns:
+        patterns += list(BUILTIN_PATTERNS)
+    patterns = list(dict.fromkeys(patterns))
+
+    exclude = list(args.exclude)
+    for path in args.exclude_from:
+        if not os.path.isfile(path):
+            output.message(f"エラー: 除外規則ファイルが見つかりません - {path}")
+        exclude += read_ignore_file(path)
+
+    return ScanProfile(
+        args.save_profile or "",
+        patterns=patterns,
+        roots=[os.path.abspath(root) for root in args.roots],
+        exclude=exclude,
+        use_ignore_files=not args.no_ignore_file,
+        one_device=args.one_file_system,
+        probe_zone_streams=args.probe_zone_streams,
+        workers=args.workers,
+        per_device=args.per_device,
+        index_path=args.index,
+        max_dirs_per_second=args.max_dirs_per_second or 0,
+        max_entries_per_second=args.max_entries_per_second or 0,
+        low_priority=args.low_priority,
+    )
+
+
+def build_engine(args, profile, output):
+    # プロファイルで繰り返し検索する場合は、保存済みの走査計画を使う
+    plan = load_plan(profile, on_message=output.message) if args.profile else None
+    return profile.create_engine(
+        plan=plan,
+        on_message=output.message,
+        collect_sizes=bool(args.output),  # 結果ファイルにファイルの容量を記録する
+    )
+
+
+def list_profiles(args):
+    try:
+        if args.delete is not None:
+            if not delete_profile(args.delete):
+                print(f"エラー: プロファイルが見つかりません - {args.delete}")
+                return 1
+            return 0
+        profiles = load_profiles()
+    except (OSError, ValueError) as e:
+        print(f"エラー: プロファイルを読み込めません - {str(e)}", file=sys.stderr)
+        return 2
+    for name, profile in sorted(profiles.items()):
+        print(f"{name}\t{len(profile.patterns)} パターン\t{', '.join(profile.roots)}")
+    return 0
+
+
+def iter_scanned(engine, writer, watcher=None):
+    """検索しながら一致したパスを返す（writerがあれば順次書き出す）"""
+    for root, current, found in engine.scan():
+        if watcher is not None:
+            watcher.add_directory(root, current, found)
+        if writer is not None and found:
+            writer.write_many(root, found, engine.file_sizes)
+            for path in found:
+                engine.file_sizes.pop(path, None)
+        yield from found
+
+
+def iter_saved(path, matcher, output):
+    """保存済みの結果から、現在のパターンに一致するパスだけを返す"""
+    for saved, _, _ in iter_results(path):
+        name = os.path.basename(saved)
+        if matcher.match_dir(name) is None and matcher.match_file(name) is None:
+            output.message(f"スキップ（パターンに一致しません）: {saved}")
+            continue
+        yield saved
+
+
+def watch(engine, watcher, matches, writer, output, delete, permanent=False):
+    """最初の検索結果を出力し、停止されるまで新しく作られたものを出力（または削除）する"""
+    reported = set()
+
+    def report(root, paths):
+        new_paths = []
+        for path in paths:
+            key = os.path.normpath(path)
+            if key not in reported:
+                reported.add(key)
+                new_paths.append(path)
+                output.match(path)
+        if writer is not None and root is not None and new_paths:
+            writer.write_many(root, new_paths)
+            writer.flush()
+        sys.stdout.flush()
+
+    def on_found(root, paths):
+        if not delete:
+            report(root, paths)
+            return
+        for results in iter_delete(paths, 1, engine.is_running, permanent=permanent):
+            for path, error in results:
+                output.deleted(path, error)
+        sys.stdout.flush()
+
+    report(None, matches)  # 最初の検索結果はiter_scannedで書き出し済み
+    watcher.on_found = on_found
+    if engine.is_running():
+        watcher.run()
+    return 0
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.command == "patterns":
+        for pattern, label in BUILTIN_PATTERNS.items():
+            print(f"{pattern}\t{label}")
+        return 0
+    if args.command == "profiles":
+        return list_profiles(args)
+
+    output = Output(args.json, args.quiet)
+    from_file = getattr(args, "from_file", None)
+    if args.profile:
+        if args.roots or args.patterns or args.save_profile:
+            parser.error(
+                "--profile と検索対象・パターン・--save-profile は同時に指定できません"
+            )
+        try:
+            profile = load_profiles().get(args.profile)
+        except (OSError, ValueError) as e:
+            output.message(f"エラー: プロファイルを読み込めません - {str(e)}")
+            return 2
+        if profile is None:
+            parser.error(f"プロファイルが見つかりません - {args.profile}")
+    else:
+        if not args.roots and not from_file:
+            parser.error("検索対象ディレクトリを指定してください")
+        if (
+            args.command == "delete" or (args.command == "watch" and args.delete)
+        ) and not (args.all or args.patterns):
+            # 削除ではディレクトリを含む全パターンを暗黙に対象にしない
+            parser.error("削除するパターンを -p で指定するか、--all を指定してください")
+        profile = build_profile(args, output)
+    if args.command == "watch" and profile.per_device:
+        # 監視には走査した全てのディレクトリが必要だが、子プロセスからは受け取らない
+        parser.error("--per-device は watch と併用できません")
+    if args.save_profile:
+        try:
+            save_profile(profile)
+        except (OSError, ValueError) as e:
+            output.message(f"エラー: プロファイルを保存できません - {str(e)}")
+            return 2
+        output.message(f"プロファイルを保存しました: {args.save_profile}")
+
+    engine = build_engine(args, profile, output)
+    delete_metrics = DeleteMetrics()
+    writer = None
+    try:
+        if args.output:
+            writer = ResultWriter(args.output)
+        if from_file:
+            matches = iter_saved(from_file, engine.matcher, output)
+        elif args.command == "watch":
+            # ctypesの読み込みを避けるため、監視モードでのみ読み込む
+            from clean_sweep_watch import (  # pylint: disable=import-outside-toplevel
+                TreeWatcher,
+            )
+
+            watcher = TreeWatcher(engine, None, output.message)
+            matches = iter_scanned(engine, writer, watcher)
+        else:
+            matches = iter_scanned(engine, writer)
+    except OSError as e:
+        output.message(f"エラー: {str(e)}")
+        return 2
+
+    try:
+        if args.command == "watch":
+            return watch(
+                engine, watcher, matches, writer, output, args.delete, args.permanent
+            )
+        if args.command == "scan" or args.dry_run:
+            count = 0
+            for path in matches:
+                output.match(path)
+                count += 1
+            output.summary(
+                directories=engine.dirs_scanned,
+                entries=engine.files_scanned,
+                matches=count,
+            )
+            # 走査できなかった検索対象があれば、結果が不完全であることを終了コードで示す
+            return 1 if engine.failed_roots else 0
+
+        targets = list(matches)
+        if not targets:
+            output.message("対象ファイルは見つかりませんでした。")
+            return 1 if engine.failed_roots else 0
+        if not args.yes and not confirm(len(targets)):
+            output.message("削除を中止しました（--yes で確認を省略できます）")
+            return 1
+
+        failed = 0
+        for results in iter_delete(
+            targets,
+            workers=args.workers,
+            metrics=delete_metrics,
+            permanent=args.permanent,
+        ):
+            for path, error in results:
+                output.deleted(path, error)
+                failed += error is not None
+        output.summary(deleted=len(targets) - failed, failed=failed)
+        return 1 if failed or engine.failed_roots else 0
+    except KeyboardInterrupt:
+        engine.stop()
+        output.message("中断しました")
+        return 130
+    except OSError as e:
+        # 保存済みの結果ファイルは読み出す時に開くため、ここで開けない場合もある
+        output.message(f"エラー: {str(e)}")
+        return 2
+    finally:
+        if writer is not None:
+            writer.close()
+        if args.metrics:
+            metrics = {} if from_file else {"scan": engine.metrics}
+            if delete_metrics.methods:
+                metrics["delete"] = delete_metrics
+            try:
+                save_metrics(args.metrics, metrics)
+            except OSError as e:
+                output.message(f"エラー: 計測結果を保存できません - {str(e)}")
@@ -0,0 +1,2651 @@
+"""CleanSweepの検索・削除処理（PyQt5に依存しない）
+
+GUI（clean_sweep_gui）とCLI（clean_sweep_cli）の両方から利用する。
+ScanEngine.iter_matches()は一致したパスを見つかった順に返すジェネレーター。
+"""
+
+import os
+import re
+import shutil
+import csv
+import errno
+import heapq
+import fnmatch
+import hashlib
+import json
+import queue
+import sqlite3
+import stat
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+
+# 組み込みのクリーンアップ対象（パターン -> 表示名）
+BUILTIN_PATTERNS = {
+    "Zone.Identifier": "Windows Zone.Identifier ファイル",
+    "Thumbs.db": "Windows サムネイルファイル (Thumbs.db)",
+    ".DS_Store": "macOS システムファイル (.DS_Store)",
+    "._*": "macOS リソースフォーク (._*)",
+    ".AppleDouble/": "macOS リソースフォークディレクトリ (.AppleDouble)",
+    ".fseventsd/": "macOS ファイルシステムイベントログ (.fseventsd)",
+    ".Spotlight-V100/": "macOS Spotlightインデックス (.Spotlight-V100)",
+    ".AppleDB/": "macOS AppleShareデータベース (.AppleDB)",
+    ".AppleDesktop/": "macOS デスクトップデータベース (.AppleDesktop)",
+    ".TemporaryItems/": "一時ファイル格納ディレクトリ (.TemporaryItems)",
+    "Network Trash Folder/": "ネットワークゴミ箱 (Network Trash Folder)",
+}
+
+
+GLOB_CHARS = frozenset("*?[")
+
+
+class _NameTable:
+    """名前を完全一致・接頭辞・接尾辞・グロブに分けて索引化したテーブル"""
+
+    def __init__(self):
+        self.exact = {}  # 完全一致する名前 -> パターン
+        self.prefixes = {}  # 接頭辞のトライ木 (例: "._*")
+        self.suffixes = {}  # 逆順に格納した接尾辞のトライ木 (例: "*.tmp")
+        self.globs = []  # 上記に当てはまらないグロブ
+        self.glob_regex = None
+        # トライ木に追加した (接頭辞・接尾辞, パターン)（保存用）
+        self._prefix_items = []
+        self._suffix_items = []
+
+    @staticmethod
+    def _insert(trie, key, pattern):
+        node = trie
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node.setdefault(None, pattern)  # Noneキーに終端のパターンを保持
+
+    @staticmethod
+    def _lookup(trie, chars):
+        # 名前の長さ分しか辿らないため、パターン数に依存しない
+        node = trie
+        for ch in chars:
+            node = node.get(ch)
+            if node is None:
+                return None
+            pattern = node.get(None)
+            if pattern is not None:
+                return pattern
+        return None
+
+    def add(self, name, pattern):
+        if not GLOB_CHARS.intersection(name):
+            self.exact.setdefault(name, pattern)
+        elif name.endswith("*") and not GLOB_CHARS.intersection(name[:-1]):
+            self._insert(self.prefixes, name[:-1], pattern)
+            self._prefix_items.append((name[:-1], pattern))
+        elif name.startswith("*") and not GLOB_CHARS.intersection(name[1:]):
+            self._insert(self.suffixes, reversed(name[1:]), pattern)
+            self._suffix_items.append((name[1:], pattern))
+        else:
+            self.globs.append((name, pattern))
+
+    def compile(self):
+        if self.globs:
+            # 全グロブを名前付きグループの1つの正規表現にまとめる
+            self.glob_regex = re.compile(
+                "|".join(
+                    f"(?P<g{i}>{fnmatch.translate(name)})"
+                    for i, (name, _) in enumerate(self.globs)
+                )
+            )
+
+    def to_dict(self):
+        """分類・コンパイル済みのテーブルをJSONに変換できる形式で返す"""
+        return {
+            "exact": self.exact,
+            "prefixes": self._prefix_items,
+            "suffixes": self._suffix_items,
+            "globs": self.globs,
+            "glob_regex": self.glob_regex.pattern if self.glob_regex else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """to_dict()の結果から、名前の分類と正規表現の組み立てを省いて復元する"""
+        table = cls()
+        table.exact = dict(data["exact"])
+        for prefix, pattern in data["prefixes"]:
+            table._insert(table.prefixes, prefix, pattern)
+            table._prefix_items.append((prefix, pattern))
+        for suffix, pattern in data["suffixes"]:
+            table._insert(table.suffixes, reversed(suffix), pattern)
+            table._suffix_items.append((suffix, pattern))
+        table.globs = [tuple(item) for item in data["globs"]]
+        if data["glob_regex"] is not None:
+            table.glob_regex = re.compile(data["glob_regex"])
+        return table
+
+    def match(self, name):
+        """一致したパターンを返す（一致しない場合はNone）"""
+        pattern = self.exact.get(name)
+        if pattern is not None:
+            return pattern
+        if self.prefixes:
+            pattern = self._lookup(self.prefixes, name)
+            if pattern is not None:
+                return pattern
+        if self.suffixes:
+            pattern = self._lookup(self.suffixes, reversed(name))
+            if pattern is not None:
+                return pattern
+        if self.glob_regex is not None:
+            m = self.glob_regex.match(name)
+            if m is not None:
+                return self.globs[int(m.lastgroup[1:])][1]
+        return None
+
+
+class PatternMatcher:
+    """検索パターンを検索ごとに1回だけコンパイルし、名前を1回の参照で分類する
+
+    "/"で終わるパターンはディレクトリ、それ以外はファイルに対して照合する。
+    組み込みのパターン（file_typesのキー）と任意のグロブの両方を扱える。
+
+    完全一致・接頭辞（"._*"）・接尾辞（"*.tmp"）のパターンは辞書とトライ木で引くため、
+    1つの名前の照合コストはパターン数に依存しない。それ以外のグロブ（"~$*.tmp" など）は
+    1つの正規表現にまとめて照合するため、コストはそのようなグロブの数に比例して増える。
+
+    Zone.Identifierは、ディレクトリ一覧に現れる "名前:Zone.Identifier"
+    （Linux/WSLへコピーされた代替データストリーム）を接尾辞で照合する。
+    probe_zone_streamsを指定した場合のみ、ファイルごとにストリームを開いて確認する。
+    """
+
+    ZONE_IDENTIFIER = "Zone.Identifier"
+    ZONE_IDENTIFIER_SUFFIX = ":Zone.Identifier"
+
+    def __init__(self, patterns, probe_zone_streams=False):
+        self.patterns = list(patterns)
+        self.files = _NameTable()
+        self.dirs = _NameTable()
+        self.probe_zone_streams = False  # 代替データストリームを開いて確認するか
+
+        for pattern in self.patterns:
+            if pattern == self.ZONE_IDENTIFIER:
+                self.files.add("*" + self.ZONE_IDENTIFIER_SUFFIX, pattern)
+                self.probe_zone_streams = probe_zone_streams
+            elif pattern.endswith("/"):
+                self.dirs.add(pattern.rstrip("/"), pattern)
+            else:
+                self.files.add(pattern, pattern)
+
+        self.files.compile()
+        self.dirs.compile()
+
+    def match_file(self, name):
+        """ファイル名に一致するパターンを返す"""
+        return self.files.match(name)
+
+    def match_dir(self, name):
+        """ディレクトリ名に一致するパターンを返す"""
+        return self.dirs.match(name)
+
+    def to_dict(self):
+        """コンパイル済みのテーブルをJSONに変換できる形式で返す（走査計画の保存に使用）"""
+        return {
+            "patterns": self.patterns,
+            "probe_zone_streams": self.probe_zone_streams,
+            "files": self.files.to_dict(),
+            "dirs": self.dirs.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """to_dict()の結果から復元する"""
+        matcher = cls.__new__(cls)
+        matcher.patterns = list(data["patterns"])
+        matcher.probe_zone_streams = data["probe_zone_streams"]
+        matcher.files = _NameTable.from_dict(data["files"])
+        matcher.dirs = _NameTable.from_dict(data["dirs"])
+        return matcher
+
+    def signature(self):
+        """照合結果に影響する設定を表す文字列（スキャンインデックスの識別に使用）"""
+        return json.dumps(
+            {
+                "patterns": sorted(self.patterns),
+                "probe_zone_streams": self.probe_zone_streams,
+            },
+            sort_keys=True,
+        )
+
+
+# 走査しないWindowsのシステムディレクトリ名（大文字小文字を区別しない）
+SYSTEM_DIR_NAMES = frozenset(
+    name.casefold()
+    for name in (
+        "Program Files",
+        "Program Files (x86)",
+        "Windows",
+        "AppData",
+        "ProgramData",
+        "Recovery",
+    )
+)
+
+
+# 検索対象ごとの除外規則ファイル（検索対象の直下に置く）
+IGNORE_FILE_NAME = ".cleansweepignore"
+
+
+def parse_exclusion_rules(text):
+    """除外規則の文字列を1行1規則として解釈する（空行と#で始まる行は無視）"""
+    rules = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            rules.append(line)
+    return rules
+
+
+def read_ignore_file(path):
+    """除外規則ファイルを読み込む（存在しない・読めない場合は空）"""
+    try:
+        with open(path, encoding="utf-8", errors="surrogateescape") as f:
+            return parse_exclusion_rules(f.read())
+    except OSError:
+        return []
+
+
+class ExclusionRules:
+    """走査しないディレクトリの規則を、パスの要素ごとに1回の参照で判定できる形にまとめる
+
+    規則の書式（.cleansweepignoreも同じ。末尾の "/" は省略可）:
+    - "node_modules" や "*.snapshot" のように区切りを含まない規則は、
+      どの階層でもその名前のディレクトリを除外する（グロブ可）
+    - "photos/cache" や "./build" のように区切りを含む規則は、基準ディレクトリ
+      （検索対象）からの相対パスのディレクトリを除外する（最後の要素のみグロブ可）
+    - 絶対パスはそのディレクトリを除外する
+    組み込みのWindowsシステムディレクトリ名は大文字小文字を区別せずに除外する。
+    """
+
+    def __init__(self, rules=(), builtin=True, base=None):
+        self.rules = list(dict.fromkeys(rule.strip() for rule in rules if rule.strip()))
+        self.builtin_names = SYSTEM_DIR_NAMES if builtin else frozenset()
+        self.base = base
+        self.casefold = (
+            os.path.normcase("A") == "a"
+        )  # Windowsでは大文字小文字を区別しない
+        self.names = _NameTable()
+        self.anchored = {}  # 親ディレクトリ -> 子の名前の_NameTable
+
+        for rule in self.rules:
+            name_rule = rule.rstrip("/\\")
+            if self.casefold:
+                name_rule = name_rule.casefold()
+            if not name_rule:
+                continue
+            if "/" not in name_rule and "\\" not in name_rule:
+                self.names.add(name_rule, rule)
+                continue
+            if not os.path.isabs(name_rule):
+                if base is None:
+                    continue  # 相対パスの規則は検索対象が決まってから解決する
+                name_rule = os.path.join(base, name_rule)
+            parent, name = os.path.split(os.path.normpath(name_rule))
+            table = self.anchored.get(self._key(parent))
+            if table is None:
+                table = self.anchored[self._key(parent)] = _NameTable()
+            table.add(name, rule)
+
+        self.names.compile()
+        for table in self.anchored.values():
+            table.compile()
+
+    @staticmethod
+    def _key(path):
+        return os.path.normcase(path)
+
+    def for_root(self, root, use_ignore_file=True):
+        """検索対象を基準にした規則を返す（.cleansweepignoreがあれば追加する）"""
+        rules = list(self.rules)
+        if use_ignore_file:
+            rules += read_ignore_file(os.path.join(root, IGNORE_FILE_NAME))
+        return ExclusionRules(rules, builtin=bool(self.builtin_names), base=root)
+
+    def is_excluded_name(self, name):
+        """どの階層でも除外するディレクトリ名かどうかを判定"""
+        folded = name.casefold()
+        if folded in self.builtin_names:
+            return True
+        return self.names.match(folded if self.casefold else name) is not None
+
+    def name_filter(self, path):
+        """pathの子ディレクトリ名を除外するかどうかを判定する関数を返す
+
+        パスの比較はディレクトリごとに1回だけ行い、子の判定は名前の参照のみで済ませる。
+        """
+        table = self.anchored.get(self._key(path)) if self.anchored else None
+        if table is None:
+            return self.is_excluded_name
+        casefold = self.casefold
+        is_excluded_name = self.is_excluded_name
+
+        def is_excluded(name):
+            if table.match(name.casefold() if casefold else name) is not None:
+                return True
+            return is_excluded_name(name)
+
+        return is_excluded
+
+    def is_excluded_path(self, path):
+        """パスのいずれかの要素が除外対象かどうかを判定（検索対象自体の確認に使用）"""
+        path = os.path.normpath(path)
+        while True:
+            parent, name = os.path.split(path)
+            if not name:
+                return False
+            if self.name_filter(parent)(name):
+                return True
+            path = parent
+
+
+def allocated_size(st):
+    """削除で解放される容量（割り当てブロック数が分かる場合はそちらを使用）"""
+    blocks = getattr(st, "st_blocks", None)
+    return st.st_size if blocks is None else blocks * 512
+
+
+def list_directory(path, matcher, is_excluded_name, sizes=None, timings=None):
+    """1つのディレクトリを列挙し、(エントリ数, 一致したパス, 下降するサブディレクトリ) を返す
+
+    DirEntryが持つ種別情報を再利用するため、通常は追加のstatを発行しない。
+    除外判定は子ディレクトリ名に対して行い、除外されたツリーは開かない。
+    sizesを指定した場合、一致したファイルの容量を {パス: バイト数} として記録する
+    （WindowsではDirEntryが保持するstatをそのまま使用する）。
+    timingsを指定した場合、[一覧の取得, 照合（ストリームの直接確認を含む）] にかかった
+    秒数を加算する。
+    """
+    found = []
+    subdirs = []
+    match_file = matcher.match_file
+    match_dir = matcher.match_dir
+    probe_zone = matcher.probe_zone_streams
+    zone_suffix = PatternMatcher.ZONE_IDENTIFIER_SUFFIX
+
+    # 一覧の取得（I/O）と照合（CPU）の時間を分けて計れるよう、先に全て読み出す
+    started = time.perf_counter()
+    with os.scandir(path) as it:
+        entries = list(it)
+    listed = time.perf_counter()
+
+    for entry in entries:
+        name = entry.name
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+
+        if is_dir:
+            if match_dir(name) is not None:
+                # 一致したディレクトリは丸ごと削除対象なので中には入らない
+                found.append(entry.path)
+            elif not entry.is_symlink() and not is_excluded_name(name):
+                subdirs.append(entry.path)
+            continue
+
+        if match_file(name) is not None:
+            found.append(entry.path)
+            if sizes is not None:
+                try:
+                    sizes[entry.path] = allocated_size(
+                        entry.stat(follow_symlinks=False)
+                    )
+                except OSError:
+                    pass
+
+        if probe_zone and not name.endswith(zone_suffix):
+            stream_path = entry.path + zone_suffix
+            try:
+                # 代替データストリームの存在確認（OS非依存の方法）
+                with open(stream_path, "rb"):
+                    found.append(stream_path)
+            except OSError:
+                pass
+
+    if probe_zone:
+        # 一覧に現れたストリームと開いて確認したストリームの重複を除く
+        found = list(dict.fromkeys(found))
+
+    if timings is not None:
+        timings[0] += listed - started
+        timings[1] += time.perf_counter() - listed
+    return len(entries), found, subdirs
+
+
+def _never_excluded(_name):
+    return False
+
+
+def walk_matches(top, scan, is_running):
+    """topから深さ優先に走査し、ディレクトリごとに結果を返すジェネレーター
+
+    scanは1つのディレクトリを受け取り、list_directory()と同じ形式の結果を返す関数。
+    (ディレクトリ, エントリ数, 一致したパス) のタプルを順に返す。
+    列挙できないディレクトリ（アクセス権限なし等）は黙ってスキップする。
+    """
+    stack = [top]
+    while stack and is_running():
+        current = stack.pop()
+        try:
+            entry_count, found, subdirs = scan(current)
+        except OSError:
+            continue
+        # 一覧で返された順（scandirの順で、名前順とは限らない）に前から辿るよう逆順に積む
+        stack.extend(reversed(subdirs))
+        yield current, entry_count, found
+
+
+def iter_verify(
+    paths, matcher, is_running=lambda: True, batch_size=1000, list_batch_size=50
+):
+    """削除したパスとその親ディレクトリだけを再確認し、結果を順に返す
+
+    (なくなったパスの一覧, 親ディレクトリで新たに見つかったパスの一覧) を返す。
+    最初に全てのパスの有無を確認してなくなったパスをまとめて返し、
+    その後は親ディレクトリの一覧で見つかったパスをlist_batch_size個ごとに返す。
+    コストは全体の大きさではなく、確認するパスの数に比例する。
+    is_runningがFalseを返した時点で残りは確認せずに終了する。
+    """
+    targets = [os.path.normpath(path) for path in paths]
+    gone = []
+    remaining = set()
+    parents = {}  # 親ディレクトリ（確認した順に保持）
+    for start in range(0, len(targets), batch_size):
+        if not is_running():
+            return
+        for path in targets[start : start + batch_size]:
+            parents[os.path.dirname(path)] = None
+            try:
+                os.lstat(path)
+            except FileNotFoundError:
+                gone.append(path)
+                continue
+            except OSError:
+                pass  # 確認できない場合は残っているものとして扱う
+            remaining.add(path)
+    yield gone, []
+
+    parents = list(parents)
+    for start in range(0, len(parents), list_batch_size):
+        if not is_running():
+            return
+        discovered = []
+        for parent in parents[start : start + list_batch_size]:
+            try:
+                # サブディレクトリには下降しないため、全て除外扱いにする
+                _, found, _ = list_directory(parent, matcher, lambda _name: True)
+            except OSError:
+                continue
+            discovered.extend(p for p in found if os.path.normpath(p) not in remaining)
+        if discovered:
+            yield [], discovered
+
+
+class ParallelWalker:
+    """1つのルートを複数のワーカースレッドで並列に走査する（ワークスティーリング方式）
+
+    各ワーカーは自分の両端キューの末尾からディレクトリを取り出し、空になると
+    他のワーカーのキューの先頭から盗む。結果は1つのキューに集約され、
+    walk()がwalk_matches()と同じ形式のタプルとして呼び出し側に返す。
+    OSError以外の例外はwalk_matches()と同様にwalk()から送出され、
+    残りのワーカーもそこで終了する。
+    ワーカーはデーモンスレッドのため、停止された場合は応答しない一覧
+    （停止したネットワークドライブ等）の完了を待たずにwalk()から戻る。
+    """
+
+    _DONE = object()
+    POLL_INTERVAL = 0.1  # 結果を待つ間に停止を確認する間隔（秒）
+
+    def __init__(self, scan, is_running, workers, initializer=None):
+        self.scan = scan  # 1つのディレクトリを走査する関数（walk_matchesと同じ）
+        self.is_running = is_running
+        self.workers = max(1, workers)
+        self.initializer = initializer  # 各ワーカーの開始時に呼び出す関数
+        self._deques = []
+        self._results = None
+        self._cond = threading.Condition()
+        self._pending = 0  # キューに積まれたが処理が終わっていないディレクトリ数
+        self._idle = 0  # 仕事を待っているワーカー数
+        self._closed = False
+
+    def walk(self, top):
+        self._deques = [deque() for _ in range(self.workers)]
+        self._deques[0].append(top)
+        self._results = queue.Queue()
+        self._pending = 1
+        self._idle = 0
+        self._closed = False
+
+        threads = [
+            threading.Thread(target=self._work, args=(i,), daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        remaining = self.workers
+        try:
+            while remaining:
+                try:
+                    item = self._results.get(timeout=self.POLL_INTERVAL)
+                except queue.Empty:
+                    if not self.is_running():
+                        break  # 一覧の途中で止まっているワーカーは待たない
+                    continue
+                if item is self._DONE:
+                    remaining -= 1
+                    continue
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # 呼び出し側が途中で止めた場合もワーカーを終了させる
+            with self._cond:
+                self._closed = True
+                self._cond.notify_all()
+
+    def _active(self):
+        return not self._closed and self.is_running()
+
+    def _steal(self, index):
+        for offset in range(1, self.workers):
+            victim = self._deques[(index + offset) % self.workers]
+            try:
+                return victim.popleft()
+            except IndexError:
+                continue
+        return None
+
+    def _work(self, index):
+        own = self._deques[index]
+        if self.initializer is not None:
+            self.initializer()
+        try:
+            while self._active():
+                try:
+                    path = own.pop()
+                except IndexError:
+                    path = self._steal(index)
+
+                if path is None:
+                    with self._cond:
+                        if self._pending == 0 or self._closed:
+                            break
+                        self._idle += 1
+                        self._cond.wait(0.05)
+                        self._idle -= 1
+                    continue
+
+                subdirs = ()
+                try:
+                    entry_count, found, subdirs = self.scan(path)
+                except OSError:
+                    pass
+                except Exception as e:  # pylint: disable=broad-except
+                    # インデックスの異常等はwalk()から呼び出し側に伝える
+                    self._results.put(e)
+                else:
+                    self._results.put((path, entry_count, found))
+                finally:
+                    with self._cond:
+                        # 先にサブディレクトリ分を加算し、未処理数が一時的に0にならないようにする
+                        self._pending += len(subdirs) - 1
+                        own.extend(reversed(subdirs))
+                        if self._pending == 0 or (subdirs and self._idle):
+                            self._cond.notify_all()
+        finally:
+            self._results.put(self._DONE)
+
+
+# 設定やインデックスを保存するディレクトリ
+CONFIG_DIR = os.path.join(os.path.expanduser("~"), ".cleansweep")
+DEFAULT_INDEX_PATH = os.path.join(CONFIG_DIR, "scan_index.sqlite3")
+
+
+class ScanIndex:
+    """ディレクトリごとの走査結果をSQLiteに保存し、差分検索に利用するインデックス
+
+    ディレクトリのmtimeとinodeが前回と同じであれば一覧を取り直さず、
+    保存済みのエントリ数・一致した名前・サブディレクトリ名を返す。
+    検索条件（signature）が変わった場合は保存済みの内容を破棄する。
+    複数のワーカースレッドから呼ばれるため、データベース操作はロックで保護する。
+    """
+
+    # mtimeの分解能より短い間の変更を見逃さないよう、直近に変更された
+    # ディレクトリは次回必ず一覧を取り直す
+    RACY_SECONDS = 2.0
+    WRITE_BATCH = 500
+
+    def __init__(self, path, signature):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending = []
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dirs ("
+            "path BLOB PRIMARY KEY, mtime_ns INTEGER, ino INTEGER, "
+            "entry_count INTEGER, subdirs BLOB, found BLOB) WITHOUT ROWID"
+        )
+        row = self._conn.execute(
+            "SELECT value FROM meta WHERE key = 'signature'"
+        ).fetchone()
+        if row is None or row[0] != signature:
+            with self._conn:
+                self._conn.execute("DELETE FROM dirs")
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('signature', ?)",
+                    (signature,),
+                )
+
+    # パスや名前はUTF-8として不正なファイル名も扱えるようバイト列で保存する
+    @staticmethod
+    def _join(names):
+        return b"\0".join(os.fsencode(name) for name in names)
+
+    @staticmethod
+    def _split(prefix, joined):
+        if not joined:
+            return []
+        return [prefix + os.fsdecode(name) for name in joined.split(b"\0")]
+
+    def scan(self, path, matcher, st=None):
+        """変更がなければインデックスから、あれば一覧を取り直して結果を返す
+
+        除外規則を変えても再利用できるよう、サブディレクトリは除外前の一覧を保存する。
+        """
+        if st is None:
+            st = os.stat(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT mtime_ns, ino, entry_count, subdirs, found "
+                "FROM dirs WHERE path = ?",
+                (os.fsencode(path),),
+            ).fetchone()
+        prefix = os.path.join(path, "")
+        if row is not None and row[0] == st.st_mtime_ns and row[1] == st.st_ino:
+            self.hits += 1
+            return row[2], self._split(prefix, row[4]), self._split(prefix, row[3])
+
+        self.misses += 1
+        entry_count, found, subdirs = list_directory(path, matcher, _never_excluded)
+        mtime_ns = st.st_mtime_ns
+        if time.time() - mtime_ns / 1e9 < self.RACY_SECONDS:
+            mtime_ns = -1
+        record = (
+            os.fsencode(path),
+            mtime_ns,
+            st.st_ino,
+            entry_count,
+            self._join(p[len(prefix) :] for p in subdirs),
+            self._join(p[len(prefix) :] for p in found),
+        )
+        with self._lock:
+            self._pending.append(record)
+            if len(self._pending) >= self.WRITE_BATCH:
+                self._flush_locked()
+        return entry_count, found, subdirs
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?, ?)", self._pending
+            )
+        self._pending = []
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
+
+
+# 容量情報のキャッシュ（マウントポイント -> (取得時刻, 容量)）
+USAGE_CACHE_SECONDS = 30.0
+_usage_cache = {}
+_usage_cache_lock = threading.Lock()
+
+
+def is_network_partition(partition):
+    """psutilのパーティション情報がネットワークドライブかどうかを判定"""
+    return (
+        "network" in partition.opts.lower()
+        or partition.fstype in ["nfs", "cifs", "smbfs"]
+        or (os.name == "nt" and partition.mountpoint.startswith("//"))
+    )
+
+
+def _probe_usage(index, partition, results):
+    import psutil  # pylint: disable=import-outside-toplevel
+
+    try:
+        usage = psutil.disk_usage(partition.mountpoint)
+    except (PermissionError, OSError):
+        usage = None
+    with _usage_cache_lock:
+        _usage_cache[partition.mountpoint] = (time.monotonic(), usage)
+    results.put((index, partition, usage, True))
+
+
+def iter_partitions(timeout=2.0):
+    """マウントされているパーティションを列挙し、容量の取得が終わった順に返す
+
+    (列挙順の番号, パーティション, 容量またはNone, 応答したか) を返す。
+    容量はマウントごとに別スレッドで取得し、timeout秒以内に応答しないものは
+    応答なしとして返す（取得スレッドは待たずに放置する）。
+    ネットワークドライブは容量を取得しない。取得結果は短時間キャッシュする。
+    """
+    import psutil  # pylint: disable=import-outside-toplevel
+
+    partitions = psutil.disk_partitions(all=True)
+    results = queue.Queue()
+    now = time.monotonic()
+    for index, partition in enumerate(partitions):
+        if is_network_partition(partition):
+            results.put((index, partition, None, True))
+            continue
+        with _usage_cache_lock:
+            cached = _usage_cache.get(partition.mountpoint)
+        if cached is not None and now - cached[0] < USAGE_CACHE_SECONDS:
+            results.put((index, partition, cached[1], True))
+            continue
+        threading.Thread(
+            target=_probe_usage, args=(index, partition, results), daemon=True
+        ).start()
+
+    deadline = now + timeout
+    resolved = set()
+    while len(resolved) < len(partitions):
+        try:
+            item = results.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            break
+        resolved.add(item[0])
+        yield item
+
+    for index, partition in enumerate(partitions):
+        if index not in resolved:
+            yield index, partition, None, False
+
+
+def call_detached(func, is_running, poll_interval=0.1):
+    """funcを別スレッドで呼び出し、その結果を返す（funcの例外はそのまま送出する）
+
+    応答しないネットワークドライブ等で止まっても、is_runningがFalseを返した時点で
+    待つのをやめてNoneを返す（呼び出したスレッドは待たずに放置する）。
+    """
+    results = queue.Queue()
+
+    def run():
+        try:
+            results.put((True, func()))
+        except Exception as e:  # pylint: disable=broad-except
+            results.put((False, e))
+
+    threading.Thread(target=run, daemon=True).start()
+    while True:
+        try:
+            ok, value = results.get(timeout=poll_interval)
+        except queue.Empty:
+            if not is_running():
+                return None
+            continue
+        if not ok:
+            raise value
+        return value
+
+
+# 走査しても意味のない擬似・仮想ファイルシステムの種類
+# （tmpfs・overlayは/tmpやコンテナのルートとして実際のファイルを置くため含めない）
+PSEUDO_FS_TYPES = frozenset(
+    {
+        "autofs",
+        "binfmt_misc",
+        "bpf",
+        "cgroup",
+        "cgroup2",
+        "configfs",
+        "debugfs",
+        "devfs",
+        "devpts",
+        "devtmpfs",
+        "efivarfs",
+        "fdescfs",
+        "fusectl",
+        "hugetlbfs",
+        "mqueue",
+        "nsfs",
+        "proc",
+        "procfs",
+        "pstore",
+        "rpc_pipefs",
+        "securityfs",
+        "selinuxfs",
+        "squashfs",
+        "sysfs",
+        "tracefs",
+    }
+)
+
+
+def is_pseudo_partition(partition):
+    """psutilのパーティション情報が擬似・仮想ファイルシステムかどうかを判定"""
+    return partition.fstype.lower() in PSEUDO_FS_TYPES
+
+
+def _is_within(path, parent):
+    if path == parent:
+        return True
+    return path.startswith(parent if parent.endswith(os.sep) else parent + os.sep)
+
+
+def list_partitions():
+    """擬似ファイルシステムを含む全てのマウントを返す（取得できない場合は空）"""
+    import psutil  # pylint: disable=import-outside-toplevel
+
+    try:
+        return psutil.disk_partitions(all=True)
+    except OSError:
+        return []
+
+
+def pseudo_mountpoints(partitions):
+    """擬似・仮想ファイルシステムのマウント先の集合を返す（走査中の除外に使用）"""
+    return {
+        os.path.normcase(os.path.realpath(p.mountpoint))
+        for p in partitions
+        if is_pseudo_partition(p)
+    }
+
+
+def normalize_root(root):
+    """検索対象を絶対パスに正規化する（シンボリックリンクは解決しない）"""
+    # ドライブレターの場合、ルートパスに変換
+    if len(root) == 2 and root[1] == ":":
+        root = root + "\\"
+    return os.path.abspath(root)
+
+
+def plan_roots(roots, partitions=None, on_message=None):
+    """検索対象を走査前に整理し、実際に走査するルートの一覧を返す
+
+    - ドライブレター（"C:"）をルートパスに変換し、絶対パスに正規化する
+    - 同じディレクトリや、他のルートの配下にあるルートを除く
+    - 擬似・仮想ファイルシステム（proc、sysfs等）上のルートを除く
+    partitionsを省略した場合はlist_partitions()から取得する。
+    """
+    on_message = on_message or (lambda _message: None)
+    if partitions is None:
+        partitions = list_partitions()
+    # 最も深いマウントポイントから判定できるよう長い順に並べる
+    mounts = sorted(
+        ((os.path.normcase(os.path.realpath(p.mountpoint)), p) for p in partitions),
+        key=lambda item: len(item[0]),
+        reverse=True,
+    )
+
+    candidates = []
+    for root in roots:
+        root = normalize_root(root)
+        real = os.path.normcase(os.path.realpath(root))
+        mount = next((p for m, p in mounts if _is_within(real, m)), None)
+        if mount is not None and is_pseudo_partition(mount):
+            on_message(f"スキップ: {root} ({mount.fstype})")
+            continue
+        candidates.append((real, root))
+
+    # 浅い順に調べ、既に採用したルートと同じか、その配下にあるものを除く
+    planned = []
+    for position in sorted(range(len(candidates)), key=lambda i: len(candidates[i][0])):
+        real = candidates[position][0]
+        if not any(_is_within(real, candidates[i][0]) for i in planned):
+            planned.append(position)
+
+    # 指定された順序を保つ
+    return [candidates[i][1] for i in sorted(planned)]
+
+
+def physical_device(st_dev):
+    """st_devを物理デバイスを表すキーに変換する
+
+    Linuxではパーティション（sda1等）をディスク（sda）に、ループデバイス（snap等）を
+    元のファイルがあるディスクにまとめる。判別できない場合はst_devをそのまま返す。
+    """
+    if not sys.platform.startswith("linux"):
+        return st_dev
+    for _ in range(4):  # ループデバイスの入れ子は数段まで
+        path = os.path.realpath(f"/sys/dev/block/{os.major(st_dev)}:{os.minor(st_dev)}")
+        if not os.path.isdir(path):
+            return st_dev  # ネットワーク共有・tmpfs等（デバイスごとに独立）
+        try:
+            with open(
+                os.path.join(path, "loop", "backing_file"), encoding="utf-8"
+            ) as f:
+                st_dev = os.stat(f.read().strip()).st_dev
+            continue
+        except OSError:
+            pass
+        if os.path.exists(os.path.join(path, "partition")):
+            path = os.path.dirname(path)
+        return os.path.basename(path)
+    return st_dev
+
+
+def shard_roots(roots, partitions=None, one_device=False):
+    """整理済みの検索対象を物理デバイスごとのグループに分ける
+
+    検索対象の配下にある別のファイルシステムのマウント先は（one_deviceでなければ）
+    独立した検索対象として切り出し、元のデバイスのグループからは除外する。
+    [(デバイス, 検索対象の一覧, 除外する絶対パスの一覧)] を返す。
+    """
+    if partitions is None:
+        partitions = list_partitions()
+
+    def key(path):
+        return os.path.normcase(os.path.realpath(path))
+
+    expanded = list(roots)
+    if not one_device:
+        root_keys = [key(root) for root in roots]
+        known = set(root_keys)
+        pseudo = pseudo_mountpoints(partitions)  # /sys・/dev等の配下のマウントは除く
+        for partition in partitions:
+            mount = partition.mountpoint
+            mount_key = key(mount)
+            if (
+                not is_pseudo_partition(partition)
+                and mount_key not in known
+                and any(_is_within(mount_key, root) for root in root_keys)
+                and not any(_is_within(mount_key, p) for p in pseudo)
+            ):
+                known.add(mount_key)
+                expanded.append(mount)
+
+    groups = {}
+    for root in expanded:
+        try:
+            device = physical_device(os.stat(root).st_dev)
+        except OSError:
+            device = root  # 走査時にエラーとして報告される
+        groups.setdefault(device, []).append(root)
+
+    shards = []
+    for device, group in groups.items():
+        group_keys = [key(root) for root in group]
+        excluded = [
+            other
+            for other in expanded
+            if other not in group
+            and any(_is_within(key(other), root) for root in group_keys)
+        ]
+        shards.append((device, group, excluded))
+    return shards
+
+
+class VisitedSet:
+    """走査済みディレクトリの (st_dev, st_ino) を記録する（複数スレッドから利用可）"""
+
+    def __init__(self):
+        self._keys = set()
+        self._lock = threading.Lock()
+
+    def add(self, st):
+        """未走査であれば記録してTrueを返す"""
+        key = (st.st_dev << 64) | st.st_ino  # タプルより省メモリな整数キー
+        with self._lock:
+            if key in self._keys:
+                return False
+            self._keys.add(key)
+            return True
+
+
+class ScanThrottle:
+    """走査の速度を制限する（トークンバケット + 遅延に応じたバックオフ）
+
+    dirs_per_second・entries_per_secondは1秒あたりの上限（Noneで無制限）。
+    adaptiveを指定した場合、ディレクトリ1つの一覧にかかる時間が普段より長くなると
+    （ストレージが混み合っていると）上限を下げ、走査した時間に比例した休止を挟む。
+    複数のワーカースレッドから同時に呼び出せる。
+    """
+
+    BURST_SECONDS = 0.5  # 上限を超えずにまとめて処理できる量（秒数分）
+    MAX_SLEEP = 0.1  # 停止を確認する間隔（秒）
+    MAX_BACKOFF = 16.0
+    FAST_ALPHA = 0.2  # 直近の遅延の平滑化係数
+    SLOW_ALPHA = 0.01  # 普段の遅延の平滑化係数
+    CONGESTION_RATIO = 2.0  # 直近の遅延が普段の何倍になったら混雑とみなすか
+
+    def __init__(self, dirs_per_second=None, entries_per_second=None, adaptive=False):
+        self.dirs_per_second = dirs_per_second or None
+        self.entries_per_second = entries_per_second or None
+        self.adaptive = adaptive
+        self.backoff = 1.0  # 1より大きいほど速度を落とす
+        self.throttled_seconds = 0.0  # 制限のために休止した合計時間
+        self._fast_latency = None
+        self._slow_latency = None
+        self._next_dir = 0.0
+        self._next_entry = 0.0
+        self._lock = threading.Lock()
+
+    def _observe(self, latency):
+        if self._fast_latency is None:
+            self._fast_latency = self._slow_latency = latency
+            return
+        self._fast_latency += self.FAST_ALPHA * (latency - self._fast_latency)
+        self._slow_latency += self.SLOW_ALPHA * (latency - self._slow_latency)
+        if self._fast_latency > self._slow_latency * self.CONGESTION_RATIO:
+            self.backoff = min(self.backoff * 1.5, self.MAX_BACKOFF)
+        else:
+            self.backoff = max(1.0, self.backoff * 0.95)
+
+    def _reserve(self, next_time, now, cost, rate):
+        start = max(next_time, now - self.BURST_SECONDS)
+        return start + cost * self.backoff / rate
+
+    def wait(self, entry_count, latency, is_running=lambda: True):
+        """1つのディレクトリを走査した後に呼び出し、上限を超えないよう休止する"""
+        now = time.monotonic()
+        until = now
+        with self._lock:
+            if self.adaptive:
+                self._observe(latency)
+                # 混雑している間は走査に使った時間に比例して休止する
+                until = now + latency * (self.backoff - 1.0)
+            if self.dirs_per_second:
+                self._next_dir = self._reserve(
+                    self._next_dir, now, 1, self.dirs_per_second
+                )
+                until = max(until, self._next_dir)
+            if self.entries_per_second and entry_count:
+                self._next_entry = self._reserve(
+                    self._next_entry, now, entry_count, self.entries_per_second
+                )
+                until = max(until, self._next_entry)
+            if until > now:
+                self.throttled_seconds += until - now
+
+        while is_running():
+            remaining = until - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, self.MAX_SLEEP))
+
+
+def lower_thread_priority():
+    """呼び出したスレッドのCPU・I/O優先度を下げ、適用できなかった理由を返す（成功時はNone）
+
+    Linuxではスレッド単位でnice値を上げ、I/Oスケジューリングクラスをidleにする。
+    Windowsではスレッドをバックグラウンドモード（CPU・I/O・メモリの優先度を低下）にする。
+    Linuxでは以降に作成したスレッドにも引き継がれる。
+    """
+    try:
+        if sys.platform == "win32":
+            import ctypes  # pylint: disable=import-outside-toplevel
+
+            kernel32 = ctypes.windll.kernel32
+            thread_mode_background_begin = 0x00010000
+            if not kernel32.SetThreadPriority(
+                kernel32.GetCurrentThread(), thread_mode_background_begin
+            ):
+                return "SetThreadPriorityに失敗しました"
+        elif sys.platform.startswith("linux"):
+            import psutil  # pylint: disable=import-outside-toplevel
+
+            # Linuxのスレッドは個別のPIDとして優先度を設定できる
+            thread = psutil.Process(threading.get_native_id())
+            thread.nice(max(thread.nice(), 10))
+            thread.ionice(psutil.IOPRIO_CLASS_IDLE)
+        elif hasattr(os, "PRIO_DARWIN_THREAD"):
+            os.setpriority(os.PRIO_DARWIN_THREAD, 0, os.PRIO_DARWIN_BG)
+        else:
+            return "この環境では優先度を変更できません"
+    except Exception as e:  # pylint: disable=broad-except
+        return str(e)  # OSErrorのほかpsutil.AccessDenied等
+    return None
+
+
+class ScanProgress(
+    namedtuple(
+        "ScanProgress",
+        [
+            "root",  # 検索中のルート
+            "current_dir",  # 直近に走査したディレクトリ
+            "dirs_scanned",  # 走査済みディレクトリ数
+            "files_scanned",  # 走査済みエントリ数
+            "matches",  # 見つかった件数
+            "elapsed",  # 検索開始からの経過秒数
+            "throttled",  # 速度制限のために休止した秒数
+        ],
+        defaults=[0.0],
+    )
+):
+    """検索の進捗（一定間隔でサンプリングして通知する）"""
+
+    __slots__ = ()
+
+    @property
+    def dirs_per_second(self):
+        return self.dirs_scanned / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def _tally(table, key, path, limit):
+    """key別の件数を数え、先頭のlimit件のパスを例として残す"""
+    entry = table.get(key)
+    if entry is None:
+        entry = table[key] = {"count": 0, "samples": []}
+    entry["count"] += 1
+    if len(entry["samples"]) < limit:
+        entry["samples"].append(path)
+
+
+def error_kind(error):
+    """走査・削除時の例外を計測用の種別に分類"""
+    if isinstance(error, PermissionError):
+        return "permission"
+    if isinstance(error, FileNotFoundError):
+        return "not_found"
+    return "os_error"
+
+
+# 計測結果の表示名
+METRIC_LABELS = {
+    "permission": "アクセス権限なし",
+    "not_found": "見つからない（走査中に削除）",
+    "os_error": "その他のOSエラー",
+    "excluded": "除外規則",
+    "excluded_root": "除外された検索対象",
+    "other_device": "別のファイルシステム",
+    "already_visited": "走査済み（バインドマウント等）",
+    "pseudo_fs": "擬似ファイルシステム",
+    "process_failed": "走査プロセスの異常終了",
+}
+
+
+class ScanMetrics:
+    """検索の計測結果（どこに時間がかかったか、何を読み飛ばしたか）
+
+    一覧の取得・照合の時間はワーカースレッドごとの合計のため、並列走査では
+    経過時間を超えることがある。結果の送出（呼び出し側の処理）の時間は
+    scan()の呼び出し側に制御が戻っていた時間を表す。複数のスレッドから同時に記録できる。
+    """
+
+    SLOWEST_COUNT = 20  # 残す遅いディレクトリの数
+    SAMPLE_COUNT = 20  # エラー・スキップの種別ごとに残すパスの数
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+        self.listing_seconds = 0.0
+        self.matching_seconds = 0.0
+        self.emitting_seconds = 0.0
+        self.throttled_seconds = 0.0
+        self.roots = {}  # 検索対象 -> ディレクトリ数・エントリ数・一致数・秒数
+        self.errors = {}  # 種別 -> 件数と例
+        self.skipped = {}  # 理由 -> 件数と例
+        self.backlog_batches = 0  # 送出したが受け取られていない結果のまとまりの最大数
+        self.backlog_paths = 0  # その時点で受け取られていないパスの最大数
+        self._slowest = []  # (秒数, ディレクトリ, エントリ数) のヒープ
+        self._lock = threading.Lock()
+
+    def record_directory(self, path, entry_count, listing, matching):
+        with self._lock:
+            self.listing_seconds += listing
+            self.matching_seconds += matching
+            item = (listing + matching, path, entry_count)
+            if len(self._slowest) < self.SLOWEST_COUNT:
+                heapq.heappush(self._slowest, item)
+            elif item > self._slowest[0]:
+                heapq.heapreplace(self._slowest, item)
+
+    def record_error(self, path, error):
+        with self._lock:
+            _tally(self.errors, error_kind(error), path, self.SAMPLE_COUNT)
+
+    def record_skip(self, reason, path):
+        with self._lock:
+            _tally(self.skipped, reason, path, self.SAMPLE_COUNT)
+
+    def record_failed_root(self, root):
+        """走査を終えられなかった検索対象を記録する"""
+        with self._lock:
+            _tally(self.errors, "process_failed", root, self.SAMPLE_COUNT)
+
+    def record_root(self, root, directories, entries, matches, seconds):
+        self.roots[root] = {
+            "directories": directories,
+            "entries": entries,
+            "matches": matches,
+            "seconds": seconds,
+        }
+
+    def record_backlog(self, batches, paths):
+        self.backlog_batches = max(self.backlog_batches, batches)
+        self.backlog_paths = max(self.backlog_paths, paths)
+
+    def finish(self, throttled_seconds=0.0):
+        self.elapsed = time.monotonic() - self.started
+        self.throttled_seconds = throttled_seconds
+
+    def merge(self, other):
+        """別プロセスの計測結果（to_dict()の形式）を合算する（経過時間は合算しない）"""
+        with self._lock:
+            self.listing_seconds += other["listing_seconds"]
+            self.matching_seconds += other["matching_seconds"]
+            self.emitting_seconds += other["emitting_seconds"]
+            self.throttled_seconds += other["throttled_seconds"]
+            self.roots.update(other["roots"])
+            for mine, theirs in (
+                (self.errors, other["errors"]),
+                (self.skipped, other["skipped"]),
+            ):
+                for key, entry in theirs.items():
+                    target = mine.setdefault(key, {"count": 0, "samples": []})
+                    target["count"] += entry["count"]
+                    room = self.SAMPLE_COUNT - len(target["samples"])
+                    target["samples"].extend(entry["samples"][:room])
+            for item in other["slowest_directories"]:
+                item = (item["seconds"], item["path"], item["entries"])
+                if len(self._slowest) < self.SLOWEST_COUNT:
+                    heapq.heappush(self._slowest, item)
+                elif item > self._slowest[0]:
+                    heapq.heapreplace(self._slowest, item)
+
+    def slowest(self):
+        """時間のかかったディレクトリを (秒数, ディレクトリ, エントリ数) の遅い順で返す"""
+        with self._lock:
+            return sorted(self._slowest, reverse=True)
+
+    def bottleneck(self):
+        """律速している処理の説明を返す（判断できない場合はNone）"""
+        if self.elapsed > 0 and self.throttled_seconds >= self.elapsed * 0.5:
+            return "速度制限（低負荷モード）による休止が大半を占めています"
+        total = self.listing_seconds + self.matching_seconds + self.emitting_seconds
+        if total <= 0:
+            return None
+        if self.listing_seconds >= total * 0.6:
+            return "ストレージ律速: ディレクトリ一覧の取得に時間がかかっています"
+        if self.emitting_seconds >= total * 0.4:
+            return "結果の処理（画面への追加・書き出し）に時間がかかっています"
+        return "CPU律速: 照合・結果の処理に時間がかかっています"
+
+    def to_dict(self):
+        """JSONに変換できる形式で返す"""
+        return {
+            "elapsed": self.elapsed,
+            "listing_seconds": self.listing_seconds,
+            "matching_seconds": self.matching_seconds,
+            "emitting_seconds": self.emitting_seconds,
+            "throttled_seconds": self.throttled_seconds,
+            "bottleneck": self.bottleneck(),
+            "roots": self.roots,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "slowest_directories": [
+                {"path": path, "seconds": seconds, "entries": entries}
+                for seconds, path, entries in self.slowest()
+            ],
+            "signal_backlog": {
+                "batches": self.backlog_batches,
+                "paths": self.backlog_paths,
+            },
+        }
+
+    def report(self):
+        """表示用の計測結果を返す"""
+        lines = [
+            f"経過時間: {self.elapsed:.2f} 秒",
+            f"一覧の取得: {self.listing_seconds:.2f} 秒",
+            f"照合: {self.matching_seconds:.2f} 秒",
+            f"結果の処理: {self.emitting_seconds:.2f} 秒",
+        ]
+        if self.throttled_seconds:
+            lines.append(f"速度制限による休止: {self.throttled_seconds:.2f} 秒")
+        bottleneck = self.bottleneck()
+        if bottleneck:
+            lines.append(bottleneck)
+        if self.backlog_batches:
+            lines.append(
+                f"未処理の結果の最大数: {self.backlog_batches:,} 回分"
+                f"（{self.backlog_paths:,} 件）"
+            )
+
+        lines += ["", "検索対象:"]
+        for root, counts in self.roots.items():
+            lines.append(
+                f"  {root}: {counts['directories']:,} ディレクトリ / "
+                f"{counts['entries']:,} エントリ / 一致 {counts['matches']:,} 件 "
+                f"({counts['seconds']:.2f} 秒)"
+            )
+        for title, table in (("エラー:", self.errors), ("スキップ:", self.skipped)):
+            if not table:
+                continue
+            lines += ["", title]
+            for key, entry in table.items():
+                lines.append(f"  {METRIC_LABELS.get(key, key)}: {entry['count']:,} 件")
+                lines += [f"    {path}" for path in entry["samples"][:5]]
+        slowest = self.slowest()
+        if slowest:
+            lines += ["", "時間のかかったディレクトリ:"]
+            for seconds, path, entries in slowest:
+                lines.append(
+                    f"  {seconds * 1000:,.1f} ms ({entries:,} エントリ) {path}"
+                )
+        return "\n".join(lines)
+
+
+def save_metrics(path, metrics):
+    """{"scan": ScanMetrics, "delete": DeleteMetrics} の計測結果をJSONで保存する
+
+    保存できない場合はOSErrorを送出する。
+    """
+    data = {kind: item.to_dict() for kind, item in metrics.items()}
+    with open(path, "w", encoding="utf-8", errors="surrogateescape") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+class ScanEngine:
+    """検索処理の本体
+
+    scan()は走査したディレクトリごとに (ルート, ディレクトリ, 一致したパス) を返し、
+    iter_matches()は一致したパスだけを順に返す。どちらもジェネレーターなので、
+    結果は全件を溜めずに逐次取り出せる。状態メッセージはon_messageに渡される。
+    """
+
+    def __init__(
+        self,
+        patterns,
+        roots,
+        workers=1,
+        probe_zone_streams=False,
+        index_path=None,
+        on_message=None,
+        one_device=False,
+        dedupe=True,
+        exclude=(),
+        use_ignore_files=True,
+        collect_sizes=False,
+        throttle=None,
+        low_priority=False,
+        detached=False,
+        plan=None,
+    ):
+        self.patterns = list(patterns)
+        self.probe_zone_streams = probe_zone_streams
+        self._matcher = None  # 走査計画を使わない場合は最初に使う時にコンパイルする
+        self.plan = None  # 保存済みの走査計画（ScanPlan、Noneで検索ごとに整理する）
+        if plan is not None:
+            self.use_plan(plan)
+        self.roots = list(roots)
+        self.workers = workers  # 1の場合は逐次走査
+        self.index_path = index_path  # 差分検索用のインデックス（Noneで無効）
+        self.index = None
+        self.on_message = on_message or (lambda _message: None)
+        self.one_device = one_device  # ルートと同じデバイスのみ走査するか
+        # バインドマウント等で同じディレクトリを2度走査しないよう記録するか
+        self.visited = VisitedSet() if dedupe else None
+        self.throttle = throttle  # 走査速度の制限（ScanThrottle、Noneで無制限）
+        self.low_priority = low_priority  # 走査スレッドのCPU・I/O優先度を下げるか
+        # 逐次走査でもワーカースレッドで一覧を取得し、停止時に応答を待たないか
+        self.detached = detached
+        # 一致したファイルの容量（走査中のstatを再利用、collect_sizes指定時のみ）
+        self.file_sizes = {} if collect_sizes else None
+        self.pseudo_mounts = set()  # 走査中に入らない擬似ファイルシステムのマウント先
+        self._root_dev = None
+        self._is_running = True
+
+        # 除外規則（組み込みのWindowsシステムディレクトリ名 + 指定された規則）
+        self.base_exclusions = ExclusionRules(exclude)
+        self.use_ignore_files = use_ignore_files  # 検索対象の.cleansweepignoreを使うか
+        self.exclusions = self.base_exclusions  # 走査中の検索対象に対する規則
+
+        # 統計情報
+        self.dirs_scanned = 0
+        self.files_scanned = 0
+        self.matches = 0
+        self.failed_roots = []  # 走査を最後まで終えられなかった検索対象
+        self.started = time.monotonic()
+        self.metrics = ScanMetrics()  # 直近の検索の計測結果
+
+    def is_running(self):
+        return self._is_running
+
+    def stop(self):
+        self._is_running = False
+
+    @property
+    def matcher(self):
+        """コンパイル済みのパターン（走査計画を使う場合は計画のもの）"""
+        if self._matcher is None:
+            self._matcher = PatternMatcher(self.patterns, self.probe_zone_streams)
+        return self._matcher
+
+    def use_plan(self, plan):
+        """走査計画のコンパイル済みパターンと整理済みの検索対象を使う"""
+        self.plan = plan
+        self._matcher = plan.matcher
+
+    def plan_scan(self):
+        """走査する検索対象の一覧を返し、擬似ファイルシステムのマウント先を設定する
+
+        マウント先と検索対象の確認は応答しないものがあっても停止できるよう別スレッドで行い、
+        停止された場合は空の一覧を返す。
+        """
+        if self.plan is not None:
+            self.pseudo_mounts = set(self.plan.pseudo_mounts)
+            return list(self.plan.roots)
+
+        def plan():
+            partitions = list_partitions()
+            return (
+                pseudo_mountpoints(partitions),
+                plan_roots(self.roots, partitions, self.on_message),
+            )
+
+        planned = call_detached(plan, self.is_running)
+        if planned is None:
+            return []
+        self.pseudo_mounts, roots = planned
+        return roots
+
+    def scan_directory(self, path):
+        """1つのディレクトリを走査する（速度制限がある場合は走査後に休止する）
+
+        走査済みのもの、別デバイスのもの、擬似ファイルシステムのマウント先は
+        空の結果を返す。
+        """
+        try:
+            if self.throttle is None:
+                return self._scan_directory(path)
+            started = time.monotonic()
+            result = self._scan_directory(path)
+        except OSError as e:
+            self.metrics.record_error(path, e)
+            raise
+        self.throttle.wait(result[0], time.monotonic() - started, self.is_running)
+        return result
+
+    def _scan_directory(self, path):
+        metrics = self.metrics
+        if self.pseudo_mounts and os.path.normcase(path) in self.pseudo_mounts:
+            metrics.record_skip("pseudo_fs", path)
+            return 0, [], []
+        started = time.perf_counter()
+        st = None
+        if self.visited is not None or self.one_device:
+            st = os.stat(path)
+            if self.one_device and st.st_dev != self._root_dev:
+                metrics.record_skip("other_device", path)
+                return 0, [], []
+            if self.visited is not None and not self.visited.add(st):
+                metrics.record_skip("already_visited", path)
+                return 0, [], []
+        name_filter = self.exclusions.name_filter(path)
+
+        def is_excluded_name(name):
+            if name_filter(name):
+                metrics.record_skip("excluded", os.path.join(path, name))
+                return True
+            return False
+
+        if self.index is not None:
+            entry_count, found, subdirs = self.index.scan(path, self.matcher, st)
+            start = len(os.path.join(path, ""))
+            subdirs = [p for p in subdirs if not is_excluded_name(p[start:])]
+            # インデックスの照合は一覧の取得と分けられないため、全て一覧の取得とする
+            metrics.record_directory(
+                path, entry_count, time.perf_counter() - started, 0.0
+            )
+            return entry_count, found, subdirs
+        timings = [time.perf_counter() - started, 0.0]
+        result = list_directory(
+            path, self.matcher, is_excluded_name, self.file_sizes, timings
+        )
+        metrics.record_directory(path, result[0], timings[0], timings[1])
+        return result
+
+    def _lower_priority(self):
+        reason = lower_thread_priority()
+        if reason is not None:
+            self.on_message(f"優先度を下げられません - {reason}")
+
+    def walk(self, directory):
+        """設定された並列数に応じて逐次または並列に走査する
+
+        detachedの場合は逐次走査（並列数1）でもワーカースレッドで一覧を取得する。
+        """
+        if self.one_device:
+            self._root_dev = call_detached(
+                lambda: os.stat(directory).st_dev, self.is_running
+            )
+            if self._root_dev is None:
+                return iter(())  # 検索対象の確認中に停止された
+        if self.workers > 1 or self.detached:
+            walker = ParallelWalker(
+                self.scan_directory,
+                self.is_running,
+                self.workers,
+                self._lower_priority if self.low_priority else None,
+            )
+            return walker.walk(directory)
+        return walk_matches(directory, self.scan_directory, self.is_running)
+
+    def open_index(self):
+        """差分検索用のインデックスを開く（開けない場合は通常の検索を行う）"""
+        if not self.index_path:
+            return
+        if self.matcher.probe_zone_streams:
+            # 代替データストリームの追加はディレクトリのmtimeに現れないため使用しない
+            self.on_message("ストリーム確認が有効なため差分検索は使用しません")
+            return
+        try:
+            self.index = ScanIndex(self.index_path, self.matcher.signature())
+        except (OSError, sqlite3.Error) as e:
+            self.on_message(f"エラー: インデックスを開けません - {str(e)}")
+            self.index = None
+
+    def close_index(self):
+        if self.index is None:
+            return
+        try:
+            self.index.close()
+        except sqlite3.Error as e:
+            self.on_message(f"エラー: インデックスを保存できません - {str(e)}")
+        self.index = None
+
+    def snapshot(self, root, current_dir):
+        """現在の進捗を返す"""
+        return ScanProgress(
+            root,
+            current_dir,
+            self.dirs_scanned,
+            self.files_scanned,
+            self.matches,
+            time.monotonic() - self.started,
+            self.throttle.throttled_seconds if self.throttle is not None else 0.0,
+        )
+
+    def reset_stats(self):
+        """統計・計測結果・走査済みの記録を初期化する"""
+        self.dirs_scanned = 0
+        self.files_scanned = 0
+        self.matches = 0
+        self.failed_roots = []  # 走査を最後まで終えられなかった検索対象
+        self.metrics = ScanMetrics()
+        if self.visited is not None:
+            self.visited = VisitedSet()
+        self.started = time.monotonic()
+
+    def scan(self):
+        """全ての検索対象を走査し、ディレクトリごとの結果を返すジェネレーター
+
+        同じScanEngineで繰り返し呼び出せる（統計と走査済みの記録は呼び出しごとに初期化）。
+        """
+        self.reset_stats()
+        metrics = self.metrics
+        if self.low_priority:
+            self._lower_priority()
+        self.open_index()
+        try:
+            for directory in self.plan_scan():
+                if not self._is_running:
+                    break
+
+                self.exclusions = self.base_exclusions.for_root(
+                    directory, self.use_ignore_files
+                )
+                # 検索ルート自体が除外対象の場合はスキップ
+                if self.exclusions.is_excluded_path(directory):
+                    self.on_message(f"除外: {directory}")
+                    metrics.record_skip("excluded_root", directory)
+                    continue
+
+                self.on_message(f"検索中: {directory}")
+                counts = (self.dirs_scanned, self.files_scanned, self.matches)
+                root_started = time.monotonic()
+                try:
+                    for current, entry_count, found in self.walk(directory):
+                        self.dirs_scanned += 1
+                        self.files_scanned += entry_count
+                        self.matches += len(found)
+                        # 呼び出し側に制御が戻っている間を結果の処理時間として計る
+                        paused = time.perf_counter()
+                        yield directory, current, found
+                        metrics.emitting_seconds += time.perf_counter() - paused
+
+                except PermissionError as e:
+                    metrics.record_error(
+                        directory, e
+                    )  # アクセス権限がない場合はスキップ
+                except Exception as e:  # pylint: disable=broad-except
+                    self.on_message(f"エラー: {directory} - {str(e)}")
+                finally:
+                    metrics.record_root(
+                        directory,
+                        self.dirs_scanned - counts[0],
+                        self.files_scanned - counts[1],
+                        self.matches - counts[2],
+                        time.monotonic() - root_started,
+                    )
+        finally:
+            self.close_index()
+            metrics.finish(
+                self.throttle.throttled_seconds if self.throttle is not None else 0.0
+            )
+
+    def iter_matches(self):
+        """一致したパスを見つかった順に返すジェネレーター"""
+        for _, _, found in self.scan():
+            yield from found
+
+
+def _scan_shard(conn, stop_conn, patterns, roots, options, throttle):
+    """子プロセスで検索対象のグループを走査し、結果をまとめてパイプに送る
+
+    送るメッセージ:
+    ("batch", 検索対象, 直近のディレクトリ, ディレクトリ数, エントリ数, パス, 容量),
+    ("message", 状態メッセージ), ("done", 計測結果)
+    """
+    if throttle is not None:
+        options["throttle"] = ScanThrottle(*throttle)
+
+    def send(message):
+        try:
+            conn.send(message)
+        except OSError:
+            engine.stop()  # 親プロセスがパイプを閉じた（停止した）
+
+    engine = ScanEngine(
+        patterns,
+        roots,
+        on_message=lambda message: send(("message", message)),
+        detached=True,  # 停止時に応答しない一覧を待たない
+        **options,
+    )
+
+    def wait_stop():
+        # 親プロセスが停止用のパイプを閉じる（または終了する）と読み取りが終わる
+        try:
+            stop_conn.recv()
+        except (EOFError, OSError):
+            pass
+        engine.stop()
+
+    threading.Thread(target=wait_stop, daemon=True).start()
+
+    sizes = engine.file_sizes
+    batch = {"root": None, "current": "", "dirs": 0, "entries": 0, "paths": []}
+    last_flush = time.monotonic()
+
+    def flush():
+        paths = batch["paths"]
+        send(
+            (
+                "batch",
+                batch["root"],
+                batch["current"],
+                batch["dirs"],
+                batch["entries"],
+                paths,
+                (
+                    [sizes.pop(path, None) for path in paths]
+                    if sizes is not None
+                    else None
+                ),
+            )
+        )
+        batch.update(dirs=0, entries=0, paths=[])
+
+    try:
+        dirs = entries = 0
+        for root, current, found in engine.scan():
+            if root != batch["root"]:
+                if batch["dirs"]:
+                    flush()  # 結果は検索対象ごとにまとめる
+                batch["root"] = root
+            batch["current"] = current
+            batch["dirs"] += engine.dirs_scanned - dirs
+            batch["entries"] += engine.files_scanned - entries
+            dirs, entries = engine.dirs_scanned, engine.files_scanned
+            batch["paths"].extend(found)
+            now = time.monotonic()
+            if (
+                len(batch["paths"]) >= ShardedScanEngine.BATCH_SIZE
+                or now - last_flush >= ShardedScanEngine.BATCH_INTERVAL
+            ):
+                flush()
+                last_flush = now
+        if batch["dirs"]:
+            flush()
+    except Exception as e:  # pylint: disable=broad-except
+        send(("message", f"エラー: {', '.join(roots)} - {str(e)}"))
+    send(("done", engine.metrics.to_dict()))
+    conn.close()
+
+
+class ShardedScanEngine(ScanEngine):
+    """検索対象を物理デバイスごとに分け、デバイスごとに別プロセスで走査する
+
+    scan()はScanEngine.scan()と同じ形式で結果を返す（ディレクトリは子プロセスが
+    直近に走査したもの）。子プロセスの結果はパイプ経由でまとめて受け取り、
+    統計・容量・計測結果を合算する。デバイスが1つの場合はこのプロセスで走査する。
+    各デバイスのディスクが同時に動くため、全体の時間は最も遅いデバイスの時間に近づく。
+    """
+
+    BATCH_INTERVAL = 0.05  # 子プロセスが結果を送る間隔（秒）
+    BATCH_SIZE = 1000  # 子プロセスが結果を送る件数のしきい値
+    POLL_INTERVAL = 0.1  # 結果を待つ間に停止を確認する間隔（秒）
+    STOP_TIMEOUT = 1.0  # 停止後に子プロセスの終了を待つ時間（秒）
+
+    def __init__(self, patterns, roots, processes=None, **options):
+        super().__init__(patterns, roots, **options)
+        self.processes = processes or os.cpu_count() or 1  # 同時に動かすプロセス数
+        self._child_options = {
+            key: value
+            for key, value in options.items()
+            if key not in ("on_message", "throttle", "detached", "plan")
+        }
+        self._child_options["exclude"] = list(options.get("exclude", ()))
+        throttle = options.get("throttle")
+        self._throttle_args = (
+            None
+            if throttle is None
+            else (
+                throttle.dirs_per_second,
+                throttle.entries_per_second,
+                throttle.adaptive,
+            )
+        )
+
+    def scan(self):
+        if self.plan is not None and self.plan.shards is not None:
+            shards = self.plan.shards
+        else:
+
+            def plan():
+                partitions = list_partitions()
+                roots = plan_roots(self.roots, partitions, self.on_message)
+                return shard_roots(roots, partitions, self.one_device)
+
+            # 応答しない検索対象があっても停止できるよう別スレッドで確認する
+            shards = call_detached(plan, self.is_running)
+            if shards is None:
+                self.reset_stats()
+                return
+        if len(shards) <= 1:
+            yield from super().scan()
+            return
+
+        # spawnはQtのスレッドを含むプロセスでも安全に子プロセスを作れる
+        import multiprocessing  # pylint: disable=import-outside-toplevel
+        from multiprocessing.connection import (  # pylint: disable=import-outside-toplevel
+            wait,
+        )
+
+        self.reset_stats()
+        metrics = self.metrics
+        context = multiprocessing.get_context("spawn")
+        # 停止はパイプを閉じて伝える（multiprocessingのEventは待機中のプロセスが
+        # 終了すると set() が戻らなくなる）
+        stop_receiver, stop_sender = context.Pipe(duplex=False)
+        pending = deque(shards)
+        running = {}  # パイプ -> (子プロセス, 検索対象のグループ)
+        completed = set()  # 最後まで走査したパイプ
+        try:
+            while (pending or running) and self._is_running:
+                while pending and len(running) < self.processes:
+                    _, group, excluded = pending.popleft()
+                    options = dict(self._child_options)
+                    options["exclude"] = options["exclude"] + excluded
+                    receiver, sender = context.Pipe(duplex=False)
+                    process = context.Process(
+                        target=_scan_shard,
+                        args=(
+                            sender,
+                            stop_receiver,
+                            self.patterns,
+                            group,
+                            options,
+                            self._throttle_args,
+                        ),
+                        daemon=True,
+                    )
+                    process.start()
+                    sender.close()
+                    running[receiver] = (process, group)
+
+                for conn in wait(list(running), timeout=self.POLL_INTERVAL):
+                    try:
+                        message = conn.recv()
+                    except EOFError:
+                        process, group = running.pop(conn)
+                        process.join()
+                        conn.close()
+                        if conn not in completed:
+                            self._shard_failed(group, process.exitcode)
+                        continue
+                    kind = message[0]
+                    if kind == "message":
+                        self.on_message(message[1])
+                    elif kind == "done":
+                        metrics.merge(message[1])
+                        completed.add(conn)
+                    else:
+                        yield from self._merge_batch(*message[1:])
+        finally:
+            stop_sender.close()
+            stop_receiver.close()
+            deadline = time.monotonic() + self.STOP_TIMEOUT
+            for conn, (process, _) in running.items():
+                process.join(max(0.0, deadline - time.monotonic()))
+                if process.is_alive():
+                    process.terminate()  # 応答しない一覧で止まっている
+                conn.close()
+            metrics.finish(metrics.throttled_seconds)
+
+    def _shard_failed(self, group, exitcode):
+        """完了を通知せずに終了した子プロセスの検索対象を、走査できなかったものとして記録する"""
+        self.failed_roots.extend(group)
+        for root in group:
+            self.metrics.record_failed_root(root)
+        self.on_message(
+            f"エラー: 走査プロセスが異常終了しました（終了コード {exitcode}）"
+            f" - {', '.join(group)}"
+        )
+
+    def _merge_batch(self, root, current, dirs, entries, paths, sizes):
+        self.dirs_scanned += dirs
+        self.files_scanned += entries
+        self.matches += len(paths)
+        if self.file_sizes is not None and sizes is not None:
+            for path, size in zip(paths, sizes):
+                if size is not None:
+                    self.file_sizes[path] = size
+        paused = time.perf_counter()
+        yield root, current, paths
+        self.metrics.emitting_seconds += time.perf_counter() - paused
+
+
+PROFILES_PATH = os.path.join(CONFIG_DIR, "profiles.json")
+PLAN_CACHE_DIR = os.path.join(CONFIG_DIR, "plans")
+PLAN_CACHE_LIMIT = 32  # 保存しておく走査計画の数（古いものから削除）
+
+
+class ScanProfile(
+    namedtuple(
+        "ScanProfile",
+        [
+            "name",
+            "patterns",
+            "roots",
+            "exclude",  # 除外規則（ExclusionRulesの書式）
+            "use_ignore_files",
+            "one_device",
+            "probe_zone_streams",
+            "workers",
+            "per_device",  # ディスクごとに別プロセスで走査するか
+            "index_path",  # スキャンインデックス（Noneで差分検索しない）
+            "max_dirs_per_second",  # 0で無制限
+            "max_entries_per_second",  # 0で無制限
+            "low_priority",
+        ],
+        defaults=["", (), (), (), True, False, False, 1, False, None, 0, 0, False],
+    )
+):
+    """名前を付けて保存できる検索条件（パターン・検索対象・除外規則・並列数・速度制限）"""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls, data):
+        """保存された辞書から作る（未知の項目は無視し、ない項目は既定値にする）"""
+        return cls(**{field: data[field] for field in cls._fields if field in data})
+
+    def plan_key(self):
+        """走査計画に影響する設定を表す文字列（走査計画のキャッシュの識別に使用）"""
+        return json.dumps(
+            {
+                "version": ScanPlan.VERSION,
+                "patterns": sorted(self.patterns),
+                "roots": list(self.roots),
+                "one_device": self.one_device,
+                "probe_zone_streams": self.probe_zone_streams,
+                "per_device": self.per_device,
+            },
+            sort_keys=True,
+        )
+
+    def create_engine(self, plan=None, **options):
+        """この条件で検索するScanEngine（ディスクごとの場合はShardedScanEngine）を返す"""
+        throttle = None
+        if self.max_dirs_per_second or self.max_entries_per_second or self.low_priority:
+            throttle = ScanThrottle(
+                self.max_dirs_per_second,
+                self.max_entries_per_second,
+                adaptive=self.low_priority,
+            )
+        engine_class = ShardedScanEngine if self.per_device else ScanEngine
+        return engine_class(
+            self.patterns,
+            self.roots,
+            workers=self.workers,
+            probe_zone_streams=self.probe_zone_streams,
+            index_path=self.index_path,
+            one_device=self.one_device,
+            exclude=list(self.exclude),
+            use_ignore_files=self.use_ignore_files,
+            throttle=throttle,
+            low_priority=self.low_priority,
+            plan=plan,
+            **options,
+        )
+
+
+def load_profiles(path=PROFILES_PATH):
+    """保存されたプロファイルを {名前: ScanProfile} で返す（ファイルがなければ空）"""
+    try:
+        with open(path, encoding="utf-8", errors="surrogateescape") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return {
+        name: ScanProfile.from_dict(dict(item, name=name))
+        for name, item in data.get("profiles", {}).items()
+    }
+
+
+def _write_json(path, data):
+    """一時ファイルに書いてから置き換える（書き込み中に終了しても壊れない）"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp, "w", encoding="utf-8", errors="surrogateescape") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(temp, path)
+    except OSError:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+
+
+def save_profile(profile, path=PROFILES_PATH):
+    """プロファイルを保存する（同じ名前のものは置き換える）"""
+    profiles = load_profiles(path)
+    profiles[profile.name] = profile
+    _write_json(
+        path,
+        {"profiles": {name: item._asdict() for name, item in profiles.items()}},
+    )
+
+
+def delete_profile(name, path=PROFILES_PATH):
+    """プロファイルを削除する（存在しなかった場合はFalseを返す）"""
+    profiles = load_profiles(path)
+    if profiles.pop(name, None) is None:
+        return False
+    _write_json(
+        path,
+        {"profiles": {name: item._asdict() for name, item in profiles.items()}},
+    )
+    return True
+
+
+def _root_device(root):
+    try:
+        return os.stat(root).st_dev
+    except OSError:
+        return None
+
+
+def _root_devices(roots, is_running=None):
+    """検索対象ごとのst_devを返す（is_runningを指定した場合は停止できる）
+
+    is_runningを指定すると検索対象ごとに別スレッドで確認し、応答しない
+    ネットワークドライブ等で止まっていても停止された時点でNoneを返す。
+    """
+    if is_running is None:
+        return [_root_device(root) for root in roots]
+    devices = []
+    for root in roots:
+        device = call_detached(lambda root=root: (_root_device(root),), is_running)
+        if device is None:
+            return None
+        devices.append(device[0])
+    return devices
+
+
+class ScanPlan:
+    """プロファイルを走査の直前の状態まで整理した計画
+
+    整理済みの検索対象・擬似ファイルシステムのマウント先・コンパイル済みのパターン・
+    ディスクごとのグループを保持し、検索のたびにマウントの列挙と整理を繰り返さない。
+    検索対象のデバイスが変わった場合（マウントし直した等）とMAX_AGE秒を過ぎた場合は
+    作り直す。
+    """
+
+    VERSION = 1
+    MAX_AGE = 24 * 60 * 60  # 秒
+
+    def __init__(
+        self, key, matcher, roots, pseudo_mounts, shards, devices, created=None
+    ):
+        self.key = key  # ScanProfile.plan_key()
+        self.matcher = matcher
+        self.roots = list(roots)
+        self.pseudo_mounts = set(pseudo_mounts)
+        self.shards = shards  # shard_roots()の結果（ディスクごとでなければNone）
+        self.devices = list(devices)  # 検索対象ごとのst_dev（変更の検出に使用）
+        self.created = time.time() if created is None else created
+
+    @classmethod
+    def compile(cls, profile, on_message=None, is_running=None):
+        """プロファイルから計画を作る（マウントの列挙と検索対象の整理を行う）
+
+        is_runningを指定した場合は別スレッドで作り、停止された時点でNoneを返す。
+        """
+        if is_running is not None:
+            return call_detached(lambda: cls.compile(profile, on_message), is_running)
+        partitions = list_partitions()
+        roots = plan_roots(profile.roots, partitions, on_message)
+        return cls(
+            profile.plan_key(),
+            PatternMatcher(profile.patterns, profile.probe_zone_streams),
+            roots,
+            pseudo_mountpoints(partitions),
+            (
+                shard_roots(roots, partitions, profile.one_device)
+                if profile.per_device
+                else None
+            ),
+            _root_devices(roots),
+        )
+
+    def is_valid(self, profile, is_running=None):
+        """profileの計画として今も使えるかどうか（停止された場合はFalse）"""
+        return (
+            self.key == profile.plan_key()
+            and 0 <= time.time() - self.created < self.MAX_AGE
+            and self.devices == _root_devices(self.roots, is_running)
+        )
+
+    def to_dict(self):
+        """JSONに変換できる形式で返す"""
+        return {
+            "version": self.VERSION,
+            "key": self.key,
+            "created": self.created,
+            "matcher": self.matcher.to_dict(),
+            "roots": self.roots,
+            "pseudo_mounts": sorted(self.pseudo_mounts),
+            "shards": self.shards,
+            "devices": self.devices,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """to_dict()の結果から復元する（形式が異なる場合はValueError）"""
+        if data.get("version") != cls.VERSION:
+            raise ValueError("走査計画の形式が異なります")
+        shards = data["shards"]
+        return cls(
+            data["key"],
+            PatternMatcher.from_dict(data["matcher"]),
+            data["roots"],
+            data["pseudo_mounts"],
+            (
+                None
+                if shards is None
+                else [(device, group, excluded) for device, group, excluded in shards]
+            ),
+            data["devices"],
+            data["created"],
+        )
+
+
+def plan_cache_path(profile, cache_dir=PLAN_CACHE_DIR):
+    """プロファイルの走査計画の保存先（設定の内容ごとに1つ）"""
+    digest = hashlib.sha1(profile.plan_key().encode("utf-8", "surrogateescape"))
+    return os.path.join(cache_dir, digest.hexdigest()[:16] + ".json")
+
+
+def load_plan(profile, cache_dir=PLAN_CACHE_DIR, on_message=None, is_running=None):
+    """profileの走査計画を返す
+
+    保存済みの計画が使えればそのまま使い、なければ作って保存する。
+    保存済みの計画が壊れている場合や保存できない場合も、作った計画を返す。
+    is_runningを指定した場合、検索対象の確認は応答がなくても停止でき、
+    停止された場合はNoneを返す。
+    """
+    on_message = on_message or (lambda _message: None)
+    path = plan_cache_path(profile, cache_dir)
+    try:
+        with open(path, encoding="utf-8", errors="surrogateescape") as f:
+            plan = ScanPlan.from_dict(json.load(f))
+        if plan.is_valid(profile, is_running):
+            return plan
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, KeyError, TypeError, re.error):
+        pass  # 壊れた・古い形式の計画は作り直す
+
+    if is_running is not None and not is_running():
+        return None
+    plan = ScanPlan.compile(profile, on_message, is_running)
+    if plan is None:
+        return None  # 作成中に停止された
+    try:
+        _write_json(path, plan.to_dict())
+        _prune_plan_cache(cache_dir)
+    except OSError as e:
+        on_message(f"エラー: 走査計画を保存できません - {str(e)}")
+    return plan
+
+
+def _prune_plan_cache(cache_dir):
+    entries = []
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.name.endswith(".json"):
+                entries.append((entry.stat().st_mtime, entry.path))
+    entries.sort(reverse=True)
+    for _, path in entries[PLAN_CACHE_LIMIT:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def tree_size(path, is_running=lambda: True):
+    """パス配下の容量の合計を返す（シンボリックリンクはたどらず、ハードリンクは1回だけ数える）"""
+    st = os.lstat(path)
+    total = allocated_size(st)
+    if not stat.S_ISDIR(st.st_mode):
+        return total
+    seen = set()
+    stack = [path]
+    while stack and is_running():
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if st.st_nlink > 1 and not stat.S_ISDIR(st.st_mode):
+                        key = (st.st_dev, st.st_ino)
+                        if key in seen:
+                            continue
+                        seen.add(key)
+                    total += allocated_size(st)
+                    if stat.S_ISDIR(st.st_mode):
+                        stack.append(entry.path)
+        except OSError:
+            continue  # 列挙できないディレクトリは数えない
+    return total
+
+
+class SizeCalculator:
+    """削除で解放される容量を、並列数を制限したスレッドプールで計算する
+
+    request()で計算を依頼し、終わったものはdrain()で (キー, バイト数) として受け取る。
+    ディレクトリの結果はパスごとにメモ化し、mtimeとinodeが変わらなければ再利用する。
+    """
+
+    def __init__(self, workers=4):
+        self.workers = max(1, workers)
+        self.hits = 0
+        self._executor = None
+        self._cache = {}  # パス -> (mtime_ns, inode, バイト数)
+        self._done = []
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._is_running = True
+
+    @property
+    def pending(self):
+        """計算中・計算待ちの件数"""
+        return self._pending
+
+    def request(self, key, path):
+        """pathの容量の計算を依頼する（結果はkeyとともにdrain()で返す）"""
+        if self._executor is None:
+            # 起動時間を短くするため、初めて使うときに読み込む
+            from concurrent.futures import (  # pylint: disable=import-outside-toplevel
+                ThreadPoolExecutor,
+            )
+
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        with self._lock:
+            self._pending += 1
+        self._executor.submit(self._calculate, key, path)
+
+    def _calculate(self, key, path):
+        size = None
+        try:
+            if self._is_running:
+                size = self.size(path)
+        except OSError:
+            pass  # 削除済み等、容量が分からないものはNoneを返す
+        with self._lock:
+            self._pending -= 1
+            self._done.append((key, size))
+
+    def size(self, path):
+        """pathの容量を返す（ディレクトリはメモ化した結果を使用）"""
+        st = os.lstat(path)
+        if not stat.S_ISDIR(st.st_mode):
+            return allocated_size(st)
+        cached = self._cache.get(path)
+        if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_ino):
+            self.hits += 1
+            return cached[2]
+        size = tree_size(path, lambda: self._is_running)
+        self._cache[path] = (st.st_mtime_ns, st.st_ino, size)
+        return size
+
+    def drain(self):
+        """計算が終わった (キー, バイト数またはNone) の一覧を返す"""
+        with self._lock:
+            done, self._done = self._done, []
+        return done
+
+    def forget(self, paths):
+        """削除したパスのメモを破棄する"""
+        for path in paths:
+            self._cache.pop(path, None)
+
+    def shutdown(self):
+        self._is_running = False
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def format_size(size):
+    """バイト数を読みやすい単位の文字列に変換"""
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if size < 1024 or unit == "TB":
+            break
+        size /= 1024
+    return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+
+
+# 検索結果ファイルの項目（sizeは走査中に分かったファイルの容量のみ）
+RESULT_FIELDS = ("path", "root", "size")
+
+
+def result_format(path):
+    """検索結果ファイルの形式を拡張子から判定（.csv以外はJSON Lines）"""
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+class ResultWriter:
+    """検索結果をJSON LinesまたはCSVへ1件ずつ追記する（件数によらずメモリ使用量は一定）"""
+
+    def __init__(self, path, fmt=None):
+        self.path = path
+        self.format = fmt or result_format(path)
+        self.count = 0
+        # UTF-8として不正なファイル名もそのまま書き出せるようにする
+        self._file = open(  # pylint: disable=consider-using-with
+            path, "w", encoding="utf-8", errors="surrogateescape", newline=""
+        )
+        self._csv = None
+        if self.format == "csv":
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(RESULT_FIELDS)
+
+    def write(self, path, root, size=None):
+        if self._csv is not None:
+            self._csv.writerow((path, root, "" if size is None else size))
+        else:
+            record = {"path": path, "root": root}
+            if size is not None:
+                record["size"] = size
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def write_many(self, root, paths, sizes=None):
+        """同じ検索対象で見つかったパスをまとめて書き出す（sizesは {パス: バイト数}）"""
+        for path in paths:
+            self.write(path, root, sizes.get(path) if sizes else None)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_results(path, fmt=None):
+    """検索結果ファイルから (パス, 検索対象, 容量またはNone) を1件ずつ読み込むジェネレーター
+
+    CLIの--json出力も読み込める（pathを持たない行や解釈できない行は読み飛ばす）。
+    """
+    fmt = fmt or result_format(path)
+    with open(path, encoding="utf-8", errors="surrogateescape", newline="") as f:
+        if fmt == "csv":
+            for row in csv.DictReader(f):
+                if row.get("path"):
+                    size = row.get("size")
+                    yield row["path"], row.get("root") or "", (
+                        int(size) if size and size.isdigit() else None
+                    )
+            return
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and isinstance(record.get("path"), str):
+                size = record.get("size")
+                yield record["path"], record.get("root") or "", (
+                    size if isinstance(size, int) else None
+                )
+
+
+def delete_error_reason(path, error):
+    """削除時の例外を表示用のエラー理由に変換"""
+    if isinstance(error, PermissionError) or (
+        isinstance(error, OSError) and error.errno == errno.EACCES
+    ):
+        return "アクセス権限がありません"
+    if isinstance(error, FileNotFoundError) or (
+        isinstance(error, OSError) and error.errno == errno.ENOENT
+    ):
+        if os.path.isdir(path):
+            return "ディレクトリが見つかりません"
+        return "ファイルが見つかりません"
+    if isinstance(error, OSError):
+        return f"OSエラー: {str(error)}"
+    return str(error)
+
+
+def is_permanent_delete_target(path):
+    """ゴミ箱を使わずに直接削除する対象かどうか（代替データストリーム）"""
+    return PatternMatcher.ZONE_IDENTIFIER_SUFFIX in path
+
+
+# ディレクトリのfdからの相対操作（openat/unlinkat相当）でツリーを削除できるか
+# （Windowsではdir_fdを使えないため、shutil.rmtreeで削除する）
+FD_RELATIVE_DELETE = (
+    os.open in os.supports_dir_fd
+    and os.unlink in os.supports_dir_fd
+    and os.rmdir in os.supports_dir_fd
+    and os.scandir in os.supports_fd
+    and hasattr(os, "O_DIRECTORY")
+    and hasattr(os, "O_NOFOLLOW")
+)
+
+
+def _open_directory(name, dir_fd, expected):
+    """ディレクトリを開き、lstatの結果と同じものか確認してfdを返す
+
+    O_NOFOLLOWでシンボリックリンクは開かず、確認の後で入れ替えられた場合は
+    （ツリーの外を指すリンク等）削除せずにOSErrorとする。
+    """
+    flags = os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW | getattr(os, "O_CLOEXEC", 0)
+    fd = os.open(name, flags, dir_fd=dir_fd)
+    try:
+        st = os.fstat(fd)
+        if (st.st_dev, st.st_ino) != (expected.st_dev, expected.st_ino):
+            raise OSError(errno.ENOTDIR, "走査中にディレクトリが入れ替えられました")
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+def remove_tree(path):
+    """ディレクトリツリーを削除し、失敗した (パス, 例外) の一覧を返す
+
+    各ディレクトリをfdで開き、中身はそのfdからの相対名で削除する（openat/unlinkat相当）。
+    シンボリックリンクはたどらずにリンク自体を削除するため、途中で置き換えられても
+    ツリーの外は削除しない。削除できないものがあっても残りの削除を続ける。
+    深いツリーでも再帰しないよう、開いているディレクトリをスタックで管理する。
+    """
+    errors = []
+    if not FD_RELATIVE_DELETE:
+        # pylint: disable-next=deprecated-argument
+        shutil.rmtree(path, onerror=lambda _func, p, info: errors.append((p, info[1])))
+        return errors
+
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode):
+        os.unlink(path)  # シンボリックリンク・ファイルはそれ自体を削除
+        return errors
+    fd = _open_directory(path, None, st)
+    # [fd, パス, 親のfdからの名前, 未処理のエントリ, 中身の削除に失敗したか]
+    stack = [[fd, path, None, None, False]]
+    try:
+        _remove_stack(stack, errors)
+    finally:
+        for frame in stack:
+            os.close(frame[0])  # 途中で例外が発生した場合
+    return errors
+
+
+def _remove_stack(stack, errors):
+    """remove_tree()の本体（スタックの先頭のディレクトリから順に中身を削除する）"""
+    while stack:
+        frame = stack[-1]
+        fd, current = frame[0], frame[1]
+        if frame[3] is None:
+            try:
+                with os.scandir(fd) as it:
+                    frame[3] = list(it)
+            except OSError as e:
+                errors.append((current, e))
+                frame[3] = []
+                frame[4] = True
+
+        if frame[3]:
+            entry = frame[3].pop()
+            child = os.path.join(current, entry.name)
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    child_st = entry.stat(follow_symlinks=False)
+                    child_fd = _open_directory(entry.name, fd, child_st)
+                    stack.append([child_fd, child, entry.name, None, False])
+                else:
+                    os.unlink(entry.name, dir_fd=fd)
+            except FileNotFoundError:
+                pass  # 他で削除された
+            except OSError as e:
+                errors.append((child, e))
+                frame[4] = True
+            continue
+
+        # 中身を削除し終えたディレクトリを親のfdから削除する
+        os.close(fd)
+        stack.pop()
+        if frame[4]:
+            if stack:
+                stack[-1][4] = True
+            continue  # 中身が残っているため削除できない
+        try:
+            if stack:
+                os.rmdir(frame[2], dir_fd=stack[-1][0])
+            else:
+                os.rmdir(current)
+        except OSError as e:
+            errors.append((current, e))
+            if stack:
+                stack[-1][4] = True
+
+
+def remove_permanently(path):
+    """パスを直接削除し、失敗した場合はエラー理由を返す
+
+    ディレクトリはツリーごと削除し、中身の削除に失敗した場合は最初の失敗を理由とする。
+    """
+    try:
+        if os.path.isdir(path) and not os.path.islink(path):
+            errors = remove_tree(path)
+            if errors:
+                failed, error = errors[0]
+                reason = f"{delete_error_reason(failed, error)}: {failed}"
+                if len(errors) > 1:
+                    reason += f"（ほか{len(errors) - 1}件）"
+                return reason
+        else:
+            os.remove(path)
+    except Exception as e:  # pylint: disable=broad-except
+        return delete_error_reason(path, e)
+    return None
+
+
+def trash_batch(paths):
+    """パスの一覧をまとめてゴミ箱に移動し、(パス, エラー理由またはNone) の一覧を返す"""
+    results = []
+    existing = []
+    for path in paths:
+        if os.path.lexists(path):
+            existing.append(path)
+        else:
+            results.append((path, delete_error_reason(path, FileNotFoundError())))
+    if not existing:
+        return results
+
+    from send2trash import (  # pylint: disable=import-outside-toplevel
+        send2trash,
+    )
+
+    try:
+        send2trash(existing)
+    except Exception:  # pylint: disable=broad-except
+        # 途中で失敗した場合は、移動済みのものを除いて1件ずつやり直す
+        for path in existing:
+            if not os.path.lexists(path):
+                results.append((path, None))
+                continue
+            try:
+                send2trash(path)
+            except Exception as e:  # pylint: disable=broad-except
+                results.append((path, delete_error_reason(path, e)))
+            else:
+                results.append((path, None))
+    else:
+        results.extend((path, None) for path in existing)
+    return results
+
+
+class DeleteMetrics:
+    """削除の計測結果（方法ごとの件数・時間と失敗の理由）"""
+
+    SAMPLE_COUNT = ScanMetrics.SAMPLE_COUNT
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+        self.methods = {}  # 削除方法 -> 件数・失敗数・バッチ数・秒数
+        self.errors = {}  # エラー理由 -> 件数と例
+
+    def record_batch(self, method, results, seconds):
+        counts = self.methods.setdefault(
+            method, {"deleted": 0, "failed": 0, "batches": 0, "seconds": 0.0}
+        )
+        counts["batches"] += 1
+        counts["seconds"] += seconds
+        for path, error in results:
+            if error is None:
+                counts["deleted"] += 1
+            else:
+                counts["failed"] += 1
+                _tally(self.errors, error, path, self.SAMPLE_COUNT)
+        self.elapsed = time.monotonic() - self.started
+
+    def to_dict(self):
+        """JSONに変換できる形式で返す"""
+        return {"elapsed": self.elapsed, "methods": self.methods, "errors": self.errors}
+
+    def report(self):
+        """表示用の計測結果を返す"""
+        labels = {"trash": "ゴミ箱へ移動", "permanent": "直接削除"}
+        lines = [f"経過時間: {self.elapsed:.2f} 秒"]
+        for method, counts in self.methods.items():
+            rate = counts["deleted"] / counts["seconds"] if counts["seconds"] else 0.0
+            lines.append(
+                f"{labels.get(method, method)}: 成功 {counts['deleted']:,} 件 / "
+                f"失敗 {counts['failed']:,} 件 / {counts['batches']:,} 回 "
+                f"({counts['seconds']:.2f} 秒, {rate:,.0f} 件/秒)"
+            )
+        if self.errors:
+            lines += ["", "エラー:"]
+            for reason, entry in self.errors.items():
+                lines.append(f"  {reason}: {entry['count']:,} 件")
+                lines += [f"    {path}" for path in entry["samples"][:5]]
+        return "\n".join(lines)
+
+
+def iter_delete(
+    paths,
+    workers=4,
+    is_running=lambda: True,
+    trash_batch_size=100,
+    permanent_batch_size=500,
+    metrics=None,
+    permanent=False,
+):
+    """パスの一覧を削除し、(パス, エラー理由またはNone) の一覧をバッチごとに返す
+
+    ゴミ箱への移動はまとめて行い、直接削除する対象は複数スレッドで並列に削除する。
+    permanentを指定した場合はゴミ箱を使わず、ディレクトリもツリーごと並列に直接削除する。
+    is_runningがFalseを返した時点で残りは処理せずに終了する。
+    metrics（DeleteMetrics）を指定した場合、バッチごとの結果と時間を記録する。
+    """
+    from concurrent.futures import (  # pylint: disable=import-outside-toplevel
+        ThreadPoolExecutor,
+    )
+
+    # パスの正規化
+    targets = [os.path.normpath(path) for path in paths]
+    if permanent:
+        direct, trash = targets, []
+        # ディレクトリのツリーは1件ごとに時間がかかるため、進捗を細かく返す
+        permanent_batch_size = trash_batch_size
+    else:
+        direct = [path for path in targets if is_permanent_delete_target(path)]
+        trash = [path for path in targets if not is_permanent_delete_target(path)]
+
+    # Zone.Identifier（または直接削除を指定した場合は全て）を並列に削除
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for start in range(0, len(direct), permanent_batch_size):
+            if not is_running():
+                return
+            batch = direct[start : start + permanent_batch_size]
+            started = time.perf_counter()
+            results = list(zip(batch, executor.map(remove_permanently, batch)))
+            if metrics is not None:
+                metrics.record_batch(
+                    "permanent", results, time.perf_counter() - started
+                )
+            yield results
+
+    # ファイルまたはディレクトリの場合はまとめてゴミ箱に移動
+    for start in range(0, len(trash), trash_batch_size):
+        if not is_running():
+            return
+        started = time.perf_counter()
+        results = trash_batch(trash[start : start + trash_batch_size])
+        if metrics is not None:
+            metrics.record_batch("trash", results, time.perf_counter() - started)
+        yield results
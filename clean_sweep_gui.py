@@ -0,0 +1,2217 @@
+"""CleanSweepのGUI（PyQt5）"""
+
+import sys
+import os
+import bisect
+import itertools
+import time
+from array import array
+from pathlib import Path
+from PyQt5.QtWidgets import (
+    QApplication,
+    QMainWindow,
+    QWidget,
+    QVBoxLayout,
+    QHBoxLayout,
+    QCheckBox,
+    QPushButton,
+    QTreeView,
+    QLabel,
+    QFileDialog,
+    QMessageBox,
+    QScrollArea,
+    QInputDialog,
+    QHeaderView,
+    QSpinBox,
+    QDialog,
+    QDialogButtonBox,
+    QPlainTextEdit,
+    QComboBox,
+)
+from PyQt5.QtCore import (
+    Qt,
+    QThread,
+    QTimer,
+    pyqtSignal,
+    QAbstractItemModel,
+    QModelIndex,
+)
+from PyQt5.QtGui import QIcon
+
+from clean_sweep_engine import (
+    BUILTIN_PATTERNS,
+    DEFAULT_INDEX_PATH,
+    DeleteMetrics,
+    IGNORE_FILE_NAME,
+    PatternMatcher,
+    ResultWriter,
+    ScanProfile,
+    SizeCalculator,
+    delete_profile,
+    format_size,
+    iter_delete,
+    iter_partitions,
+    is_network_partition,
+    is_pseudo_partition,
+    iter_results,
+    iter_verify,
+    load_plan,
+    load_profiles,
+    parse_exclusion_rules,
+    save_metrics,
+    save_profile,
+)
+from clean_sweep_watch import TreeWatcher
+
+# 検索結果ファイルの選択ダイアログのフィルター
+RESULT_FILE_FILTER = "JSON Lines (*.jsonl);;CSV (*.csv);;すべてのファイル (*)"
+
+
+class SearchThread(QThread):
+    """ファイル検索を行うスレッド（ScanEngineの結果をシグナルに変換する）"""
+
+    progress = pyqtSignal(object)  # 検索の進捗 (ScanProgress) を通知
+    message = pyqtSignal(str)  # 状態メッセージ（開始・エラー・完了）を通知
+    found_files = pyqtSignal(str, list)  # 検索対象と見つかったファイルをまとめて通知
+    finished = pyqtSignal()  # 検索完了を通知
+
+    # 見つかったファイルを送出する間隔（秒）と件数のしきい値
+    FLUSH_INTERVAL = 0.05
+    FLUSH_SIZE = 1000
+    # 進捗を送出する間隔（秒）
+    PROGRESS_INTERVAL = 0.1
+
+    def __init__(self, profile, export_path=None, use_plan=True):
+        super().__init__()
+        self.profile = profile  # 検索条件（ScanProfile）
+        self.use_plan = use_plan  # 保存済みの走査計画を使うか
+        self.engine = profile.create_engine(
+            on_message=self.message.emit,
+            collect_sizes=True,  # 一致したファイルの容量は走査中のstatから取得
+            detached=True,  # キャンセル時に応答しないディレクトリの一覧を待たない
+        )
+        self.export_path = export_path  # 結果を順次書き出すファイル（Noneで無効）
+        self.watcher = None  # 走査したディレクトリを登録するTreeWatcher（監視モード）
+        self._pending_root = ""
+        self._pending_found = []
+        self._last_flush = 0.0
+        # 送出した結果のうち画面側で受け取られていない数（計測用）
+        self._sent = [0, 0]  # まとまりの数, パスの数（検索スレッドのみ更新）
+        self._delivered = [0, 0]  # 同上（メインスレッドのみ更新）
+        # スレッドオブジェクトはメインスレッドに属するため、受け取り時に呼び出される
+        self.found_files.connect(self._on_delivered)
+
+    def stop(self):
+        self.engine.stop()
+
+    def _on_delivered(self, _root, paths):
+        self._delivered[0] += 1
+        self._delivered[1] += len(paths)
+
+    def _flush_found(self, force=False):
+        """溜まった結果を件数または時間のしきい値に達したらまとめて送出する"""
+        if not self._pending_found:
+            return
+        now = time.monotonic()
+        if (
+            force
+            or len(self._pending_found) >= self.FLUSH_SIZE
+            or now - self._last_flush >= self.FLUSH_INTERVAL
+        ):
+            self._sent[0] += 1
+            self._sent[1] += len(self._pending_found)
+            self.engine.metrics.record_backlog(
+                self._sent[0] - self._delivered[0], self._sent[1] - self._delivered[1]
+            )
+            self.found_files.emit(self._pending_root, self._pending_found)
+            self._pending_found = []
+            self._last_flush = now
+
+    def _open_writer(self):
+        if not self.export_path:
+            return None
+        try:
+            return ResultWriter(self.export_path)
+        except OSError as e:
+            self.message.emit(f"エラー: 結果ファイルを作成できません - {str(e)}")
+            return None
+
+    def run(self):
+        engine = self.engine
+        if self.use_plan:
+            # 同じ条件の検索ではマウントの列挙と検索対象の整理を省く
+            plan = load_plan(
+                self.profile, on_message=self.message.emit, is_running=engine.is_running
+            )
+            if plan is not None:  # 検索対象の確認中にキャンセルされた場合はNone
+                engine.use_plan(plan)
+        writer = self._open_writer()
+        self._last_flush = time.monotonic()
+        last_progress = self._last_flush
+        try:
+            for root, current, found in engine.scan():
+                if found:
+                    if root != self._pending_root:
+                        # 送出する結果は検索対象ごとにまとめる
+                        self._flush_found(force=True)
+                        self._pending_root = root
+                    self._pending_found.extend(found)
+                    if writer is not None:
+                        writer.write_many(root, found, engine.file_sizes)
+                self._flush_found()
+                if self.watcher is not None:
+                    # 走査した時点から監視し、検索中に作られたものも拾う
+                    self.watcher.add_directory(root, current, found)
+
+                # 進捗は一定間隔でのみ通知する
+                now = time.monotonic()
+                if now - last_progress >= self.PROGRESS_INTERVAL:
+                    last_progress = now
+                    self.progress.emit(engine.snapshot(root, current))
+        finally:
+            if writer is not None:
+                writer.close()
+
+        self._flush_found(force=True)
+
+        if engine.is_running() and engine.failed_roots:
+            self.message.emit(
+                f"検索完了（一部の検索対象を走査できませんでした）: "
+                f"{engine.matches}個のファイルが見つかりました"
+            )
+        elif engine.is_running():
+            self.message.emit(f"検索完了: {engine.matches}個のファイルが見つかりました")
+        else:
+            self.message.emit("検索がキャンセルされました")
+
+        self.finished.emit()
+
+
+class WatchThread(QThread):
+    """検索後にツリーを監視するスレッド（TreeWatcherの結果をシグナルに変換する）
+
+    自動削除が有効な場合、見つかったものは一覧に追加せずその場で削除する。
+    """
+
+    found_files = pyqtSignal(str, list)  # 検索対象と新しく見つかったファイル
+    cleaned = pyqtSignal(list)  # 自動削除の結果 (パス, エラー理由またはNone) の一覧
+    message = pyqtSignal(str)  # 監視の状態を通知
+    finished = pyqtSignal()  # 監視の終了を通知
+
+    def __init__(self, engine, auto_clean=False, permanent=False):
+        super().__init__()
+        self.engine = engine
+        self.auto_clean = auto_clean
+        self.permanent = permanent  # ゴミ箱を使わずに削除するか
+        self.watcher = TreeWatcher(engine, self._found, self.message.emit)
+
+    def stop(self):
+        self.engine.stop()
+
+    def _found(self, root, paths):
+        if not self.auto_clean:
+            self.found_files.emit(root, paths)
+            return
+        for results in iter_delete(
+            paths, 1, self.engine.is_running, permanent=self.permanent
+        ):
+            self.cleaned.emit(results)
+
+    def run(self):
+        self.watcher.run()
+        self.finished.emit()
+
+
+class DriveScanThread(QThread):
+    """マウントされているディスクを検出するスレッド
+
+    容量の取得が終わったディスクから順に通知し、応答しないマウントは
+    応答なしとして通知する。
+    """
+
+    drive_found = pyqtSignal(int, str, str, bool)  # 番号, マウント先, 表示名, 利用可否
+
+    USAGE_TIMEOUT = 2.0
+
+    def run(self):
+        for index, partition, usage, responded in iter_partitions(self.USAGE_TIMEOUT):
+            # proc・tmpfs・overlay等の擬似ファイルシステムは検索対象にしない
+            if is_pseudo_partition(partition):
+                continue
+            device = partition.device.rstrip("\\").rstrip("/")
+
+            # 容量情報（通常ディスクの場合のみ使用）
+            size_info = ""
+            if usage is not None:
+                size_gb = round(usage.total / (1024**3))
+                size_info = f" ({size_gb}GB)"
+
+            # ディスク情報を表示（4パターン + 応答なし）
+            if not responded:
+                drive_text = f"ディスク {device} (応答なし)"
+            elif is_network_partition(partition):
+                drive_text = f"ディスク {device} (NW)"
+            elif "removable" in partition.opts.lower():
+                drive_text = f"ディスク {device}{size_info} (USB)"
+            else:
+                drive_text = f"ディスク {device}{size_info}"
+
+            self.drive_found.emit(index, partition.mountpoint, drive_text, responded)
+
+
+class PathStore:
+    """パスをUTF-8で1つのbytearrayに連結し、オフセット配列で参照する格納領域
+
+    パスごとにPythonの文字列オブジェクトを保持しないため、大量の結果でも省メモリ。
+    """
+
+    def __init__(self, paths=()):
+        self._data = bytearray()
+        self._offsets = array("Q", [0])
+        self.extend(paths)
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        start = self._offsets[index]
+        end = self._offsets[index + 1]
+        return self._data[start:end].decode("utf-8", "surrogateescape")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def extend(self, paths):
+        data = self._data
+        offsets = self._offsets
+        for path in paths:
+            data += path.encode("utf-8", "surrogateescape")
+            offsets.append(len(data))
+
+    def clear(self):
+        self._data = bytearray()
+        self._offsets = array("Q", [0])
+
+
+class BitSet:
+    """1件1ビットで状態を保持するビット集合"""
+
+    def __init__(self, size=0):
+        self._size = 0
+        self._bytes = bytearray()
+        self.resize(size)
+
+    def __len__(self):
+        return self._size
+
+    def resize(self, size):
+        """サイズを変更する（増えた分は0で初期化）"""
+        if size < self._size:
+            self._bytes = self._bytes[: (size + 7) // 8]
+            self._mask_tail(size)
+        else:
+            self._bytes.extend(bytes((size + 7) // 8 - len(self._bytes)))
+        self._size = size
+
+    def _mask_tail(self, size):
+        # 範囲外のビットが立たないように末尾バイトの余りを落とす
+        if size % 8 and self._bytes:
+            self._bytes[-1] &= (1 << (size % 8)) - 1
+
+    def get(self, index):
+        return bool(self._bytes[index >> 3] & (1 << (index & 7)))
+
+    def set(self, index, value):
+        if value:
+            self._bytes[index >> 3] |= 1 << (index & 7)
+        else:
+            self._bytes[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+    def set_all(self, value):
+        fill = 0xFF if value else 0x00
+        self._bytes = bytearray([fill]) * len(self._bytes)
+        self._mask_tail(self._size)
+
+    def count(self):
+        return int.from_bytes(self._bytes, "little").bit_count()
+
+    def indices(self):
+        """立っているビットの位置を昇順に返す"""
+        for byte_index, byte in enumerate(self._bytes):
+            if not byte:
+                continue
+            base = byte_index << 3
+            for bit in range(8):
+                if byte & (1 << bit):
+                    yield base + bit
+
+
+class _Group:
+    """結果の分類（検索対象・パターン・ディレクトリ）の1つのノード
+
+    件数・チェック済みの件数・容量の合計は結果の追加・変更のたびに差分で更新する。
+    一括のチェック（mark）は配下の全件に伝えず、スタンプ（変更の順序）で解決する。
+    """
+
+    __slots__ = (
+        "kind",
+        "number",
+        "key",
+        "label",
+        "parent",
+        "row",
+        "children",
+        "index",
+        "items",
+        "shown",
+        "count",
+        "checked",
+        "size",
+        "unknown",
+        "mark_stamp",
+        "mark_value",
+        "count_stamp",
+    )
+
+    def __init__(self, kind, key, label, parent, row):
+        self.kind = kind
+        self.number = 0  # ディレクトリの分類の番号（結果から参照する）
+        self.key = key
+        self.label = label
+        self.parent = parent
+        self.row = row  # 親の中での表示行
+        self.children = []  # 子の分類（ディレクトリの場合は使用しない）
+        self.index = {}  # キー -> 子の分類
+        self.items = array("Q")  # 結果のID（ディレクトリの場合のみ）
+        self.shown = 0  # 表示済みの結果の数（ディレクトリの場合のみ）
+        self.count = 0  # 配下の結果の数
+        self.checked = 0  # 配下のチェック済みの数（count_stamp時点の値）
+        self.size = 0  # 配下の容量の合計（計算済みのもののみ）
+        self.unknown = 0  # 配下の容量が未計算の数
+        self.mark_stamp = 0  # 配下を一括でチェックした時点（0は未実施）
+        self.mark_value = False
+        self.count_stamp = 0  # checkedを最後に確定した時点
+
+    def chain(self):
+        """自身から最上位までの分類を返す"""
+        group = self
+        while group is not None:
+            yield group
+            group = group.parent
+
+
+class ResultsModel(QAbstractItemModel):
+    """検索結果を 検索対象 → パターン → ディレクトリ → ファイル の階層で表示するモデル
+
+    パスは親ディレクトリの表（重複なし）とファイル名（PathStore）に分けて保持し、
+    結果ごとには番号・容量・チェック状態だけを持つ。各分類の件数と容量は
+    結果が届くたびに差分で更新する。分類をチェックした場合は配下を1件ずつ変更せず、
+    スタンプで「その時点より前の状態を上書きした」ことだけを記録する。
+    ディレクトリの中の結果は展開・スクロールに応じてFETCH_SIZE件ずつ表示する。
+    load()で読み込んだ結果ファイルも、表示が必要になった分だけ取り出す。
+    """
+
+    HEADERS = ["ファイルパス", "サイズ"]
+    PATH_COLUMN = 0
+    SIZE_COLUMN = 1
+    UNKNOWN_SIZE = -1  # 未計算
+    UNAVAILABLE_SIZE = -2  # 取得できなかった（削除済み等）
+    SIZE_POLL_INTERVAL = 100  # 計算結果を取り込む間隔（ミリ秒）
+    FETCH_SIZE = 1000  # 結果ファイル・ディレクトリから1回に取り出す件数
+    TOP, ROOT, PATTERN, DIRECTORY = range(4)  # 分類の種類
+    OTHER_PATTERN = "その他"
+
+    totals_changed = pyqtSignal()  # 容量の合計が変わったことを通知
+
+    def __init__(self, parent=None, size_calculator=None):
+        super().__init__(parent)
+        self._source = (
+            None  # 読み込み中の結果ファイル（(パス, 検索対象, 容量) の反復子）
+        )
+        self._generation = 0  # 作り直すたびに増やし、古い計算結果を捨てる
+        self.sort_column = None
+        self.sort_order = Qt.AscendingOrder
+        self.size_calculator = size_calculator or SizeCalculator()
+        self._size_timer = QTimer(self)
+        self._size_timer.setInterval(self.SIZE_POLL_INTERVAL)
+        self._size_timer.timeout.connect(self._apply_sizes)
+        self.pattern_of = None  # パスを一致したパターンに分類する関数
+        self._reset_store()
+
+    def _reset_store(self):
+        self._top = _Group(self.TOP, None, "", None, 0)
+        self._parents = PathStore()  # 親ディレクトリの表
+        self._parent_ids = {}  # 親ディレクトリ -> 番号
+        self._names = PathStore()  # 結果ごとのファイル名
+        self._item_dirs = array("I")  # 結果ごとのディレクトリの分類の番号
+        self._dirs = []  # ディレクトリの分類（番号順）
+        self._sizes = array("q")
+        self._checked = BitSet()  # 結果ごとに最後に変更したチェック状態
+        self._stamps = array("Q")  # 結果ごとにチェック状態を変更した時点
+        self._requested = BitSet()  # 容量の計算を依頼済みか
+        self._clock = 0
+        self._notify = True  # 行の追加・変更を通知するか（作り直し中は通知しない）
+        self._showing = None  # 行を追加している途中のディレクトリの分類
+
+    # --- 集計 ---
+
+    def item_count(self):
+        """結果の件数"""
+        return self._top.count
+
+    @property
+    def total_size(self):
+        return self._top.size
+
+    @property
+    def unknown_count(self):
+        return self._top.unknown
+
+    @property
+    def root_totals(self):
+        return {root.key: root.size for root in self._top.children}
+
+    @property
+    def pattern_totals(self):
+        totals = {}
+        for root in self._top.children:
+            for pattern in root.children:
+                totals[pattern.key] = totals.get(pattern.key, 0) + pattern.size
+        return totals
+
+    # --- 分類とチェック状態 ---
+
+    def _tick(self):
+        self._clock += 1
+        return self._clock
+
+    def _settle(self, group):
+        """上位の一括チェックがgroupの件数の確定後にあれば、チェック済みの数に反映する"""
+        stamp, value = 0, False
+        ancestor = group.parent
+        while ancestor is not None:
+            if ancestor.mark_stamp > stamp:
+                stamp, value = ancestor.mark_stamp, ancestor.mark_value
+            ancestor = ancestor.parent
+        if stamp > group.count_stamp:
+            group.checked = group.count if value else 0
+            group.count_stamp = stamp
+        return group.checked
+
+    def _is_checked(self, item_id):
+        """結果の実際のチェック状態（最も新しい変更を採用）"""
+        stamp = self._stamps[item_id]
+        value = self._checked.get(item_id)
+        group = self._dirs[self._item_dirs[item_id]]
+        while group is not None:
+            if group.mark_stamp > stamp:
+                stamp, value = group.mark_stamp, group.mark_value
+            group = group.parent
+        return value
+
+    def _set_item_checked(self, item_id, checked):
+        if self._is_checked(item_id) == checked:
+            return
+        self._stamps[item_id] = self._tick()
+        self._checked.set(item_id, checked)
+        for group in self._dirs[self._item_dirs[item_id]].chain():
+            self._settle(group)
+            group.checked += 1 if checked else -1
+
+    def _set_group_checked(self, group, checked):
+        """配下の全件のチェック状態を変更する（件数によらず分類の深さ分の処理）"""
+        delta = (group.count if checked else 0) - self._settle(group)
+        stamp = self._tick()
+        group.mark_stamp = stamp
+        group.mark_value = checked
+        group.checked = group.count if checked else 0
+        group.count_stamp = stamp
+        for ancestor in group.chain():
+            if ancestor is not group:
+                self._settle(ancestor)
+                ancestor.checked += delta
+
+    def _child(self, parent, kind, key, label):
+        """子の分類を返す（なければ末尾に追加して表示を更新する）"""
+        group = parent.index.get(key)
+        if group is None:
+            row = len(parent.children)
+            if self._notify:
+                self.beginInsertRows(self._index_of(parent), row, row)
+            group = _Group(kind, key, label, parent, row)
+            # 追加前の一括チェックは新しい分類に及ばない
+            group.count_stamp = self._tick()
+            parent.children.append(group)
+            parent.index[key] = group
+            if kind == self.DIRECTORY:
+                group.number = len(self._dirs)
+                self._dirs.append(group)
+            if self._notify:
+                self.endInsertRows()
+        return group
+
+    def _directory(self, root, pattern, parent):
+        root_group = self._child(self._top, self.ROOT, root, root or "-")
+        pattern_group = self._child(
+            root_group,
+            self.PATTERN,
+            pattern,
+            BUILTIN_PATTERNS.get(pattern, pattern),
+        )
+        parent_id = self._parent_ids.get(parent)
+        if parent_id is None:
+            parent_id = self._parent_ids[parent] = len(self._parents)
+            self._parents.extend([parent])
+        if not root:
+            label = parent
+        elif parent == root:
+            label = "."
+        elif parent.startswith(os.path.join(root, "")):
+            label = parent[len(os.path.join(root, "")) :]
+        else:
+            label = parent
+        return self._child(pattern_group, self.DIRECTORY, parent_id, label)
+
+    # --- Qtのモデル ---
+
+    def _index_of(self, group, column=0):
+        if group is self._top:
+            return QModelIndex()
+        return self.createIndex(group.row, column, group.parent)
+
+    def _group(self, index):
+        """インデックスが表す分類を返す（結果の行の場合はNone）"""
+        if not index.isValid():
+            return self._top
+        parent = index.internalPointer()
+        if parent.kind == self.DIRECTORY:
+            return None
+        return parent.children[index.row()]
+
+    def _item_id(self, index):
+        """インデックスが表す結果のIDを返す（分類の行の場合はNone）"""
+        parent = index.internalPointer()
+        if parent.kind != self.DIRECTORY:
+            return None
+        return parent.items[index.row()]
+
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        return self.createIndex(row, column, self._group(parent))
+
+    def parent(self, index=QModelIndex()):  # pylint: disable=arguments-differ
+        if not index.isValid():
+            return QModelIndex()
+        return self._index_of(index.internalPointer())
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        group = self._group(parent)
+        if group is None:
+            return 0
+        if group.kind == self.DIRECTORY:
+            return group.shown
+        return len(group.children)
+
+    def hasChildren(self, parent=QModelIndex()):
+        group = self._group(parent)
+        if group is None or parent.column() > 0:
+            return False
+        # ディレクトリは未表示の結果があっても展開できるようにする
+        return group.count > 0 or bool(group.children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        if index.column() != self.PATH_COLUMN:
+            return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        item_id = self._item_id(index)
+        if item_id is None:
+            return self._group_data(index, role)
+        if index.column() == self.SIZE_COLUMN:
+            if role == Qt.DisplayRole:
+                size = self._sizes[item_id]
+                if size == self.UNKNOWN_SIZE:
+                    self.request_size(item_id)  # 表示された行から計算する
+                    return "計算中..."
+                if size == self.UNAVAILABLE_SIZE:
+                    return "-"
+                return format_size(size)
+            if role == Qt.TextAlignmentRole:
+                return int(Qt.AlignRight | Qt.AlignVCenter)
+            return None
+        if role == Qt.DisplayRole:
+            return self._names[item_id]
+        if role == Qt.ToolTipRole:
+            return self._path(item_id)
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if self._is_checked(item_id) else Qt.Unchecked
+        return None
+
+    def _group_data(self, index, role):
+        group = self._group(index)
+        if index.column() == self.SIZE_COLUMN:
+            if role == Qt.DisplayRole:
+                return format_size(group.size) if group.unknown < group.count else ""
+            if role == Qt.ToolTipRole and group.unknown:
+                return f"容量を計算中: {group.unknown:,} 件"
+            if role == Qt.TextAlignmentRole:
+                return int(Qt.AlignRight | Qt.AlignVCenter)
+            return None
+        if role == Qt.DisplayRole:
+            return f"{group.label}  ({group.count:,} 件)"
+        if role == Qt.ToolTipRole:
+            if group.kind == self.DIRECTORY:
+                return self._parents[group.key]
+            return group.key
+        if role == Qt.CheckStateRole:
+            checked = self._settle(group)
+            if checked == 0:
+                return Qt.Unchecked
+            return Qt.Checked if checked == group.count else Qt.PartiallyChecked
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if (
+            not index.isValid()
+            or index.column() != self.PATH_COLUMN
+            or role != Qt.CheckStateRole
+        ):
+            return False
+        checked = value == Qt.Checked
+        item_id = self._item_id(index)
+        if item_id is None:
+            group = self._group(index)
+            if checked:
+                # 後から読み込む結果は未チェックで追加されるため、先に全件を読み込む
+                self.fetch_all()
+            self._set_group_checked(group, checked)
+            self._repaint_all()  # 配下と上位の行の表示が変わる
+            return True
+        self._set_item_checked(item_id, checked)
+        group = index.internalPointer()
+        while group is not self._top:
+            changed = self._index_of(group)
+            self.dataChanged.emit(changed, changed, [Qt.CheckStateRole])
+            group = group.parent
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+
+    def _repaint_all(self):
+        if self._top.children:
+            # 範囲が複数の列にまたがる変更は、ビューが表示中の全ての行を描き直す
+            self.dataChanged.emit(
+                self.index(0, self.PATH_COLUMN),
+                self.index(len(self._top.children) - 1, self.SIZE_COLUMN),
+                [Qt.CheckStateRole],
+            )
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return self._source is not None
+        group = self._group(parent)
+        return (
+            group is not None
+            and group.kind == self.DIRECTORY
+            and group is not self._showing
+            and group.shown < len(group.items)
+        )
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            group = self._group(parent)
+            if group is not None and group is not self._showing:
+                self._show(group, self.FETCH_SIZE)
+            return
+        if self._source is None:
+            return
+        batch = list(itertools.islice(self._source, self.FETCH_SIZE))
+        if len(batch) < self.FETCH_SIZE:
+            self._close_source()
+        # 連続する同じ検索対象の行をまとめて追加する
+        for root, group in itertools.groupby(batch, key=lambda row: row[1]):
+            group = list(group)
+            sizes = {path: size for path, _, size in group if size is not None}
+            self.add_paths([path for path, _, _ in group], sizes, root)
+
+    def _show(self, group, count):
+        """ディレクトリの結果をcount件まで追加で表示する"""
+        count = min(count, len(group.items) - group.shown)
+        if count <= 0 or group.kind != self.DIRECTORY:
+            return
+        first = group.shown
+        # 通知を受けたビューから同じディレクトリのfetchMore()が呼ばれても重ねて追加しない
+        self._showing = group
+        try:
+            self.beginInsertRows(self._index_of(group), first, first + count - 1)
+            group.shown += count
+            self.endInsertRows()
+        finally:
+            self._showing = None
+
+    # --- 結果の追加・削除 ---
+
+    def _path(self, item_id):
+        group = self._dirs[self._item_dirs[item_id]]
+        return os.path.join(self._parents[group.key], self._names[item_id])
+
+    def paths(self):
+        """全件のパスを追加順に返す"""
+        for item_id in range(len(self._names)):
+            yield self._path(item_id)
+
+    def root_of_path(self, path):
+        """パスを含む検索対象を返す（該当しない場合は空文字列）"""
+        best = ""
+        for group in self._top.children:
+            root = group.key
+            if len(root) > len(best) and (
+                path == root or path.startswith(os.path.join(root, ""))
+            ):
+                best = root
+        return best
+
+    def add_paths(self, paths, sizes=None, root=""):
+        """同じ検索対象で見つかったパスの一覧をまとめて追加
+
+        sizesには走査中に取得済みの容量 {パス: バイト数} を指定できる（使用した分は取り除く）。
+        """
+        if not paths:
+            return
+        pattern_of = self.pattern_of
+        entries = []
+        for path in paths:
+            size = sizes.pop(path, self.UNKNOWN_SIZE) if sizes else self.UNKNOWN_SIZE
+            pattern = pattern_of(path) if pattern_of else self.OTHER_PATTERN
+            parent, name = os.path.split(path)
+            entries.append((pattern, parent, name, size, False))
+        # 同じ分類の結果をまとめる（安定ソートのため分類の中では見つかった順）
+        entries.sort(key=lambda entry: (entry[0], entry[1]))
+        self._add_entries(root, entries)
+        self.totals_changed.emit()
+
+    def _add_entries(self, root, entries):
+        """(パターン, 親ディレクトリ, 名前, 容量, チェック状態) の一覧を分類ごとに追加
+
+        entriesは同じパターン・親ディレクトリのものが連続している必要がある。
+        """
+        changed = {}
+        for (pattern, parent), group_entries in itertools.groupby(
+            entries, key=lambda entry: (entry[0], entry[1])
+        ):
+            directory = self._directory(root, pattern, parent)
+            self._append_items(directory, list(group_entries))
+            for group in directory.chain():
+                changed[id(group)] = group
+        if self._notify:
+            # 件数・容量の変わったグループ行はまとめて1回だけ通知する
+            self._group_data_changed(changed.values())
+
+    def _group_data_changed(self, groups):
+        for group in groups:
+            if group is self._top:
+                continue
+            changed = self._index_of(group)
+            self.dataChanged.emit(changed, changed, [Qt.DisplayRole, Qt.CheckStateRole])
+            size_index = self._index_of(group, self.SIZE_COLUMN)
+            self.dataChanged.emit(size_index, size_index, [Qt.DisplayRole])
+
+    def _append_items(self, directory, entries):
+        dir_number = directory.number
+        first = len(self._names)
+        stamp = self._tick()  # 追加前の一括チェックは新しい結果に及ばない
+        size_total = 0
+        unknown = 0
+        checked = 0
+        names = []
+        for offset, (_, _, name, size, is_checked) in enumerate(entries):
+            names.append(name)
+            self._sizes.append(size)
+            self._stamps.append(stamp)
+            self._item_dirs.append(dir_number)
+            directory.items.append(first + offset)
+            if size >= 0:
+                size_total += size
+            elif size == self.UNKNOWN_SIZE:
+                unknown += 1
+            checked += is_checked
+        self._names.extend(names)
+        count = len(self._names)
+        self._checked.resize(count)
+        self._requested.resize(count)
+        if checked:
+            for offset, entry in enumerate(entries):
+                if entry[4]:
+                    self._checked.set(first + offset, True)
+        for group in directory.chain():
+            self._settle(group)
+            group.count += len(entries)
+            group.checked += checked
+            group.size += size_total
+            group.unknown += unknown
+        # 全て表示済みのディレクトリ（展開したもの）には、そのまま行を追加する
+        if directory.shown and directory.shown == len(directory.items) - len(entries):
+            self._show(directory, len(entries))
+
+    def clear(self):
+        self.beginResetModel()
+        self._close_source()
+        self._reset_store()
+        self._generation += 1
+        self.endResetModel()
+        self.totals_changed.emit()
+
+    def load(self, rows):
+        """結果ファイルの (パス, 検索対象, 容量またはNone) の反復子を一覧の内容にする
+
+        全件を先に読み込まず、ビューが必要とする分だけfetchMore()で取り出す。
+        """
+        self.clear()
+        self._source = iter(rows)
+        self.fetchMore()
+
+    def _close_source(self):
+        source, self._source = self._source, None
+        if hasattr(source, "close"):
+            source.close()  # ジェネレーターが開いているファイルを閉じる
+
+    def fetch_all(self):
+        """結果ファイルの残りを全て読み込む（全件が必要な操作の前に使用）"""
+        while self._source is not None:
+            self.fetchMore()
+
+    def set_all_checked(self, checked):
+        """全件のチェック状態を一括で変更"""
+        if checked:
+            self.fetch_all()
+        if not self._top.count:
+            return
+        self._set_group_checked(self._top, checked)
+        self._repaint_all()
+
+    def checked_paths(self):
+        paths = []
+        for directory in self._dirs:
+            # ディレクトリ単位で一括チェックの状態を求め、結果ごとには比較だけ行う
+            stamp, value = 0, False
+            for group in directory.chain():
+                if group.mark_stamp > stamp:
+                    stamp, value = group.mark_stamp, group.mark_value
+            parent = self._parents[directory.key]
+            for item_id in directory.items:
+                if stamp > self._stamps[item_id]:
+                    checked = value
+                else:
+                    checked = self._checked.get(item_id)
+                if checked:
+                    paths.append(os.path.join(parent, self._names[item_id]))
+        return paths
+
+    def normalized_paths(self):
+        """全件の正規化済みパスの集合を返す"""
+        return {os.path.normpath(path) for path in self.paths()}
+
+    def remove_checked(self, keep=frozenset()):
+        """チェックされた項目のうちkeepに含まれないものを一括で削除"""
+        self._rebuild(
+            lambda path, checked: checked and os.path.normpath(path) not in keep
+        )
+
+    def remove_paths(self, paths):
+        """正規化済みパスの集合に含まれる項目を一括で削除"""
+        if paths:
+            self._rebuild(lambda path, _checked: os.path.normpath(path) in paths)
+
+    def _rebuild(self, should_remove):
+        # 表示順のまま作り直す（並べ替えの結果を追加順として引き継ぐ）
+        kept = []
+        removed = []
+        for root in self._top.children:
+            entries = []
+            for pattern in root.children:
+                for directory in pattern.children:
+                    parent = self._parents[directory.key]
+                    for item_id in directory.items:
+                        name = self._names[item_id]
+                        path = os.path.join(parent, name)
+                        checked = self._is_checked(item_id)
+                        if should_remove(path, checked):
+                            removed.append(path)
+                            continue
+                        size = self._sizes[item_id]
+                        entries.append((pattern.key, parent, name, size, checked))
+            kept.append((root.key, entries))
+        self.size_calculator.forget(removed)
+
+        self.beginResetModel()
+        # 計算中だったものは新しい番号で依頼し直す
+        self._reset_store()
+        self._generation += 1
+        self._notify = False
+        try:
+            for root, entries in kept:
+                if entries:
+                    self._add_entries(root, entries)
+        finally:
+            self._notify = True
+        self.endResetModel()
+        self.totals_changed.emit()
+
+    # --- 容量 ---
+
+    def request_size(self, item_id):
+        """1件の容量の計算を依頼する（依頼済みの場合は何もしない）"""
+        if self._requested.get(item_id):
+            return
+        self._requested.set(item_id, True)
+        self.size_calculator.request((self._generation, item_id), self._path(item_id))
+        if not self._size_timer.isActive():
+            self._size_timer.start()
+
+    def request_all_sizes(self):
+        """容量が分からない全ての項目の計算を依頼する（バックグラウンドで実行）"""
+        for item_id, size in enumerate(self._sizes):
+            if size == self.UNKNOWN_SIZE:
+                self.request_size(item_id)
+
+    def _apply_sizes(self):
+        """計算が終わった容量を取り込み、変わった行と分類の合計を更新する"""
+        directories = {}
+        for (generation, item_id), size in self.size_calculator.drain():
+            if generation != self._generation:
+                continue  # 作り直す前の依頼
+            if self._sizes[item_id] != self.UNKNOWN_SIZE:
+                continue
+            directory = self._dirs[self._item_dirs[item_id]]
+            if size is None:
+                self._sizes[item_id] = self.UNAVAILABLE_SIZE
+                size = 0
+            else:
+                self._sizes[item_id] = size
+            for group in directory.chain():
+                group.unknown -= 1
+                group.size += size
+            directories[directory.number] = directory
+
+        if directories:
+            groups = {}
+            for directory in directories.values():
+                if directory.shown:
+                    self.dataChanged.emit(
+                        self.createIndex(0, self.SIZE_COLUMN, directory),
+                        self.createIndex(
+                            directory.shown - 1, self.SIZE_COLUMN, directory
+                        ),
+                        [Qt.DisplayRole],
+                    )
+                for group in directory.chain():
+                    if group is not self._top:
+                        groups[id(group)] = group
+            for group in groups.values():
+                changed = self._index_of(group, self.SIZE_COLUMN)
+                self.dataChanged.emit(changed, changed, [Qt.DisplayRole])
+            self.totals_changed.emit()
+        if not self.size_calculator.pending:
+            self._size_timer.stop()
+            if self.sort_column == self.SIZE_COLUMN and directories:
+                # 全ての容量が揃ったら並べ直す
+                self.sort(self.sort_column, self.sort_order)
+
+    # --- 並べ替え ---
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """各分類の中で並べ替える（容量が未計算のものは計算を依頼し、揃ったら並べ直す）"""
+        self.sort_column = column
+        self.sort_order = order
+        self.fetch_all()
+        if column == self.SIZE_COLUMN:
+            self.request_all_sizes()
+        elif column != self.PATH_COLUMN:
+            return
+
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        # 並べ替え前に、各インデックスが指す分類・結果を記録する
+        targets = []
+        for index in persistent:
+            parent = index.internalPointer()
+            if parent.kind == self.DIRECTORY:
+                targets.append(parent.items[index.row()])
+            else:
+                targets.append(parent.children[index.row()])
+        self._sort_group(self._top, column, order == Qt.DescendingOrder)
+        moved = []
+        for index, target in zip(persistent, targets):
+            parent = index.internalPointer()
+            if parent.kind != self.DIRECTORY:
+                moved.append(self.createIndex(target.row, index.column(), parent))
+                continue
+            row = parent.items.index(target)
+            if row < parent.shown:
+                moved.append(self.createIndex(row, index.column(), parent))
+            else:
+                moved.append(QModelIndex())  # 未表示の範囲に移った
+        self.changePersistentIndexList(persistent, moved)
+        self.layoutChanged.emit()
+
+    def _sort_group(self, group, column, reverse):
+        if group.kind == self.DIRECTORY:
+            if column == self.SIZE_COLUMN:
+                key = self._sizes.__getitem__
+            else:
+                key = self._names.__getitem__
+            group.items = array("Q", sorted(group.items, key=key, reverse=reverse))
+            return
+        if column == self.SIZE_COLUMN:
+            group.children.sort(key=lambda child: child.size, reverse=reverse)
+        else:
+            group.children.sort(key=lambda child: child.label, reverse=reverse)
+        for row, child in enumerate(group.children):
+            child.row = row
+            self._sort_group(child, column, reverse)
+
+
+class DeleteThread(QThread):
+    """ファイル削除を行うスレッド（iter_deleteの結果をシグナルに変換する）
+
+    結果は (パス, エラー理由またはNone) の一覧としてまとめて通知する。
+    """
+
+    progress = pyqtSignal(int, int)  # 処理済み件数, 全体の件数
+    results = pyqtSignal(list)  # (パス, エラー理由またはNone) の一覧
+    finished = pyqtSignal()  # 削除完了を通知
+
+    def __init__(self, paths, workers=4, permanent=False):
+        super().__init__()
+        self.paths = paths
+        self.workers = max(1, workers)
+        self.permanent = permanent  # ゴミ箱を使わずに削除するか
+        self._is_running = True
+        self.processed = 0
+        self.metrics = DeleteMetrics()
+
+    def stop(self):
+        self._is_running = False
+
+    def is_running(self):
+        return self._is_running
+
+    def run(self):
+        for results in iter_delete(
+            self.paths,
+            self.workers,
+            self.is_running,
+            metrics=self.metrics,
+            permanent=self.permanent,
+        ):
+            self.processed += len(results)
+            self.results.emit(results)
+            self.progress.emit(self.processed, len(self.paths))
+
+        self.finished.emit()
+
+
+class VerifyThread(QThread):
+    """削除後の再確認を行うスレッド（iter_verifyの結果をシグナルに変換する）
+
+    多数の親ディレクトリの一覧でGUIが止まらないよう、確認はこのスレッドで行う。
+    """
+
+    results = pyqtSignal(list, list)  # なくなったパス, 新たに見つかったパス
+    finished = pyqtSignal()  # 再確認の完了を通知
+
+    def __init__(self, paths, matcher):
+        super().__init__()
+        self.paths = paths
+        self.matcher = matcher
+        self._is_running = True
+        self.checked = False  # なくなったパスの確認まで終えたか
+
+    def stop(self):
+        self._is_running = False
+
+    def is_running(self):
+        return self._is_running
+
+    def run(self):
+        for gone, discovered in iter_verify(self.paths, self.matcher, self.is_running):
+            self.checked = True
+            self.results.emit(gone, discovered)
+
+        self.finished.emit()
+
+
+# 進捗表示の最大文字数
+MAX_DISPLAY_LENGTH = 80
+
+
+def truncate_path(path, prefix=""):
+    """パスが長い場合は中央を省略して表示用の文字列を返す"""
+    # プレフィックス（"検索中: "など）を考慮した実際の表示可能文字数
+    available_length = MAX_DISPLAY_LENGTH - len(prefix)
+    if len(path) <= available_length:
+        return prefix + path
+
+    # パスの分割
+    drive = ""
+    if sys.platform == "win32" and len(path) > 2 and path[1] == ":":
+        drive = path[:3]  # ドライブレター部分（例：'C:\\'）を保持
+        path = path[3:]
+
+    # 残りの長さから、先頭と末尾の表示文字数を計算
+    # ドライブ文字とセパレータ('...')の長さを考慮
+    remaining_length = available_length - len(drive) - 3  # 3は'...'の長さ
+    head_length = remaining_length // 2
+    tail_length = remaining_length - head_length
+
+    return prefix + drive + path[:head_length] + "..." + path[-tail_length:]
+
+
+class CleanSweepApp(QMainWindow):
+    THREAD_STOP_TIMEOUT = 5000  # 終了時に検索・削除スレッドを待つ最大時間（ミリ秒）
+    LAST_PROFILE_NAME = "前回の検索"  # 検索のたびに保存し、次回の起動時に復元する
+
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("CleanSweep")
+        self.setGeometry(100, 100, 1000, 600)
+
+        # アプリケーションアイコンの設定（絶対パスを使用）
+        icon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.ico")
+        if os.path.exists(icon_path):
+            self.setWindowIcon(QIcon(icon_path))
+
+        self.search_thread = None
+        self.delete_thread = None
+        self.verify_thread = None
+        self.verify_existing = None  # 再確認中に一覧にあるパス（重複の除外に使用）
+        self.watch_thread = None
+        self.watch_known = None  # 監視中に一覧へ追加済みのパス（重複の除外に使用）
+        self.watch_cleaned = 0  # 監視中に自動削除した件数
+        self.deleted_paths = []  # 削除に成功したパス
+        self.error_files = []  # エラーが発生したファイルのリスト
+        self.last_matcher = None  # 直近の検索条件（削除後の再確認に使用）
+
+        # ウィンドウを画面中央に配置
+        screen = QApplication.primaryScreen().geometry()
+        x = (screen.width() - self.width()) // 2
+        y = (screen.height() - self.height()) // 2
+        self.move(x, y)
+
+        # メインウィジェット
+        main_widget = QWidget()
+        self.setCentralWidget(main_widget)
+        layout = QVBoxLayout(main_widget)
+
+        # 上部の水平レイアウト（ファイルタイプと検索対象ディレクトリ）
+        top_layout = QHBoxLayout()
+        top_layout.setAlignment(Qt.AlignTop)  # 上揃え
+
+        # ファイルタイプの選択（スクロール可能）
+        file_types_scroll = QScrollArea()
+        file_types_scroll.setWidgetResizable(True)
+        file_types_scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        file_types_group = QWidget()
+        file_types_layout = QVBoxLayout(file_types_group)
+        file_types_layout.setAlignment(Qt.AlignTop)  # 上揃え
+
+        # クリーンアップ対象のヘッダー部分（ラベル + ボタン）
+        header_layout = QHBoxLayout()
+        header_layout.addWidget(QLabel("クリーンアップ対象:"))
+
+        # 全てチェックボタンを右揃えで追加
+        check_all_types_btn = QPushButton("全てチェック")
+        check_all_types_btn.setMaximumWidth(100)  # ボタンの幅を制限
+        check_all_types_btn.clicked.connect(self.check_all_file_types)
+        header_layout.addStretch()  # 左側にスペースを追加して右揃えに
+        header_layout.addWidget(check_all_types_btn)
+
+        file_types_layout.addLayout(header_layout)
+
+        self.file_types = {
+            pattern: QCheckBox(label) for pattern, label in BUILTIN_PATTERNS.items()
+        }
+
+        for checkbox in self.file_types.values():
+            checkbox.setChecked(False)  # デフォルトでチェックなし
+            file_types_layout.addWidget(checkbox)
+
+        # カスタムパターン追加ボタン
+        add_pattern_btn = QPushButton("パターンを追加...")
+        add_pattern_btn.clicked.connect(self.add_custom_pattern)
+        file_types_layout.addWidget(add_pattern_btn)
+        self.file_types_layout = file_types_layout
+
+        file_types_scroll.setWidget(file_types_group)
+        top_layout.addWidget(file_types_scroll)
+
+        # 検索対象ディレクトリ（スクロール可能）
+        targets_scroll = QScrollArea()
+        targets_scroll.setWidgetResizable(True)
+        targets_scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        targets_group = QWidget()
+        targets_layout = QVBoxLayout(targets_group)
+        targets_layout.setAlignment(Qt.AlignTop)  # 上揃え
+
+        # 検索対象ディレクトリのヘッダー部分（ラベル + ボタン）
+        targets_header_layout = QHBoxLayout()
+        targets_header_layout.addWidget(QLabel("検索対象ディレクトリ:"))
+
+        # 全てチェックボタンを右揃えで追加
+        check_all_dirs_btn = QPushButton("全てチェック")
+        check_all_dirs_btn.setMaximumWidth(100)  # ボタンの幅を制限
+        check_all_dirs_btn.clicked.connect(self.check_all_target_dirs)
+        targets_header_layout.addStretch()  # 左側にスペースを追加して右揃えに
+        targets_header_layout.addWidget(check_all_dirs_btn)
+
+        targets_layout.addLayout(targets_header_layout)
+
+        self.target_dirs = {}
+
+        # ホームディレクトリを追加
+        home = str(Path.home())
+        if sys.platform == "win32":
+            self.target_dirs["HOME"] = QCheckBox(f"ユーザープロファイル ({home})")
+        else:
+            self.target_dirs["HOME"] = QCheckBox(f"ホームディレクトリ ({home})")
+        self.target_dirs["HOME"].setProperty("path", home)
+
+        for checkbox in self.target_dirs.values():
+            targets_layout.addWidget(checkbox)
+        self.targets_layout = targets_layout
+        self.drive_indices = []  # 追加済みディスクの列挙順の番号（表示順の維持に使用）
+        # プロファイルで選択されたが、まだ検出されていないディスクのマウント先
+        self.pending_roots = set()
+
+        # カスタムディレクトリ追加ボタン
+        add_dir_btn = QPushButton("ディレクトリを追加...")
+        add_dir_btn.clicked.connect(self.add_custom_directory)
+        targets_layout.addWidget(add_dir_btn)
+
+        targets_scroll.setWidget(targets_group)
+        top_layout.addWidget(targets_scroll)
+
+        layout.addLayout(top_layout)
+
+        # 検索条件のプロファイル（パターン・検索対象・除外規則・並列数・速度制限）
+        profile_layout = QHBoxLayout()
+        profile_layout.addWidget(QLabel("プロファイル:"))
+        self.profile_combo = QComboBox()
+        self.profile_combo.setMinimumWidth(200)
+        self.profile_combo.activated.connect(self.apply_selected_profile)
+        profile_layout.addWidget(self.profile_combo)
+        save_profile_btn = QPushButton("保存...")
+        save_profile_btn.clicked.connect(self.save_current_profile)
+        profile_layout.addWidget(save_profile_btn)
+        delete_profile_btn = QPushButton("削除")
+        delete_profile_btn.clicked.connect(self.delete_selected_profile)
+        profile_layout.addWidget(delete_profile_btn)
+        profile_layout.addStretch()
+        layout.addLayout(profile_layout)
+
+        # 検索オプション
+        options_layout = QHBoxLayout()
+        options_layout.addWidget(QLabel("並列スキャン数:"))
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, 32)
+        self.workers_spin.setValue(1)  # 1の場合は逐次走査
+        self.workers_spin.setToolTip(
+            "SSDやネットワークストレージでは値を増やすと高速になる場合があります"
+        )
+        options_layout.addWidget(self.workers_spin)
+
+        # Zone.Identifierは通常ディレクトリ一覧から検出する
+        # Windows(NTFS)の代替データストリームは一覧に現れないため、既定で確認を有効にする
+        self.probe_zone_streams_cb = QCheckBox(
+            "Zone.Identifierをファイルごとに直接確認（低速）"
+        )
+        self.probe_zone_streams_cb.setChecked(sys.platform == "win32")
+        self.probe_zone_streams_cb.setToolTip(
+            "NTFSの代替データストリームを検出するには有効にしてください"
+        )
+        options_layout.addWidget(self.probe_zone_streams_cb)
+
+        self.use_index_cb = QCheckBox("スキャンインデックスで差分検索")
+        self.use_index_cb.setToolTip(
+            "前回から変更のないディレクトリは一覧を取り直さず、"
+            f"保存済みの結果を使用します\n保存先: {DEFAULT_INDEX_PATH}"
+        )
+        options_layout.addWidget(self.use_index_cb)
+
+        self.one_device_cb = QCheckBox("他のディスクに移動しない")
+        self.one_device_cb.setToolTip(
+            "検索対象と異なるファイルシステム（マウントされたディスク等）は走査しません"
+        )
+        options_layout.addWidget(self.one_device_cb)
+
+        # 物理ディスクごとに別プロセスで走査する（監視モードとは併用できない）
+        self.sharded_cb = QCheckBox("ディスクごとに並列検索")
+        self.sharded_cb.setToolTip(
+            "検索対象を物理ディスクごとに分け、ディスクごとに別プロセスで走査します\n"
+            "複数のディスクを検索する場合に、全体の時間が最も遅いディスクの時間に近づきます"
+        )
+        options_layout.addWidget(self.sharded_cb)
+
+        # 低負荷モード（他の作業の邪魔をしないよう、優先度を下げて走査速度を抑える）
+        self.low_priority_cb = QCheckBox("低負荷モード")
+        self.low_priority_cb.setToolTip(
+            "CPU・I/Oの優先度を下げ、ディスクが混雑している間は走査を控えます"
+        )
+        options_layout.addWidget(self.low_priority_cb)
+        options_layout.addWidget(QLabel("上限:"))
+        self.max_dirs_spin = QSpinBox()
+        self.max_dirs_spin.setRange(0, 100000)
+        self.max_dirs_spin.setSingleStep(100)
+        self.max_dirs_spin.setSpecialValueText("無制限")
+        self.max_dirs_spin.setSuffix(" ディレクトリ/秒")
+        self.max_dirs_spin.setToolTip("1秒あたりに走査するディレクトリ数の上限")
+        options_layout.addWidget(self.max_dirs_spin)
+
+        # 除外規則（1行に1つ。検索対象の.cleansweepignoreも併せて使用）
+        self.exclude_rules = []
+        self.exclude_btn = QPushButton("除外設定...")
+        self.exclude_btn.clicked.connect(self.edit_exclude_rules)
+        options_layout.addWidget(self.exclude_btn)
+        self.use_ignore_files_cb = QCheckBox(f"{IGNORE_FILE_NAME} を使用")
+        self.use_ignore_files_cb.setChecked(True)
+        self.use_ignore_files_cb.setToolTip(
+            f"検索対象の直下にある {IGNORE_FILE_NAME} の除外規則を適用します"
+        )
+        options_layout.addWidget(self.use_ignore_files_cb)
+
+        # 検索結果を順次ファイルに書き出す（後で読み込んで確認・削除できる）
+        self.export_path = None
+        self.export_cb = QCheckBox("結果をファイルに書き出す")
+        self.export_cb.toggled.connect(self.choose_export_path)
+        options_layout.addWidget(self.export_cb)
+
+        # 検索後の監視（新しく作られた.DS_Store等を検出）
+        self.watch_cb = QCheckBox("検索後に監視")
+        self.watch_cb.setToolTip(
+            "検索したディレクトリを監視し、新しく作られたものを一覧に追加します"
+        )
+        options_layout.addWidget(self.watch_cb)
+        self.auto_clean_cb = QCheckBox("自動で削除")
+        self.auto_clean_cb.setToolTip("監視中に見つかったものを確認せずに削除します")
+        self.auto_clean_cb.setEnabled(False)
+        self.watch_cb.toggled.connect(self.auto_clean_cb.setEnabled)
+        self.sharded_cb.toggled.connect(self.on_sharded_toggled)
+        options_layout.addWidget(self.auto_clean_cb)
+        options_layout.addStretch()
+        layout.addLayout(options_layout)
+
+        # 検索結果表示用のツリーウィジェット
+        self.results_model = ResultsModel(self)
+        self.results_view = QTreeView()
+        self.results_view.setModel(self.results_model)
+        # 検索対象の行は追加されたときに展開し、パターン・ディレクトリは必要に応じて展開
+        self.results_model.rowsInserted.connect(self.expand_new_roots)
+        # 行の高さを固定し、表示されている行だけを描画させる
+        self.results_view.setUniformRowHeights(True)
+        # 見出しのクリックで並べ替え（検索中に追加された行は末尾に表示）
+        header = self.results_view.header()
+        header.setSectionsClickable(True)
+        header.setSortIndicatorShown(True)
+        header.setSortIndicator(-1, Qt.AscendingOrder)
+        header.sortIndicatorChanged.connect(self.results_model.sort)
+        header.setStretchLastSection(False)
+        header.setSectionResizeMode(ResultsModel.PATH_COLUMN, QHeaderView.Stretch)
+        header.setSectionResizeMode(
+            ResultsModel.SIZE_COLUMN, QHeaderView.ResizeToContents
+        )
+        layout.addWidget(self.results_view)
+
+        # 削除で解放される容量の合計（パターン別・検索対象別はツールチップに表示）
+        self.totals_label = QLabel()
+        self.results_model.totals_changed.connect(self.update_totals)
+        layout.addWidget(self.totals_label)
+
+        # 監視の状態と停止ボタン
+        watch_layout = QHBoxLayout()
+        self.watch_label = QLabel()
+        watch_layout.addWidget(self.watch_label, 1)
+        self.stop_watch_btn = QPushButton("監視を停止")
+        self.stop_watch_btn.clicked.connect(self.stop_watch)
+        watch_layout.addWidget(self.stop_watch_btn)
+        self.watch_label.hide()
+        self.stop_watch_btn.hide()
+        layout.addLayout(watch_layout)
+
+        # 進捗表示
+        self.progress_label = QLabel()
+        self.progress_label.setWordWrap(True)  # テキストの折り返しを有効化
+        self.progress_label.setFixedHeight(60)  # 固定の高さを設定
+        self.progress_label.setAlignment(
+            Qt.AlignLeft | Qt.AlignVCenter
+        )  # 左揃え、垂直方向は中央
+        progress_font = self.progress_label.font()
+        progress_font.setPointSize(9)  # フォントサイズを小さく
+        self.progress_label.setFont(progress_font)
+        self.progress_label.hide()
+        layout.addWidget(self.progress_label)
+
+        # ボタン群
+        buttons_layout = QHBoxLayout()
+
+        self.search_btn = QPushButton("対象を検索")
+        self.search_btn.clicked.connect(self.search_files)
+        buttons_layout.addWidget(self.search_btn)
+
+        self.cancel_btn = QPushButton("キャンセル")
+        self.cancel_btn.clicked.connect(self.cancel_search)
+        self.cancel_btn.hide()
+        buttons_layout.addWidget(self.cancel_btn)
+
+        self.load_btn = QPushButton("結果を読み込む...")
+        self.load_btn.clicked.connect(self.load_results)
+        buttons_layout.addWidget(self.load_btn)
+
+        # 直近の検索・削除の計測結果（時間の内訳、エラー、遅いディレクトリ）
+        self.metrics_btn = QPushButton("計測結果...")
+        self.metrics_btn.clicked.connect(self.show_metrics)
+        self.metrics_btn.setEnabled(False)
+        buttons_layout.addWidget(self.metrics_btn)
+
+        self.select_all_btn = QPushButton("全選択")
+        self.select_all_btn.clicked.connect(lambda: self.toggle_all_selections(True))
+        buttons_layout.addWidget(self.select_all_btn)
+
+        self.deselect_all_btn = QPushButton("全解除")
+        self.deselect_all_btn.clicked.connect(lambda: self.toggle_all_selections(False))
+        buttons_layout.addWidget(self.deselect_all_btn)
+
+        # ゴミ箱を使わずに削除（.Spotlight-V100等の大きなディレクトリを高速に削除）
+        self.permanent_delete_cb = QCheckBox("完全に削除")
+        self.permanent_delete_cb.setToolTip(
+            "ゴミ箱に移動せずに直接削除します（監視中の自動削除にも適用）"
+        )
+        buttons_layout.addWidget(self.permanent_delete_cb)
+
+        self.cleanup_btn = QPushButton("クリーンアップ")
+        self.cleanup_btn.clicked.connect(self.cleanup_files)
+        self.cleanup_btn.setEnabled(False)
+        buttons_layout.addWidget(self.cleanup_btn)
+
+        layout.addLayout(buttons_layout)
+
+        # マウントされているディスクはバックグラウンドで検出し、応答したものから追加
+        self.drive_thread = DriveScanThread(self)
+        self.drive_thread.drive_found.connect(self.add_drive)
+        self.drive_thread.finished.connect(self.add_pending_roots)
+        self.drive_thread.start()
+
+        # 前回の検索条件を復元
+        self.profiles = {}
+        self.reload_profiles()
+        if self.LAST_PROFILE_NAME in self.profiles:
+            self.apply_profile(self.profiles[self.LAST_PROFILE_NAME])
+
+    def closeEvent(self, event):  # pylint: disable=invalid-name
+        self.stop_watch()
+        # 検索・削除は停止を確認する間隔以内に終わる（応答しない一覧は待たない）
+        for thread in (self.search_thread, self.delete_thread, self.verify_thread):
+            if thread is not None and thread.isRunning():
+                thread.stop()
+                thread.wait(self.THREAD_STOP_TIMEOUT)
+        self.results_model.size_calculator.shutdown()
+        # ディスク検出はタイムアウトで必ず終わるため、終了を待ってから閉じる
+        self.drive_thread.wait()
+        super().closeEvent(event)
+
+    def check_all_file_types(self):
+        """クリーンアップ対象の全てのチェックボックスをオンにする"""
+        for checkbox in self.file_types.values():
+            checkbox.setChecked(True)
+
+    def check_all_target_dirs(self):
+        """検索対象ディレクトリの全てのチェックボックスをオンにする"""
+        for checkbox in self.target_dirs.values():
+            if checkbox.isEnabled():
+                checkbox.setChecked(True)
+
+    def add_drive(self, index, mountpoint, drive_text, available):
+        """検出されたディスクのチェックボックスを列挙順の位置に追加"""
+        if mountpoint in self.target_dirs:
+            return
+        checkbox = QCheckBox(drive_text)
+        # デバイス名ではなくマウント先を検索する
+        checkbox.setProperty("path", mountpoint)
+        if mountpoint in self.pending_roots:
+            self.pending_roots.discard(mountpoint)
+            checkbox.setChecked(available)
+        if not available:
+            checkbox.setEnabled(False)
+            checkbox.setToolTip("マウントが応答しません")
+        self.target_dirs[mountpoint] = checkbox
+
+        # ヘッダーとホームディレクトリの後ろに、列挙順を保って挿入
+        position = bisect.bisect(self.drive_indices, index)
+        self.drive_indices.insert(position, index)
+        self.targets_layout.insertWidget(2 + position, checkbox)
+
+    def on_sharded_toggled(self, checked):
+        """別プロセスでの走査は走査したディレクトリを逐一返さないため、監視と併用しない"""
+        if checked:
+            self.watch_cb.setChecked(False)
+        self.watch_cb.setEnabled(not checked)
+
+    def choose_export_path(self, checked):
+        """検索結果の書き出し先を選択（キャンセルした場合はチェックを外す）"""
+        if not checked:
+            self.export_path = None
+            self.export_cb.setToolTip("")
+            return
+        path, _ = QFileDialog.getSaveFileName(
+            self, "書き出し先", "", RESULT_FILE_FILTER
+        )
+        if not path:
+            self.export_cb.setChecked(False)
+            return
+        self.export_path = path
+        self.export_cb.setToolTip(path)
+
+    def load_results(self):
+        """書き出した検索結果を読み込む（表示に必要な分から順に読み込む）"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, "検索結果を読み込む", "", RESULT_FILE_FILTER
+        )
+        if not path:
+            return
+        self.stop_watch()
+        # 読み込んだ結果の分類と削除後の再確認には、選択可能な全パターンを使用する
+        self.last_matcher = PatternMatcher(
+            list(self.file_types), self.probe_zone_streams_cb.isChecked()
+        )
+        self.results_model.pattern_of = make_pattern_classifier(self.last_matcher)
+        try:
+            self.results_model.load(iter_results(path))
+        except (OSError, ValueError) as e:
+            self.results_model.clear()
+            QMessageBox.critical(self, "エラー", f"読み込めませんでした:\n{str(e)}")
+            return
+        self.cleanup_btn.setEnabled(self.results_model.item_count() > 0)
+
+    def collect_metrics(self):
+        """直近の検索・削除の計測結果を {"scan": ..., "delete": ...} で返す"""
+        metrics = {}
+        if self.search_thread is not None:
+            metrics["scan"] = self.search_thread.engine.metrics
+        if self.delete_thread is not None:
+            metrics["delete"] = self.delete_thread.metrics
+        return metrics
+
+    def show_metrics(self):
+        """計測結果を表示し、必要に応じてJSONで保存する"""
+        metrics = self.collect_metrics()
+        if not metrics:
+            return
+        titles = {"scan": "検索", "delete": "削除"}
+        text = "\n\n".join(
+            f"【{titles[kind]}】\n{item.report()}" for kind, item in metrics.items()
+        )
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("計測結果")
+        dialog.resize(800, 500)
+        layout = QVBoxLayout(dialog)
+        view = QPlainTextEdit(text)
+        view.setReadOnly(True)
+        view.setLineWrapMode(QPlainTextEdit.NoWrap)
+        layout.addWidget(view)
+        buttons = QDialogButtonBox(QDialogButtonBox.Close)
+        save_btn = buttons.addButton("JSONで保存...", QDialogButtonBox.ActionRole)
+        save_btn.clicked.connect(lambda: self.save_metrics(metrics))
+        buttons.rejected.connect(dialog.reject)
+        layout.addWidget(buttons)
+        dialog.exec_()
+
+    def save_metrics(self, metrics):
+        path, _ = QFileDialog.getSaveFileName(
+            self,
+            "計測結果を保存",
+            "cleansweep_metrics.json",
+            "JSON (*.json);;すべてのファイル (*)",
+        )
+        if not path:
+            return
+        try:
+            save_metrics(path, metrics)
+        except OSError as e:
+            QMessageBox.critical(self, "エラー", f"保存できませんでした:\n{str(e)}")
+
+    def edit_exclude_rules(self):
+        """走査しないディレクトリの規則を編集"""
+        text, ok = QInputDialog.getMultiLineText(
+            self,
+            "除外設定",
+            "走査しないディレクトリ（1行に1つ）:\n"
+            "名前・グロブ（node_modules, *.snapshot）は全ての階層、\n"
+            "相対パス（photos/cache）は各検索対象から、絶対パスはそのディレクトリを除外",
+            "\n".join(self.exclude_rules),
+        )
+        if not ok:
+            return
+        self.exclude_rules = parse_exclusion_rules(text)
+        count = len(self.exclude_rules)
+        self.exclude_btn.setText(f"除外設定 ({count})..." if count else "除外設定...")
+
+    def add_custom_pattern(self):
+        """任意のグロブパターンをクリーンアップ対象に追加"""
+        pattern, ok = QInputDialog.getText(
+            self,
+            "パターンを追加",
+            "ファイル名のグロブパターン（ディレクトリの場合は末尾に / を付加）:",
+        )
+        pattern = pattern.strip()
+        if not ok or not pattern:
+            return
+        if "/" in pattern.rstrip("/") or "\\" in pattern:
+            QMessageBox.warning(
+                self, "警告", "パターンにはパス区切り文字を含めないでください。"
+            )
+            return
+        self.check_pattern(pattern)
+
+    def check_pattern(self, pattern):
+        """パターンのチェックボックスをオンにする（ないものはカスタムとして追加）"""
+        if pattern not in self.file_types:
+            self.file_types[pattern] = QCheckBox(f"カスタム: {pattern}")
+            self.file_types_layout.insertWidget(
+                self.file_types_layout.count() - 1, self.file_types[pattern]
+            )  # 追加ボタンの前に挿入
+        self.file_types[pattern].setChecked(True)
+
+    def add_custom_directory(self):
+        dir_path = QFileDialog.getExistingDirectory(self, "ディレクトリを選択")
+        if dir_path:
+            self.check_directory(dir_path)
+
+    def find_target_dir(self, path):
+        """pathを検索するチェックボックスを返す（ない場合はNone）"""
+        key = os.path.normcase(os.path.abspath(path))
+        for checkbox in self.target_dirs.values():
+            target = checkbox.property("path")
+            if target and os.path.normcase(os.path.abspath(target)) == key:
+                return checkbox
+        return None
+
+    def check_directory(self, path):
+        """ディレクトリのチェックボックスをオンにする（ないものはカスタムとして追加）"""
+        checkbox = self.find_target_dir(path)
+        if checkbox is None:
+            checkbox = QCheckBox(f"カスタム: {path}")
+            checkbox.setProperty("path", path)
+            self.target_dirs[f"custom_{len(self.target_dirs)}"] = checkbox
+            self.targets_layout.insertWidget(
+                self.targets_layout.count() - 1, checkbox
+            )  # 追加ボタンの前に挿入
+        checkbox.setChecked(True)
+
+    def add_pending_roots(self):
+        """ディスクの検出後も見つからなかった検索対象はカスタムとして追加する"""
+        for path in sorted(self.pending_roots):
+            self.check_directory(path)
+        self.pending_roots.clear()
+
+    def reload_profiles(self, selected=None):
+        """保存されたプロファイルを読み込み、一覧を更新する"""
+        try:
+            self.profiles = load_profiles()
+        except (OSError, ValueError) as e:
+            self.profiles = {}
+            self.show_message(f"エラー: プロファイルを読み込めません - {str(e)}")
+        self.profile_combo.clear()
+        self.profile_combo.addItems(sorted(self.profiles))
+        if selected in self.profiles:
+            self.profile_combo.setCurrentText(selected)
+
+    def apply_selected_profile(self):
+        profile = self.profiles.get(self.profile_combo.currentText())
+        if profile is not None:
+            self.apply_profile(profile)
+
+    def apply_profile(self, profile):
+        """プロファイルの検索条件を画面に反映する"""
+        for checkbox in self.file_types.values():
+            checkbox.setChecked(False)
+        for pattern in profile.patterns:
+            self.check_pattern(pattern)
+
+        for checkbox in self.target_dirs.values():
+            checkbox.setChecked(False)
+        self.pending_roots.clear()
+        for root in profile.roots:
+            if self.find_target_dir(root) is None and self.drive_thread.isRunning():
+                self.pending_roots.add(root)  # 検出中のディスクの可能性がある
+            else:
+                self.check_directory(root)
+
+        self.exclude_rules = list(profile.exclude)
+        count = len(self.exclude_rules)
+        self.exclude_btn.setText(f"除外設定 ({count})..." if count else "除外設定...")
+        self.use_ignore_files_cb.setChecked(profile.use_ignore_files)
+        self.one_device_cb.setChecked(profile.one_device)
+        self.probe_zone_streams_cb.setChecked(profile.probe_zone_streams)
+        self.workers_spin.setValue(profile.workers)
+        self.sharded_cb.setChecked(profile.per_device)
+        self.use_index_cb.setChecked(profile.index_path is not None)
+        self.max_dirs_spin.setValue(int(profile.max_dirs_per_second or 0))
+        self.low_priority_cb.setChecked(profile.low_priority)
+
+    def current_profile(self, name=""):
+        """画面の検索条件をプロファイルとして返す"""
+        return ScanProfile(
+            name,
+            patterns=[k for k, v in self.file_types.items() if v.isChecked()],
+            roots=[
+                checkbox.property("path")
+                for checkbox in self.target_dirs.values()
+                if checkbox.isChecked() and checkbox.property("path")
+            ]
+            + sorted(self.pending_roots),
+            exclude=list(self.exclude_rules),
+            use_ignore_files=self.use_ignore_files_cb.isChecked(),
+            one_device=self.one_device_cb.isChecked(),
+            probe_zone_streams=self.probe_zone_streams_cb.isChecked(),
+            workers=self.workers_spin.value(),
+            per_device=self.sharded_cb.isChecked(),
+            index_path=DEFAULT_INDEX_PATH if self.use_index_cb.isChecked() else None,
+            max_dirs_per_second=self.max_dirs_spin.value(),
+            low_priority=self.low_priority_cb.isChecked(),
+        )
+
+    def save_current_profile(self):
+        """現在の検索条件に名前を付けて保存"""
+        name, ok = QInputDialog.getText(
+            self, "プロファイルを保存", "名前:", text=self.profile_combo.currentText()
+        )
+        name = name.strip()
+        if not ok or not name:
+            return
+        try:
+            save_profile(self.current_profile(name))
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(
+                self, "エラー", f"プロファイルを保存できません - {str(e)}"
+            )
+            return
+        self.reload_profiles(name)
+
+    def delete_selected_profile(self):
+        name = self.profile_combo.currentText()
+        if not name:
+            return
+        try:
+            delete_profile(name)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(
+                self, "エラー", f"プロファイルを削除できません - {str(e)}"
+            )
+            return
+        self.reload_profiles()
+
+    def search_files(self):
+        self.stop_watch()
+        self.results_model.clear()
+        self.cleanup_btn.setEnabled(False)
+
+        # 選択されたファイルタイプとディレクトリ（チェックボックスごとの検索先）
+        profile = self.current_profile(self.LAST_PROFILE_NAME)
+        if not profile.patterns:
+            QMessageBox.warning(self, "警告", "クリーンアップ対象を選択してください。")
+            return
+        if not profile.roots:
+            QMessageBox.warning(
+                self, "警告", "検索対象ディレクトリを選択してください。"
+            )
+            return
+        try:
+            save_profile(profile)  # 次回の起動時に復元する
+            self.reload_profiles(self.profile_combo.currentText())
+        except (OSError, ValueError) as e:
+            self.show_message(f"エラー: 検索条件を保存できません - {str(e)}")
+
+        # 検索スレッドの開始（パターンは検索スレッドが走査計画から取得する）
+        self.last_matcher = None
+        self.results_model.pattern_of = None
+        self.search_thread = SearchThread(profile, export_path=self.export_path)
+        self.search_thread.progress.connect(self.update_progress)
+        self.search_thread.message.connect(self.show_message)
+        self.search_thread.found_files.connect(self.add_found_files)
+        self.search_thread.finished.connect(self.search_finished)
+
+        # 監視モードでは、検索中に走査したディレクトリから順に監視を登録する
+        self.watch_thread = None
+        if self.watch_cb.isChecked():
+            self.watch_thread = WatchThread(
+                self.search_thread.engine,
+                self.auto_clean_cb.isChecked(),
+                self.permanent_delete_cb.isChecked(),
+            )
+            self.watch_thread.found_files.connect(self.add_watched_files)
+            self.watch_thread.cleaned.connect(self.add_watch_cleaned)
+            self.watch_thread.message.connect(self.watch_label.setText)
+            self.watch_thread.finished.connect(self.watch_finished)
+            self.search_thread.watcher = self.watch_thread.watcher
+
+        # UI状態の更新
+        self.search_btn.setEnabled(False)
+        self.load_btn.setEnabled(False)
+        self.metrics_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(True)
+        self.cancel_btn.show()
+        self.progress_label.show()
+        self.progress_label.setText("検索を開始します...")
+
+        self.search_thread.start()
+
+    def cancel_search(self):
+        for thread in (self.delete_thread, self.verify_thread):
+            if thread and thread.isRunning():
+                thread.stop()
+                self.progress_label.setText("キャンセル中...")
+                return
+        if self.search_thread and self.search_thread.isRunning():
+            # 終了は待たずに画面へ戻り、スレッドの終了時にsearch_finishedで後片付けする
+            # （それまでに見つかった結果は一覧に残る）
+            self.search_thread.stop()
+            self.cancel_btn.setEnabled(False)
+            self.progress_label.setText("キャンセル中...")
+
+    def update_progress(self, progress):
+        """検索スレッドから届いた進捗を表示（省略表示はここで1回だけ行う）"""
+        if not self.search_thread.engine.is_running():
+            return  # キャンセル中の表示を上書きしない
+        stats = (
+            f"{progress.dirs_scanned:,} ディレクトリ / "
+            f"{progress.files_scanned:,} エントリ / "
+            f"一致 {progress.matches:,} 件 "
+            f"({progress.dirs_per_second:,.0f} ディレクトリ/秒, "
+            f"{progress.elapsed:.1f} 秒)"
+        )
+        if progress.throttled:
+            stats += f" 制限による休止 {progress.throttled:.1f} 秒"
+        self.progress_label.setText(
+            "\n".join(
+                [
+                    truncate_path(progress.root, "検索中: "),
+                    truncate_path(progress.current_dir, "ディレクトリ: "),
+                    stats,
+                ]
+            )
+        )
+
+    def show_message(self, message):
+        """検索スレッドからの状態メッセージを表示"""
+        if message.startswith("検索中:"):
+            message = truncate_path(message.split("検索中:", 1)[1].strip(), "検索中: ")
+        elif len(message) > MAX_DISPLAY_LENGTH:
+            message = message[: MAX_DISPLAY_LENGTH - 3] + "..."
+        self.progress_label.setText(message)
+
+    def use_search_matcher(self):
+        """検索スレッドが使ったコンパイル済みのパターンを、分類と削除後の再確認に使う"""
+        if self.last_matcher is None:
+            self.last_matcher = self.search_thread.engine.matcher
+            self.results_model.pattern_of = make_pattern_classifier(self.last_matcher)
+
+    def add_found_files(self, root, file_paths):
+        """検索スレッドから届いた結果をまとめて一覧に追加"""
+        # 結果は検索スレッドが走査計画のパターンを設定した後に届く
+        self.use_search_matcher()
+        self.results_model.add_paths(
+            file_paths, self.search_thread.engine.file_sizes, root
+        )
+        if not self.cleanup_btn.isEnabled():
+            # ファイルが見つかった時点でクリーンアップボタンを有効化
+            self.cleanup_btn.setEnabled(True)
+
+    def search_finished(self):
+        self.use_search_matcher()
+        self.search_btn.setEnabled(True)
+        self.load_btn.setEnabled(True)
+        self.metrics_btn.setEnabled(True)
+        self.cancel_btn.hide()
+        self.progress_label.hide()
+        self.cleanup_btn.setEnabled(self.results_model.item_count() > 0)
+        # 合計を出すため、残りの容量もバックグラウンドで計算する
+        self.results_model.request_all_sizes()
+        self.start_watch()
+
+        failed_roots = self.search_thread.engine.failed_roots
+        if failed_roots:
+            QMessageBox.warning(
+                self,
+                "警告",
+                "以下の検索対象は走査を最後まで終えられませんでした"
+                "（結果は不完全です）:\n\n" + "\n".join(failed_roots),
+            )
+        elif self.results_model.item_count() == 0:
+            QMessageBox.information(
+                self, "完了", "対象ファイルは見つかりませんでした。"
+            )
+
+    def start_watch(self):
+        """検索が最後まで終わった場合のみ監視を開始する"""
+        watch_thread = self.watch_thread
+        if (
+            watch_thread is None
+            or watch_thread.isRunning()
+            or watch_thread.isFinished()
+            or not self.search_thread.engine.is_running()
+        ):
+            return
+        self.watch_known = None
+        self.watch_cleaned = 0
+        self.watch_label.setText("監視を開始します...")
+        self.watch_label.show()
+        self.stop_watch_btn.show()
+        watch_thread.start()
+
+    def stop_watch(self):
+        if self.watch_thread and self.watch_thread.isRunning():
+            self.watch_thread.stop()
+            self.watch_thread.wait()  # 停止の確認間隔以内に終わる
+
+    def watch_finished(self):
+        self.watch_label.hide()
+        self.stop_watch_btn.hide()
+        self.watch_known = None
+
+    def add_watched_files(self, root, file_paths):
+        """監視で見つかったもののうち、一覧にないものだけを追加"""
+        if self.watch_known is None:
+            self.watch_known = self.results_model.normalized_paths()
+        known = self.watch_known
+        new_paths = []
+        for path in file_paths:
+            normalized = os.path.normpath(path)
+            if normalized not in known:
+                known.add(normalized)
+                new_paths.append(path)
+        if new_paths:
+            self.results_model.add_paths(new_paths, root=root)
+            self.watch_label.setText(f"監視中: 新しく{len(new_paths)}件見つかりました")
+            if not any(
+                thread and thread.isRunning()
+                for thread in (self.delete_thread, self.verify_thread)
+            ):
+                self.cleanup_btn.setEnabled(True)
+
+    def add_watch_cleaned(self, results):
+        """監視中に自動削除した結果を表示"""
+        self.watch_cleaned += sum(1 for _, error in results if error is None)
+        failed = [f"{path} → {error}" for path, error in results if error]
+        text = f"監視中: {self.watch_cleaned:,}件を自動で削除しました"
+        if failed:
+            text += f"（失敗: {failed[-1]}）"
+        self.watch_label.setText(text)
+
+    def update_totals(self):
+        """削除で解放される容量の合計を表示"""
+        model = self.results_model
+        if not model.item_count():
+            self.totals_label.clear()
+            self.totals_label.setToolTip("")
+            return
+        text = f"解放される容量: {format_size(model.total_size)}"
+        if model.unknown_count:
+            text += f"（計算中 {model.unknown_count:,} 件）"
+        self.totals_label.setText(text)
+
+        lines = ["パターン別:"]
+        for name, size in sorted(model.pattern_totals.items(), key=lambda t: -t[1]):
+            lines.append(f"  {name}: {format_size(size)}")
+        lines.append("検索対象別:")
+        for name, size in sorted(model.root_totals.items(), key=lambda t: -t[1]):
+            lines.append(f"  {name}: {format_size(size)}")
+        self.totals_label.setToolTip("\n".join(lines))
+
+    def expand_new_roots(self, parent, first, last):
+        if not parent.isValid():
+            for row in range(first, last + 1):
+                self.results_view.expand(self.results_model.index(row, 0))
+
+    def toggle_all_selections(self, checked):
+        self.results_model.set_all_checked(checked)
+
+    def cleanup_files(self):
+        # 選択されたファイルを収集
+        selected_files = self.results_model.checked_paths()  # パスをそのまま保持
+
+        if not selected_files:
+            QMessageBox.warning(self, "警告", "削除するファイルが選択されていません。")
+            return
+
+        # 確認ダイアログ
+        msg = QMessageBox()
+        msg.setIcon(QMessageBox.Warning)
+        permanent = self.permanent_delete_cb.isChecked()
+        msg.setText(f"{len(selected_files)}個のファイルを削除しますか？")
+        if permanent:
+            msg.setInformativeText(
+                "ゴミ箱に移動せずに完全に削除します。この操作は元に戻せません。"
+            )
+        else:
+            msg.setInformativeText("この操作は元に戻せません。")
+        msg.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
+        msg.setDefaultButton(QMessageBox.No)
+
+        if msg.exec_() != QMessageBox.Yes:
+            return
+
+        # 削除スレッドの開始
+        self.deleted_paths = []
+        self.error_files = []
+        self.delete_thread = DeleteThread(
+            selected_files, workers=self.workers_spin.value(), permanent=permanent
+        )
+        self.delete_thread.progress.connect(self.update_cleanup_progress)
+        self.delete_thread.results.connect(self.add_cleanup_results)
+        self.delete_thread.finished.connect(self.cleanup_finished)
+
+        # UI状態の更新
+        self.set_busy(True)
+        self.progress_label.setText("削除を開始します...")
+
+        self.delete_thread.start()
+
+    def set_busy(self, busy):
+        """検索・削除の実行中は操作ボタンを無効化し、キャンセルボタンを表示"""
+        for button in (
+            self.search_btn,
+            self.load_btn,
+            self.metrics_btn,
+            self.select_all_btn,
+            self.deselect_all_btn,
+            self.cleanup_btn,
+        ):
+            button.setEnabled(not busy)
+        self.cancel_btn.setEnabled(True)
+        self.cancel_btn.setVisible(busy)
+        self.progress_label.setVisible(busy)
+
+    def update_cleanup_progress(self, done, total):
+        self.progress_label.setText(f"削除中: {done:,} / {total:,} 件")
+
+    def add_cleanup_results(self, results):
+        """削除スレッドから届いた結果を成功と失敗に振り分ける"""
+        for path, error in results:
+            if error is None:
+                self.deleted_paths.append(path)
+            else:
+                self.error_files.append((path, error))
+
+    def cleanup_finished(self):
+        error_files = self.error_files
+        selected_count = len(self.delete_thread.paths)
+        processed = self.delete_thread.processed
+        self.set_busy(False)
+
+        # エラーメッセージの表示
+        if error_files:
+            error_msg = "以下のファイルの削除中にエラーが発生しました:\n\n"
+            for file_path, error in error_files:
+                error_msg += f"{file_path}\n→ {error}\n"
+            QMessageBox.critical(self, "エラー", error_msg)
+
+        # 完了メッセージと再検索の確認
+        message = f"クリーンアップが完了しました。\n成功: {len(self.deleted_paths)}件"
+        if error_files:
+            message += f"\n失敗: {len(error_files)}件"
+        if processed < selected_count:
+            message += f"\n未処理（キャンセル）: {selected_count - processed}件"
+
+        rescan_msg = QMessageBox()
+        rescan_msg.setIcon(QMessageBox.Question)
+        rescan_msg.setText(message)
+        rescan_msg.setInformativeText(
+            "削除したファイルとその親ディレクトリを再確認しますか？"
+        )
+        rescan_msg.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
+        rescan_msg.setDefaultButton(QMessageBox.Yes)
+
+        self.watch_known = None  # 削除したものが再作成されたら再び追加する
+        if rescan_msg.exec_() == QMessageBox.Yes and self.last_matcher:
+            self.verify_cleanup(self.deleted_paths + [path for path, _ in error_files])
+            return
+        # 削除に成功したファイルをリストから一括で除外
+        self.results_model.remove_paths(set(self.deleted_paths))
+        # クリーンアップボタンの状態を更新
+        self.cleanup_btn.setEnabled(self.results_model.item_count() > 0)
+
+    def verify_cleanup(self, deleted_paths):
+        """削除したパスと親ディレクトリだけを別スレッドで再確認し、該当する結果のみ更新"""
+        self.verify_existing = None
+        self.verify_thread = VerifyThread(deleted_paths, self.last_matcher)
+        self.verify_thread.results.connect(self.add_verify_results)
+        self.verify_thread.finished.connect(self.verify_finished)
+
+        self.set_busy(True)
+        self.progress_label.setText("削除したパスと親ディレクトリを再確認中...")
+
+        self.verify_thread.start()
+
+    def add_verify_results(self, gone, discovered):
+        """再確認スレッドから届いた結果を一覧に反映"""
+        model = self.results_model
+        if gone:
+            model.remove_paths(set(gone))
+        if not discovered:
+            return
+
+        # 親ディレクトリで新たに見つかったもの（再作成された.DS_Store等）を追加
+        if self.verify_existing is None:
+            self.verify_existing = model.normalized_paths()
+        existing = self.verify_existing
+        new_paths = []
+        for path in discovered:
+            normalized = os.path.normpath(path)
+            if normalized not in existing:
+                existing.add(normalized)
+                new_paths.append(path)
+        for root, group in itertools.groupby(new_paths, key=model.root_of_path):
+            model.add_paths(list(group), root=root)
+
+    def verify_finished(self):
+        if not self.verify_thread.checked:
+            # 確認の前にキャンセルした場合は、削除に成功したものだけを除外する
+            self.results_model.remove_paths(set(self.deleted_paths))
+        self.verify_existing = None
+        self.watch_known = None  # 再確認中に監視で追加したものも含めて作り直す
+        self.set_busy(False)
+        # クリーンアップボタンの状態を更新
+        self.cleanup_btn.setEnabled(self.results_model.item_count() > 0)
+
+
+def make_pattern_classifier(matcher):
+    """パスを一致したパターンに分類する関数を返す（容量の集計に使用）"""
+
+    def pattern_of(path):
+        name = os.path.basename(path)
+        return matcher.match_dir(name) or matcher.match_file(name) or "その他"
+
+    return pattern_of
+
+
+def main():
+    app = QApplication(sys.argv)
+    window = CleanSweepApp()
+    window.show()
+    sys.exit(app.exec_())
@@ -0,0 +1,262 @@
+"""CleanSweepの監視モード（PyQt5に依存しない）
+
+最初の検索で走査したディレクトリにinotifyの監視を登録し、新しく作られた名前が
+パターンに一致したものだけを通知する。監視後の処理量はツリーの大きさではなく
+変更の頻度に比例する。
+
+inotifyが使えない環境（Linux以外）や監視数の上限（fs.inotify.max_user_watches）に
+達した場合は、定期的な再検索に切り替える（スキャンインデックスが指定されていれば
+変更のないディレクトリは一覧しない）。
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+
+from clean_sweep_engine import list_directory, walk_matches
+
+# inotifyのイベント（<sys/inotify.h>）
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+
+WATCH_MASK = IN_CREATE | IN_MOVED_TO | IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK
+
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class Inotify:
+    """inotifyの最小限のラッパー（ctypesでlibcを直接呼び出す）"""
+
+    READ_SIZE = 64 * 1024
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._add_watch.restype = ctypes.c_int
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+
+    @staticmethod
+    def is_supported():
+        return sys.platform.startswith("linux")
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        """監視を登録して監視番号を返す（失敗した場合はOSError）"""
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), path)
+        return wd
+
+    def read_events(self, timeout):
+        """イベントを (監視番号, マスク, 名前) の一覧で返す（timeout秒待っても無ければ空）"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, self.READ_SIZE)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class TreeWatcher:
+    """検索したディレクトリツリーを監視し、一致する名前が作られたら通知する
+
+    検索中にadd_directory()で走査したディレクトリとそこで一致したパスを登録し、
+    検索後にrun()を呼び出す。新しく一致したパスは on_found(検索対象, パスの一覧) で通知する。
+    定期的な再検索（またはイベントの取りこぼし時の再検索）では、既知のパス
+    （最初の検索結果と通知済みのもの）を除いて通知する。
+    """
+
+    POLL_INTERVAL = 0.5  # 停止の確認間隔（秒）
+    RESCAN_INTERVAL = 60.0  # 再検索に切り替えた場合の検索間隔（秒）
+
+    def __init__(self, engine, on_found, on_message=None):
+        self.engine = engine
+        self.on_found = on_found
+        self.on_message = on_message or (lambda _message: None)
+        self._watches = {}  # 監視番号 -> (ディレクトリ, 検索対象)
+        self._exclusions = {}  # 検索対象 -> 除外規則
+        self._known = set()  # 存在を確認済みの一致したパス（再検索で通知しない）
+        self.fallback = False  # 定期的な再検索に切り替えたか
+        self._inotify = None
+        if Inotify.is_supported():
+            try:
+                self._inotify = Inotify()
+            except OSError as e:
+                self._start_fallback(f"inotifyを使用できません - {str(e)}")
+        else:
+            self._start_fallback("この環境ではinotifyを使用できません")
+
+    @property
+    def watch_count(self):
+        return len(self._watches)
+
+    def _start_fallback(self, reason):
+        if self.fallback:
+            return
+        self.fallback = True
+        # スキャンインデックスは指定された場合だけ使う（勝手に保存先を作らない）
+        if self.engine.index_path:
+            method = f"差分検索（インデックス: {self.engine.index_path}）"
+        else:
+            method = "再検索（スキャンインデックスを使うと差分検索になります）"
+        self.on_message(
+            f"{reason}。{self.RESCAN_INTERVAL:.0f}秒ごとの{method}に切り替えます"
+        )
+
+    def _rules(self, root):
+        rules = self._exclusions.get(root)
+        if rules is None:
+            engine = self.engine
+            rules = engine.base_exclusions.for_root(root, engine.use_ignore_files)
+            self._exclusions[root] = rules
+        return rules
+
+    def add_directory(self, root, path, found=()):
+        """走査したディレクトリを監視対象に追加する（上限に達した場合は再検索に切り替え）
+
+        foundにはそのディレクトリで一致したパスを指定する（再検索で新しいものとして扱わない）。
+        """
+        self._known.update(found)
+        if self._inotify is None or self.fallback:
+            return False
+        try:
+            wd = self._inotify.add_watch(path)
+        except OSError as e:
+            if e.errno == errno.ENOSPC:
+                self._start_fallback("監視数の上限に達しました")
+            return False  # 削除済み・アクセス権限なし等は監視しない
+        self._watches[wd] = (path, root)
+        return True
+
+    def _scan_new_directory(self, root, path):
+        """監視開始前に作られた中身を拾うため、新しいディレクトリを走査して監視を登録する"""
+        matcher = self.engine.matcher
+        rules = self._rules(root)
+
+        def scan(directory):
+            self.add_directory(root, directory)
+            return list_directory(directory, matcher, rules.name_filter(directory))
+
+        found = []
+        for _, _, matches in walk_matches(path, scan, self.engine.is_running):
+            found.extend(matches)
+        return found
+
+    def _handle_events(self, events):
+        matcher = self.engine.matcher
+        found = {}  # 検索対象 -> 一致したパス
+        for wd, mask, name in events:
+            if mask & IN_Q_OVERFLOW:
+                # イベントを取りこぼしたため、全体を検索し直して補う
+                self.on_message("イベントが溢れたため再検索します")
+                self._rescan()
+                continue
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)  # ディレクトリが削除された
+                continue
+            watch = self._watches.get(wd)
+            if watch is None or not name:
+                continue
+            parent, root = watch
+            path = os.path.join(parent, name)
+            if mask & IN_ISDIR:
+                if matcher.match_dir(name) is not None:
+                    found.setdefault(root, []).append(path)
+                elif not self._rules(root).name_filter(parent)(name):
+                    try:
+                        matches = self._scan_new_directory(root, path)
+                    except OSError:
+                        continue  # 既に削除された等
+                    found.setdefault(root, []).extend(matches)
+            elif matcher.match_file(name) is not None:
+                found.setdefault(root, []).append(path)
+
+        for root, paths in found.items():
+            if paths:
+                # 作成のイベントで見つかったものは、既知のパスでも新しく作られたもの
+                self._report(root, paths)
+
+    def _report(self, root, paths):
+        """通知し、通知後も残っているパスを既知のパスに加えて返す"""
+        self.on_found(root, paths)
+        # 通知先で削除されたもの（自動削除）は、作り直されたら再び通知する
+        remaining = [path for path in paths if os.path.lexists(path)]
+        self._known.update(remaining)
+        return remaining
+
+    def _rescan(self):
+        """全ての検索対象を再検索し、既知でない一致したパスだけを通知する"""
+        known = self._known
+        current = set()  # 今回の検索で存在を確認したパス
+        for root, _, found in self.engine.scan():
+            new_paths = []
+            for path in found:
+                if path in known:
+                    current.add(path)
+                else:
+                    new_paths.append(path)
+            if new_paths:
+                current.update(self._report(root, new_paths))
+        if self.engine.is_running():
+            # なくなったものは忘れ、削除後に作り直された場合は再び通知する
+            self._known = current
+
+    def run(self):
+        """停止されるまで監視を続ける"""
+        engine = self.engine
+        if self._inotify is not None:
+            self.on_message(f"監視中: {self.watch_count:,} ディレクトリ")
+        last_rescan = time.monotonic()
+        try:
+            while engine.is_running():
+                if self._inotify is not None:
+                    events = self._inotify.read_events(self.POLL_INTERVAL)
+                    if events:
+                        self._handle_events(events)
+                else:
+                    time.sleep(self.POLL_INTERVAL)
+                if (
+                    self.fallback
+                    and time.monotonic() - last_rescan >= self.RESCAN_INTERVAL
+                ):
+                    self._rescan()
+                    last_rescan = time.monotonic()
+        finally:
+            self.close()
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
@@ -0,0 +1,324 @@
+"""検索処理（clean_sweep_engine）のテスト
+
+python -m unittest discover tests
+"""
+
+import errno
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+import clean_sweep_engine  # noqa: E402
+from clean_sweep_engine import (  # noqa: E402
+    ParallelWalker,
+    PatternMatcher,
+    ScanEngine,
+    ScanIndex,
+    list_directory,
+    remove_permanently,
+    remove_tree,
+)
+
+
+def make_tree(root, width=3, depth=3):
+    """width個のサブディレクトリをdepth段持ち、各ディレクトリに.DS_Storeがあるツリー"""
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, ".DS_Store"), "w", encoding="utf-8"):
+        pass
+    if depth:
+        for i in range(width):
+            make_tree(os.path.join(root, f"d{i}"), width, depth - 1)
+
+
+class TempTreeTestCase(unittest.TestCase):
+    """一時ディレクトリ上のツリーを使うテストの共通部分"""
+
+    TIMEOUT = 5.0
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.root = os.path.join(self.tmp, "tree")
+        make_tree(self.root)
+
+    def run_bounded(self, func):
+        """funcを別スレッドで実行し、(戻り値, 例外) を返す（終わらなければ失敗）"""
+        outcome = {}
+
+        def run():
+            try:
+                outcome["value"] = func()
+            except Exception as e:  # pylint: disable=broad-except
+                outcome["error"] = e
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(self.TIMEOUT)
+        self.assertFalse(thread.is_alive(), "走査が終了しない")
+        return outcome.get("value"), outcome.get("error")
+
+
+class ParallelWalkerErrorTest(TempTreeTestCase):
+    """走査関数がOSError以外の例外を送出した場合"""
+
+    def make_scan(self):
+        matcher = PatternMatcher([".DS_Store"])
+        broken = os.path.join(self.root, "d1")
+
+        def scan(path):
+            if path == broken:
+                raise sqlite3.OperationalError("database is locked")
+            return list_directory(path, matcher, lambda _name: False)
+
+        return scan
+
+    def check_raises(self, workers):
+        walker = ParallelWalker(self.make_scan(), lambda: True, workers)
+        _, error = self.run_bounded(lambda: list(walker.walk(self.root)))
+        self.assertIsInstance(error, sqlite3.OperationalError)
+
+    def test_single_worker_raises(self):
+        self.check_raises(1)
+
+    def test_multiple_workers_raise(self):
+        self.check_raises(4)
+
+    def test_os_error_is_skipped(self):
+        matcher = PatternMatcher([".DS_Store"])
+        missing = os.path.join(self.root, "d1")
+
+        def scan(path):
+            if path == missing:
+                raise PermissionError(path)
+            return list_directory(path, matcher, lambda _name: False)
+
+        walker = ParallelWalker(scan, lambda: True, 4)
+        results, error = self.run_bounded(lambda: list(walker.walk(self.root)))
+        self.assertIsNone(error)
+        walked = {current for current, _, _ in results}
+        self.assertNotIn(missing, walked)
+        # d1以外の枝はすべて走査される
+        self.assertEqual(len(walked), 1 + 3 + 9 + 27 - (1 + 3 + 9))
+
+
+class DetachedScanErrorTest(TempTreeTestCase):
+    """GUIと同じdetachedの検索で、インデックスが例外を送出した場合"""
+
+    def check_reports(self, workers):
+        messages = []
+        engine = ScanEngine(
+            [".DS_Store"],
+            [self.root],
+            workers=workers,
+            index_path=os.path.join(self.tmp, "scan_index.sqlite3"),
+            on_message=messages.append,
+            detached=True,
+        )
+        with mock.patch.object(
+            ScanIndex,
+            "scan",
+            side_effect=sqlite3.OperationalError("database is locked"),
+        ):
+            _, error = self.run_bounded(lambda: list(engine.iter_matches()))
+        self.assertIsNone(error)
+        self.assertTrue(
+            any(
+                m.startswith(f"エラー: {self.root}") and "database is locked" in m
+                for m in messages
+            ),
+            messages,
+        )
+
+    def test_single_worker_reports_error(self):
+        self.check_reports(1)
+
+    def test_multiple_workers_report_error(self):
+        self.check_reports(4)
+
+
+class ScanIndexTest(TempTreeTestCase):
+    """差分検索（ScanEngineのindex_path）で変更のないディレクトリを一覧しないこと"""
+
+    def setUp(self):
+        super().setUp()
+        self.index_path = os.path.join(self.tmp, "scan_index.sqlite3")
+        self.past = time.time() - 3600
+        self.age_tree()
+
+    def age_tree(self):
+        """直近の変更として毎回一覧されないよう、ディレクトリのmtimeを過去にする"""
+        for top, _, _ in os.walk(self.root, topdown=False):
+            os.utime(top, (self.past, self.past))
+
+    def scan(self, patterns=(".DS_Store",)):
+        """検索し、(一致したパス, 一覧を取得したディレクトリ) を返す"""
+        engine = ScanEngine(patterns, [self.root], index_path=self.index_path)
+        with mock.patch.object(
+            clean_sweep_engine, "list_directory", wraps=list_directory
+        ) as listed:
+            found = sorted(engine.iter_matches())
+        return found, {call.args[0] for call in listed.call_args_list}
+
+    def test_unchanged_directories_are_not_listed(self):
+        found, listed = self.scan()
+        self.assertEqual(len(listed), 1 + 3 + 9 + 27)
+        self.assertEqual(len(found), len(listed))
+
+        again, listed = self.scan()
+        self.assertEqual(again, found)
+        self.assertEqual(listed, set())
+
+    def test_changed_directory_is_listed_again(self):
+        self.scan()
+        added = os.path.join(self.root, "d0", "new")
+        make_tree(added, depth=0)
+        found, listed = self.scan()
+        self.assertEqual(listed, {os.path.join(self.root, "d0"), added})
+        self.assertIn(os.path.join(added, ".DS_Store"), found)
+
+    def test_replaced_directory_is_listed_again(self):
+        self.scan()
+        # 同じmtimeのまま別のinodeに置き換える
+        replaced = os.path.join(self.root, "d1", "d2")
+        moved = os.path.join(self.tmp, "moved")
+        os.rename(replaced, moved)
+        shutil.copytree(moved, replaced)
+        self.age_tree()
+        _, listed = self.scan()
+        self.assertIn(replaced, listed)
+        self.assertNotIn(os.path.join(self.root, "d0"), listed)
+
+    def test_pattern_change_discards_index(self):
+        first, _ = self.scan()
+        found, listed = self.scan([".DS_Store", "Thumbs.db"])
+        self.assertEqual(found, first)
+        self.assertEqual(len(listed), 1 + 3 + 9 + 27)
+
+
+@unittest.skipUnless(
+    clean_sweep_engine.FD_RELATIVE_DELETE, "fdからの相対操作で削除できない環境"
+)
+class RemoveTreeTest(TempTreeTestCase):
+    """完全削除（remove_tree）がツリーの外を削除しないこと"""
+
+    def setUp(self):
+        super().setUp()
+        self.outside = os.path.join(self.tmp, "outside")
+        self.keep = os.path.join(self.outside, "keep.txt")
+        os.makedirs(self.outside)
+        with open(self.keep, "w", encoding="utf-8"):
+            pass
+
+    def assert_outside_intact(self):
+        self.assertTrue(os.path.exists(self.keep))
+
+    def test_removes_tree(self):
+        self.assertEqual(remove_tree(self.root), [])
+        self.assertFalse(os.path.lexists(self.root))
+
+    def test_symlink_to_outside_directory(self):
+        link = os.path.join(self.root, "d0", "link")
+        os.symlink(self.outside, link)
+        self.assertEqual(remove_tree(self.root), [])
+        self.assertFalse(os.path.lexists(self.root))
+        self.assert_outside_intact()
+
+    def test_top_level_symlink(self):
+        link = os.path.join(self.tmp, "link")
+        os.symlink(self.outside, link)
+        self.assertEqual(remove_tree(link), [])
+        self.assertFalse(os.path.lexists(link))
+        self.assert_outside_intact()
+        os.symlink(self.outside, link)
+        self.assertIsNone(remove_permanently(link))
+        self.assertFalse(os.path.lexists(link))
+        self.assert_outside_intact()
+
+    def swap_during_walk(self, replace):
+        """victimを開く直前にreplace(victim)で入れ替えてから削除する"""
+        victim = os.path.join(self.root, "d0", "victim")
+        make_tree(victim, depth=1)
+        open_directory = clean_sweep_engine._open_directory  # pylint: disable=W0212
+
+        def swapping_open(name, dir_fd, expected):
+            if name == "victim":
+                shutil.rmtree(victim)
+                replace(victim)
+            return open_directory(name, dir_fd, expected)
+
+        with mock.patch.object(clean_sweep_engine, "_open_directory", swapping_open):
+            errors = remove_tree(self.root)
+        self.assertEqual([path for path, _ in errors], [victim])
+        # 入れ替えられたものとその上位のディレクトリだけが残る
+        self.assertEqual(os.listdir(self.root), ["d0"])
+        self.assertEqual(os.listdir(os.path.join(self.root, "d0")), ["victim"])
+        self.assert_outside_intact()
+        return victim
+
+    def test_directory_swapped_for_symlink(self):
+        victim = self.swap_during_walk(lambda path: os.symlink(self.outside, path))
+        self.assertTrue(os.path.islink(victim))
+
+    def test_directory_swapped_for_other_directory(self):
+        def replace(path):
+            os.makedirs(path)
+            with open(os.path.join(path, "new.txt"), "w", encoding="utf-8"):
+                pass
+
+        victim = self.swap_during_walk(replace)
+        self.assertTrue(os.path.exists(os.path.join(victim, "new.txt")))
+
+    def test_partial_failure_is_reported(self):
+        locked = os.path.join(self.root, "d2", "d0", ".DS_Store")
+        unlink = os.unlink
+
+        def failing_unlink(name, *args, dir_fd=None, **kwargs):
+            if dir_fd is not None and name == ".DS_Store":
+                # d2/d0のfdからの削除だけ失敗させる
+                if os.path.samestat(os.stat(os.path.dirname(locked)), os.fstat(dir_fd)):
+                    raise PermissionError(errno.EACCES, "Permission denied", name)
+            return unlink(name, *args, dir_fd=dir_fd, **kwargs)
+
+        with mock.patch("os.unlink", failing_unlink):
+            reason = remove_permanently(self.root)
+        self.assertIsNotNone(reason)
+        self.assertIn(locked, reason)
+        # 失敗したファイルと、その上位のディレクトリだけが残る
+        remaining = sorted(
+            os.path.join(top, name)
+            for top, dirs, files in os.walk(self.root)
+            for name in dirs + files
+        )
+        self.assertEqual(
+            remaining,
+            [
+                os.path.join(self.root, "d2"),
+                os.path.join(self.root, "d2", "d0"),
+                locked,
+            ],
+        )
+
+    @unittest.skipIf(
+        hasattr(os, "geteuid") and os.geteuid() == 0, "rootは権限に関係なく削除できる"
+    )
+    def test_read_only_directory_is_reported(self):
+        locked = os.path.join(self.root, "d2")
+        os.chmod(locked, 0o555)
+        self.addCleanup(os.chmod, locked, 0o755)
+        errors = remove_tree(self.root)
+        self.assertTrue(errors)
+        self.assertTrue(all(path.startswith(locked) for path, _ in errors))
+        self.assertTrue(os.path.exists(locked))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+"""検索結果の一覧（clean_sweep_guiのResultsModel）のテスト
+
+python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# pylint: disable=wrong-import-position
+from PyQt5.QtCore import Qt  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from clean_sweep_gui import ResultsModel  # noqa: E402
+
+ROOT = os.path.join(os.sep, "data")
+
+
+def make_paths(directories, files):
+    """directories個のディレクトリにfiles個ずつあるパスの一覧"""
+    return [
+        os.path.join(ROOT, f"d{d}", f"f{f}.tmp")
+        for d in range(directories)
+        for f in range(files)
+    ]
+
+
+class ResultsModelTestCase(unittest.TestCase):
+    """ResultsModelを使うテストの共通部分"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.model = ResultsModel()
+
+    def group_index(self, *rows):
+        """最上位からの行番号の並びが表す分類のインデックス"""
+        index = self.model.index(rows[0], ResultsModel.PATH_COLUMN)
+        for row in rows[1:]:
+            index = self.model.index(row, ResultsModel.PATH_COLUMN, index)
+        return index
+
+    def set_checked(self, index, checked):
+        state = Qt.Checked if checked else Qt.Unchecked
+        self.assertTrue(self.model.setData(index, state, Qt.CheckStateRole))
+
+    def label(self, index):
+        return self.model.data(index, Qt.DisplayRole)
+
+
+class LoadedResultsTest(ResultsModelTestCase):
+    """結果ファイルから少しずつ読み込んでいる途中の一覧"""
+
+    def test_checking_group_includes_rows_not_yet_fetched(self):
+        paths = make_paths(5, 1000)
+        self.model.load((path, ROOT, None) for path in paths)
+        self.assertLess(self.model.item_count(), len(paths))
+
+        root = self.group_index(0)
+        self.set_checked(root, True)
+
+        self.assertEqual(sorted(self.model.checked_paths()), sorted(paths))
+        self.assertEqual(self.label(root), f"{ROOT}  (5,000 件)")
+        self.assertEqual(self.model.data(root, Qt.CheckStateRole), Qt.Checked)
+
+
+class GroupCheckTest(ResultsModelTestCase):
+    """分類の一括チェックと結果ごとのチェックの組み合わせ"""
+
+    def setUp(self):
+        super().setUp()
+        self.paths = make_paths(3, 4)
+        self.model.add_paths(self.paths, root=ROOT)
+
+    def item_index(self, directory, row):
+        """最初の検索対象・パターンのdirectory番目のディレクトリのrow番目の結果"""
+        parent = self.group_index(0, 0, directory)
+        while self.model.canFetchMore(parent):
+            self.model.fetchMore(parent)
+        return self.model.index(row, ResultsModel.PATH_COLUMN, parent)
+
+    def collect(self, index, checked):
+        """分類の配下を表示の上でたどり、チェックされた結果のパスを集めて件数を返す
+
+        分類の件数の表示とチェック状態が、配下の結果と一致することも確認する。
+        """
+        model = self.model
+        while model.canFetchMore(index):
+            model.fetchMore(index)
+        rows = model.rowCount(index)
+        if index.isValid() and not model.hasChildren(index):
+            return 1, model.data(index, Qt.CheckStateRole) == Qt.Checked
+        total = 0
+        checked_count = 0
+        for row in range(rows):
+            child = model.index(row, ResultsModel.PATH_COLUMN, index)
+            count, child_checked = self.collect(child, checked)
+            if not model.hasChildren(child) and child_checked:
+                checked.append(model.data(child, Qt.ToolTipRole))
+            total += count
+            checked_count += child_checked
+        if index.isValid():
+            self.assertTrue(self.label(index).endswith(f"({total:,} 件)"))
+            state = model.data(index, Qt.CheckStateRole)
+            if checked_count == 0:
+                self.assertEqual(state, Qt.Unchecked, self.label(index))
+            elif checked_count == total:
+                self.assertEqual(state, Qt.Checked, self.label(index))
+            else:
+                self.assertEqual(state, Qt.PartiallyChecked, self.label(index))
+        return total, checked_count
+
+    def assert_consistent(self, expected):
+        """チェックされたパスがexpectedで、表示と一致することを確認する"""
+        checked = []
+        total, _ = self.collect(self.group_index(0), checked)
+        self.assertEqual(total, self.model.item_count())
+        self.assertEqual(sorted(checked), sorted(expected))
+        self.assertEqual(sorted(self.model.checked_paths()), sorted(expected))
+
+    def test_uncheck_item_in_checked_group(self):
+        self.set_checked(self.group_index(0), True)
+        item = self.item_index(1, 2)
+        self.set_checked(item, False)
+        unchecked = self.model.data(item, Qt.ToolTipRole)
+        self.assert_consistent([p for p in self.paths if p != unchecked])
+
+    def test_check_parent_after_child_changed(self):
+        directory = self.group_index(0, 0, 1)
+        self.set_checked(self.item_index(0, 0), True)
+        self.set_checked(directory, True)
+        self.set_checked(self.item_index(1, 3), False)
+        # 配下を変更した後の一括チェックは、それより前の変更を上書きする
+        self.set_checked(self.group_index(0, 0), True)
+        self.assert_consistent(self.paths)
+        self.set_checked(self.item_index(2, 1), False)
+        self.set_checked(self.group_index(0), False)
+        self.assert_consistent([])
+
+    def test_items_appended_after_group_checked(self):
+        self.set_checked(self.group_index(0), True)
+        added = [
+            os.path.join(ROOT, "d0", "late.tmp"),
+            os.path.join(ROOT, "d9", "late.tmp"),
+        ]
+        self.model.add_paths(added, root=ROOT)
+        # 一括チェックの後に追加された結果はチェックされない
+        self.assert_consistent(self.paths)
+        self.set_checked(self.group_index(0, 0, 0), True)
+        self.assert_consistent(self.paths + added[:1])
+
+
+if __name__ == "__main__":
+    unittest.main()
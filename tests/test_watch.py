@@ -0,0 +1,109 @@
+"""監視モード（clean_sweep_watch）のテスト
+
+python -m unittest discover tests
+"""
+
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+import clean_sweep_cli  # noqa: E402
+from clean_sweep_engine import ScanEngine  # noqa: E402
+from clean_sweep_watch import Inotify, TreeWatcher  # noqa: E402
+
+
+class FallbackAutoDeleteTest(unittest.TestCase):
+    """inotifyを使えない環境での定期的な差分検索と自動削除"""
+
+    TIMEOUT = 10.0
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.root = os.path.join(self.tmp, "tree")
+        self.initial = [
+            os.path.join(self.root, "a", ".DS_Store"),
+            os.path.join(self.root, "b", ".DS_Store"),
+        ]
+        for path in self.initial:
+            self.touch(path)
+        patcher = mock.patch.object(Inotify, "is_supported", return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def touch(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8"):
+            pass
+
+    def wait_until(self, condition):
+        deadline = time.monotonic() + self.TIMEOUT
+        while not condition():
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def test_rescan_deletes_only_new_matches(self):
+        engine = ScanEngine(
+            [".DS_Store"],
+            [self.root],
+            index_path=os.path.join(self.tmp, "scan_index.sqlite3"),
+        )
+        watcher = TreeWatcher(engine, None)
+        watcher.RESCAN_INTERVAL = 0.1
+        self.assertTrue(watcher.fallback)
+        matches = clean_sweep_cli.iter_scanned(engine, None, watcher)
+        created = os.path.join(self.root, "c", ".DS_Store")
+        results = {}
+
+        def create_and_stop():
+            try:
+                # 最初の検索結果が残ったまま何度か差分検索が行われるのを待つ
+                time.sleep(watcher.RESCAN_INTERVAL * 5)
+                self.touch(created)
+                results["deleted"] = self.wait_until(
+                    lambda: not os.path.exists(created)
+                )
+                # 削除後に作り直されたものも再び削除する
+                self.touch(created)
+                results["deleted_again"] = self.wait_until(
+                    lambda: not os.path.exists(created)
+                )
+            finally:
+                engine.stop()
+
+        thread = threading.Thread(target=create_and_stop)
+        thread.start()
+        with contextlib.redirect_stdout(io.StringIO()):
+            clean_sweep_cli.watch(
+                engine,
+                watcher,
+                matches,
+                None,
+                clean_sweep_cli.Output(False, True),
+                delete=True,
+                permanent=True,
+            )
+        thread.join()
+
+        self.assertTrue(results.get("deleted"))
+        self.assertTrue(results.get("deleted_again"))
+        # 最初の検索結果は表示のみで、選択されないまま削除されてはならない
+        for path in self.initial:
+            self.assertTrue(os.path.exists(path), path)
+
+
+if __name__ == "__main__":
+    unittest.main()